@@ -91,7 +91,18 @@ def find_available_debug_port(start_port=9224):
     print(f"❌ No available ports found starting from {start_port}")
     return None
 
-def start_chrome_with_specific_profile(profile_dir="Profile 1"):
+def worker_debug_port_start(worker_id=None):
+    """First debug port to probe for a pool worker; each worker gets its own range of 10 ports"""
+    return 9224 + (worker_id or 0) * 10
+
+def temp_user_data_dir(user_data_dir, profile_dir, worker_id=None):
+    """Temporary user data directory for a profile, isolated per pool worker"""
+    temp_user_data = f"{user_data_dir}_temp_{profile_dir.replace(' ', '_')}"
+    if worker_id is not None:
+        temp_user_data += f"_w{worker_id}"
+    return temp_user_data
+
+def start_chrome_with_specific_profile(profile_dir="Profile 1", worker_id=None):
     """Start Chrome with the specific profile - OPTIMIZED FOR SPEED"""
     print(f"🚀 Starting Chrome with {profile_dir} profile...")
 
@@ -109,12 +120,12 @@ def start_chrome_with_specific_profile(profile_dir="Profile 1"):
         return None, None
 
     # Find available debugging port
-    debug_port = find_available_debug_port(9224)
+    debug_port = find_available_debug_port(worker_debug_port_start(worker_id))
     if not debug_port:
         return None, None
     
     # Create a lightweight temporary user data directory
-    temp_user_data = f"{user_data_dir}_temp_{profile_dir.replace(' ', '_')}"
+    temp_user_data = temp_user_data_dir(user_data_dir, profile_dir, worker_id)
     
     # Quick copy of essential profile data only
     import shutil
@@ -377,13 +388,13 @@ def create_linkedin_tab_fast(debug_port):
         print(f"❌ Error connecting to Chrome: {e}")
         return None
     
-def cleanup_temp_data(profile_dir="Profile 1"):
+def cleanup_temp_data(profile_dir="Profile 1", worker_id=None):
     """Clean up temporary user data directory"""
     if os.name == "nt":
         user_data_dir = os.path.expandvars(r"%LOCALAPPDATA%\Google\Chrome\User Data")
     else:
         user_data_dir = os.path.expanduser("~/.config/google-chrome")
-    temp_user_data = f"{user_data_dir}_temp_{profile_dir.replace(' ', '_')}"
+    temp_user_data = temp_user_data_dir(user_data_dir, profile_dir, worker_id)
     
     try:
         if os.path.exists(temp_user_data):
@@ -492,7 +503,7 @@ def start_chrome_with_email_profile(email):
     # Use the existing function but with dynamic profile
     return start_chrome_with_specific_profile(profile_id)
 
-def setup_chrome_for_email(email):
+def setup_chrome_for_email(email, worker_id=None):
     """Setup Chrome for specific email - MODIFIED VERSION"""
     print(f"🔧 LINKEDIN CHROME AUTOMATION SETUP - EMAIL: {email}")
     print("=" * 60)
@@ -503,10 +514,12 @@ def setup_chrome_for_email(email):
         return False, None, None
     
     # Step 1: Close specific profile Chrome processes
-    close_profile_specific_chrome(profile_id)
+    # Pool workers skip this so they don't kill the primary browser or each other
+    if worker_id is None:
+        close_profile_specific_chrome(profile_id)
     
     # Step 2: Start Chrome with found profile
-    chrome_process, debug_port = start_chrome_with_specific_profile(profile_id)
+    chrome_process, debug_port = start_chrome_with_specific_profile(profile_id, worker_id=worker_id)
     
     if not chrome_process:
         print(f"❌ Failed to start Chrome with profile for {email}")
@@ -525,8 +538,12 @@ def setup_chrome_for_email(email):
         return False, None, None
 
 # MODIFY THE MAIN FUNCTION
-def profile_login_with_email(email):
-    """Main execution flow - Email-based profile selection"""
+def profile_login_with_email(email, worker_id=None):
+    """Main execution flow - Email-based profile selection
+
+    worker_id selects an isolated debug port range and temp profile dir so several
+    browsers can run side by side; None keeps the single-browser behaviour.
+    """
     print("🔥 DYNAMIC LINKEDIN AUTOMATION")
     print(f"Target Email: {email}")
     print("=" * 50)
@@ -535,7 +552,7 @@ def profile_login_with_email(email):
     
     try:
         # Step 1: Setup Chrome with email-based profile
-        success, chrome_process, debug_port = setup_chrome_for_email(email)
+        success, chrome_process, debug_port = setup_chrome_for_email(email, worker_id=worker_id)
         
         if not success:
             print(f"❌ Failed to setup Chrome for email: {email}")
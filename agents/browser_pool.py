@@ -0,0 +1,134 @@
+# browser_pool.py
+import queue
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from agents.autoprofile_login import profile_login_with_email, cleanup_temp_data, find_profile_by_email
+
+# Set up logging
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class BrowserPool:
+    """
+    Pool of isolated Chrome workers for parallel LinkedIn profile extraction.
+    - Worker 0 reuses the scraper's primary driver (the one used for search).
+    - Workers 1..N-1 are started through profile_login_with_email with their own
+      debug port range and temp profile dir.
+    - All workers pull from one shared URL queue and pace themselves independently.
+    """
+
+    def __init__(self, email, size, extract_profile, is_valid_profile, profile_delay, on_profile=None):
+        self.email = email
+        self.size = max(int(size), 1)
+        self.extract_profile = extract_profile  # (driver, url) -> (profile_data, from_cache)
+        self.is_valid_profile = is_valid_profile  # profile_data -> bool
+        self.profile_delay = profile_delay  # processed_in_batch -> (delay, reset_batch)
+        self.on_profile = on_profile
+        self.drivers = []
+        self._owned = []  # (worker_id, driver, chrome_process) started by the pool
+        self._lock = threading.Lock()
+
+    def start(self, primary_driver):
+        """Starts the extra workers in parallel and registers the primary driver as worker 0"""
+        self.drivers = [primary_driver]
+        if self.size == 1:
+            return self.drivers
+
+        def launch(worker_id):
+            driver, chrome_process = profile_login_with_email(self.email, worker_id=worker_id)
+            return worker_id, driver, chrome_process
+
+        with ThreadPoolExecutor(max_workers=self.size - 1) as executor:
+            for worker_id, driver, chrome_process in executor.map(launch, range(1, self.size)):
+                if driver:
+                    self._owned.append((worker_id, driver, chrome_process))
+                    self.drivers.append(driver)
+                else:
+                    logger.error(f"Failed to start browser worker {worker_id}")
+        logger.debug(f"Browser pool ready with {len(self.drivers)}/{self.size} workers")
+        return self.drivers
+
+    def process(self, urls, target, processed_urls, valid_profiles):
+        """
+        Extracts profiles for urls across all workers until target valid profiles are collected
+        or the queue is empty. processed_urls and valid_profiles are shared across calls and
+        updated in place; results are deduplicated by profile_url.
+        """
+        work = queue.Queue()
+        for url in urls:
+            work.put(url)
+        done = threading.Event()
+        if len(valid_profiles) >= target:
+            done.set()
+        seen = {profile.get("profile_url") for profile in valid_profiles}
+
+        def worker(worker_id, driver):
+            processed_in_batch = 0
+            while not done.is_set():
+                try:
+                    url = work.get_nowait()
+                except queue.Empty:
+                    return
+                with self._lock:
+                    if url in processed_urls:
+                        continue
+                    processed_urls.add(url)
+                try:
+                    logger.debug(f"[worker {worker_id}] Processing profile: {url}")
+                    profile_data, from_cache = self.extract_profile(driver, url)
+                except Exception as e:
+                    logger.error(f"[worker {worker_id}] ❌ Error processing profile ({url}): {e}")
+                    continue
+
+                if self.is_valid_profile(profile_data):
+                    accepted = False
+                    with self._lock:
+                        if profile_data.get("profile_url") not in seen and len(valid_profiles) < target:
+                            seen.add(profile_data.get("profile_url"))
+                            valid_profiles.append(profile_data)
+                            accepted = True
+                            logger.debug(f"[worker {worker_id}] ✅ Valid profile found! Total valid: {len(valid_profiles)}")
+                        if len(valid_profiles) >= target:
+                            done.set()
+                    # Outside the lock: the callback may block on a full downstream queue
+                    if accepted and self.on_profile:
+                        self.on_profile(profile_data)
+                else:
+                    logger.debug(f"[worker {worker_id}] ❌ Profile doesn't meet criteria")
+
+                # Each worker paces its own requests; cache hits did not touch LinkedIn
+                if from_cache:
+                    continue
+                processed_in_batch += 1
+                delay, reset_batch = self.profile_delay(processed_in_batch)
+                if reset_batch:
+                    processed_in_batch = 0
+                done.wait(delay)
+
+        threads = [
+            threading.Thread(target=worker, args=(worker_id, driver), daemon=True)
+            for worker_id, driver in enumerate(self.drivers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return valid_profiles
+
+    def close(self):
+        """Closes the workers started by the pool; the primary driver is left to its owner"""
+        profile_id = None
+        if self._owned:
+            profile_id = find_profile_by_email(self.email)
+        for worker_id, driver, chrome_process in self._owned:
+            try:
+                driver.quit()
+                chrome_process.terminate()
+            except Exception as e:
+                logger.error(f"Error closing browser worker {worker_id}: {e}")
+            if profile_id:
+                cleanup_temp_data(profile_id, worker_id=worker_id)
+        self._owned = []
+        self.drivers = []
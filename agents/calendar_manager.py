@@ -12,6 +12,7 @@ import logging
 import dateutil.parser
 import pytz  # For timezone handling
 from datetime import timedelta  # For adding duration
+from agents.lead_store import get_lead_store
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')  # Enhanced to DEBUG
@@ -35,6 +36,7 @@ class CalendarManagerAgent:
         self.credentials_path = os.getenv("GOOGLE_OAUTH_CREDENTIALS_PATH")
         self.token_path = 'token.json'
         self.service = self.get_calendar_service()
+        self.lead_store = get_lead_store()
 
     def get_calendar_service(self):
         try:
@@ -75,18 +77,6 @@ class CalendarManagerAgent:
             logger.error(f"Unexpected error initializing Calendar API: {str(e)}", exc_info=True)
             return None
 
-    def save_leads_state(self, leads):
-        """
-        Saves the updated leads state to final_leads.json immediately.
-        """
-        leads_file = "outputs/final_leads.json"
-        try:
-            with open(leads_file, "w") as f:
-                json.dump(leads, f, indent=2)
-            logger.info(f"Updated leads saved to {leads_file} after processing")
-        except Exception as e:
-            logger.error(f"Error saving leads state: {e}", exc_info=True)
-
     async def run(self, state):
         logger.info(f"[{dt.datetime.now()}] Starting calendar_manager")
         if self.service is None:
@@ -130,13 +120,13 @@ class CalendarManagerAgent:
                         lead["meeting_scheduled"] = True
                         managed_count += 1
                         logger.info(f"Scheduled 30-min meeting for lead {lead.get('profile_url', 'unknown')}: {event}")
-                        self.save_leads_state(leads)  # Save after successful scheduling
+                        self.lead_store.upsert(lead)  # Save after successful scheduling
                     else:
                         logger.error(f"Failed to create meeting for lead {lead.get('profile_url', 'unknown')}")
                 else:
                     lead["meeting"] = {"status": "overlap", "note": "Reschedule needed"}
                     logger.info(f"Meeting overlap for lead {lead.get('profile_url', 'unknown')}")
-                    self.save_leads_state(leads)  # Save even on overlap
+                    self.lead_store.upsert(lead)  # Save even on overlap
         logger.info(f"[{dt.datetime.now()}] Completed calendar_manager: Meetings managed for {managed_count} leads")
         return {"leads": leads}
 
@@ -0,0 +1,117 @@
+# company_cache.py
+import os
+import re
+import threading
+import logging
+from urllib.parse import urlsplit, unquote
+from typing import Callable, Dict, Optional
+
+from agents.disk_cache import DiskCache
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60
+
+
+def normalize_company_name(name: str) -> str:
+    """Case-folded company name with punctuation removed and whitespace collapsed"""
+    name = re.sub(r"[^\w\s]", " ", (name or "").casefold())
+    return " ".join(name.split())
+
+
+def normalize_company_url(url: str) -> str:
+    """Canonical LinkedIn company page URL: https://www.linkedin.com/company/<slug>"""
+    if not url:
+        return ""
+    path = unquote(urlsplit(url.strip()).path).rstrip("/").lower()
+    if "/company/" in path:
+        slug = path.split("/company/", 1)[1].split("/")[0]
+        return f"https://www.linkedin.com/company/{slug}"
+    return url.split("?")[0].rstrip("/").lower()
+
+
+class _Flight:
+    """A lookup in progress; other threads wait on it instead of repeating the lookup"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = {}
+
+
+class CompanyCache:
+    """
+    Cross-run cache of resolved companies, keyed by company name and by LinkedIn company URL.
+    - Values hold the resolved company_url and company_website.
+    - Lookups that finished and found no website are cached as negative entries with a shorter TTL.
+      A loader signals a failed lookup (browser timeout or error) by returning None; that is not cached.
+    - Concurrent lookups of the same key (e.g. from browser pool workers) are coalesced,
+      so each company is resolved at most once per TTL.
+    """
+
+    def __init__(self, ttl_days: Optional[float] = None, negative_ttl_days: Optional[float] = None):
+        self.cache = DiskCache("linkedin_companies")
+        self.ttl = float(ttl_days if ttl_days is not None else os.getenv("COMPANY_CACHE_TTL_DAYS", "30")) * DAY
+        self.negative_ttl = float(
+            negative_ttl_days if negative_ttl_days is not None else os.getenv("COMPANY_CACHE_NEGATIVE_TTL_DAYS", "3")
+        ) * DAY
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def resolve_by_name(self, company_name: str, loader: Callable[[], Optional[Dict]]) -> Dict:
+        return self._resolve(f"name:{normalize_company_name(company_name)}", loader)
+
+    def resolve_by_url(self, company_url: str, loader: Callable[[], Optional[Dict]]) -> Dict:
+        return self._resolve(f"url:{normalize_company_url(company_url)}", loader)
+
+    def _cached(self, key: str) -> Optional[Dict]:
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        logger.debug(f"Company cache hit for {key}")
+        return dict(entry.value or {})
+
+    def _resolve(self, key: str, loader: Callable[[], Optional[Dict]]) -> Dict:
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            # A leader may have stored its result between the check above and taking the lock
+            cached = self._cached(key)
+            if cached is not None:
+                return cached
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+
+        if not leader:
+            logger.debug(f"Waiting for in-flight company lookup of {key}")
+            flight.done.wait()
+            return dict(flight.result)
+
+        try:
+            result = loader()
+            if result is None:
+                # The lookup failed (e.g. a browser timeout): try again next time instead of caching a miss
+                return {}
+            flight.result = result
+            self._store(key, result)
+            return dict(result)
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _store(self, key: str, result: Dict):
+        keys = {key}
+        if result.get("company_url"):
+            keys.add(f"url:{normalize_company_url(result['company_url'])}")
+        for cache_key in keys:
+            if result.get("company_website"):
+                self.cache.set(cache_key, result, self.ttl)
+            else:
+                self.cache.set_negative(cache_key, self.negative_ttl, result)
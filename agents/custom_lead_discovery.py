@@ -14,9 +14,14 @@ from dotenv import load_dotenv
 import os, random
 import datetime
 import logging
+import asyncio
 from typing import Dict, List
 import random
 from agents.autoprofile_login import profile_login_with_email
+from agents.browser_pool import BrowserPool
+from agents.profile_cache import ProfileCache, normalize_profile_url
+from agents.company_cache import CompanyCache
+from agents.lead_store import get_lead_store
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -25,8 +30,68 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Reads the profile fields in one round trip. arguments[0] carries the selector lists of
+# LinkedInScraper, and the fallback rules mirror extract_profile_fields_webdriver.
+PROFILE_EXTRACT_JS = """
+const sel = arguments[0];
+const text = (el) => ((el && (el.innerText || el.textContent)) || '').trim();
+const result = {name: null, role: null, company: null, company_url: null, location: null, found_experience: false};
+
+for (const s of sel.name) {
+    const el = document.querySelector(s);
+    if (el && text(el)) { result.name = text(el); break; }
+}
+
+let entry = null;
+for (const s of sel.experience_entries) {
+    const entries = Array.from(document.querySelectorAll(s)).filter((e) => e.querySelector(sel.company_logo));
+    if (entries.length) { entry = entries[0]; break; }
+}
+if (entry) {
+    result.found_experience = true;
+    const position = text(entry.querySelector(sel.position));
+    if (position.length > 1) result.role = position;
+    if (entry.querySelector(sel.sub_components)) {
+        const company = text(entry.querySelector(sel.single_company_name));
+        if (company.length > 1) result.company = company;
+    } else {
+        for (const el of entry.querySelectorAll(sel.multi_company_name)) {
+            const company = text(el).split('\u00b7')[0].trim();
+            if (company.length > 1 && company !== 'Present') { result.company = company; break; }
+        }
+    }
+    const link = entry.querySelector(sel.company_logo);
+    if (link && link.getAttribute('href')) result.company_url = link.href.split('?')[0];
+}
+
+for (const s of sel.location) {
+    const el = document.querySelector(s);
+    if (!el) continue;
+    const location = text(el);
+    if (location && !location.toLowerCase().includes('connection') && location.length < 100) {
+        result.location = location;
+        break;
+    }
+}
+return result;
+"""
+
 class LinkedInScraper:
-    def __init__(self, email, search_query="CEO", num_profiles=1, buffer_multiplier=2.0, max_additional_searches=5):
+    # Selector lists shared by the in-page JS extractor and the WebDriver fallback
+    NAME_SELECTORS = ["h1"]
+    EXPERIENCE_ENTRY_SELECTORS = ["li.artdeco-list__item"]
+    COMPANY_LOGO_SELECTOR = "a[data-field='experience_company_logo']"
+    SUB_COMPONENTS_SELECTOR = ".pvs-entity__sub-components"
+    SINGLE_COMPANY_NAME_SELECTOR = ".display-flex.align-items-center.mr1.hoverable-link-text.t-bold span[aria-hidden='true']"
+    POSITION_SELECTOR = ".display-flex.align-items-center.mr1.t-bold span[aria-hidden='true']"
+    MULTI_COMPANY_NAME_SELECTOR = ".t-14.t-normal span[aria-hidden='true']"
+    LOCATION_SELECTORS = [
+        ".text-body-small.inline.t-black--light.break-words",
+        ".pv-text-details__left-panel .text-body-small",
+        ".text-body-small"
+    ]
+
+    def __init__(self, email, search_query="CEO", num_profiles=1, buffer_multiplier=2.0, max_additional_searches=5, on_profile=None, num_workers=1, use_js_extractor=True, known_urls=None, profile_cache=None, company_cache=None):
         self.email = email 
         self.search_query = search_query
         self.num_profiles = num_profiles 
@@ -35,6 +100,19 @@ class LinkedInScraper:
         # Increase max searches for larger requests  
         self.max_additional_searches = max(max_additional_searches, num_profiles // 5)
         self.results = []
+        # Optional callback invoked with each valid profile as soon as it is extracted
+        self.on_profile = on_profile
+        # Number of parallel browser workers used to visit profiles
+        self.num_workers = max(int(num_workers), 1)
+        # Process URLs in batches for better performance
+        self.batch_size = 5 if num_profiles >= 20 else 3
+        # Read profile fields with one in-page script instead of per-element WebDriver calls
+        self.use_js_extractor = use_js_extractor
+        # Profiles that are already leads are skipped at the search stage
+        self.known_urls = {normalize_profile_url(url) for url in (known_urls or []) if url}
+        self.profile_cache = profile_cache
+        # Shared across pool workers so each company is resolved once
+        self.company_cache = company_cache
 
     def is_valid_profile(self, profile_data):
         """Check if profile meets minimum requirements (name, role, company_url)"""
@@ -264,7 +342,9 @@ class LinkedInScraper:
                     except:
                         pass
                 
-                if profile_url:
+                if profile_url and normalize_profile_url(profile_url) in self.known_urls:
+                    logger.debug(f"Skipping known lead from result {i+1}: {profile_url}")
+                elif profile_url:
                     profile_urls.append(profile_url)
                     logger.debug(f"Successfully extracted URL for result {i+1}")
                 else:
@@ -432,11 +512,15 @@ class LinkedInScraper:
         return True
 
     def search_company_website(self, driver, company_name):
-        """Search for company website when no profile URL is available"""
+        """
+        Search for company website when no profile URL is available.
+        Returns {} when the search finished without a match, None when it failed (timeout or error).
+        """
         try:
             logger.debug(f"Searching LinkedIn for company: {company_name}")
             search_url = f"https://www.linkedin.com/search/results/companies/?keywords={company_name.replace(' ', '%20')}"
             driver.get(search_url)
+            results_loaded = True
             try:
                 WebDriverWait(driver, 10).until(
                     EC.presence_of_element_located((
@@ -446,6 +530,7 @@ class LinkedInScraper:
                 )
             except TimeoutException:
                 logger.debug("Company search results did not load.")
+                results_loaded = False
             
             # Find first company result with updated selectors
             company_result_selectors = [
@@ -505,12 +590,14 @@ class LinkedInScraper:
                         logger.debug(f"Error processing company result {i+1}: {e}")
                         continue
             
+            if not company_results and not results_loaded:
+                return None  # The search page never loaded: not a real miss
             logger.debug(f"No matching company found for: {company_name}")
             return {}
             
         except Exception as e:
             logger.debug(f"Error searching for company: {e}")
-            return {}
+            return None
         
     def search_for_ctos(self, driver):
         """Search for CTOs on LinkedIn with proper pagination support"""
@@ -776,41 +863,72 @@ class LinkedInScraper:
             logger.debug(f"Search failed: {str(e)}")
             return []
       
-    def extract_full_profile_data(self, driver, profile_url):
-        """Navigate to individual profile and extract complete data"""
-        profile_data = {
-            "profile_url": profile_url,
-            "name": None,
-            "company": None,
-            "role": None,
-            "company_url": None,
-            "company_website": None,
-            "location": None,
-            "source": "LinkedIn"
-        }
-        
+    def extract_profile_fields_js(self, driver):
+        """
+        Read name, role, company, company_url and location in a single execute_script round trip.
+        Returns None if the page could not be read, so the caller can fall back to WebDriver lookups.
+        """
         try:
-            logger.debug(f"Navigating to profile: {profile_url}")
-            driver.get(profile_url)
-            time.sleep(random.uniform(1, 3))
+            # Experience entries are lazy-loaded below the fold
+            driver.execute_script("window.scrollTo(0, 800);")
+            try:
+                WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, ", ".join(self.EXPERIENCE_ENTRY_SELECTORS)))
+                )
+            except TimeoutException:
+                logger.debug("Experience section did not load in time")
 
-            # Wait until the profile name or any known element appears
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((
-                    By.CSS_SELECTOR,
-                    "h1.text-heading-xlarge, .pv-text-details__left-panel h1, .text-heading-xlarge, h1"
-                ))
-            )
-        except TimeoutException as e:
-            logger.error(f"Timeout loading profile: {e}")
-            return profile_data  # Return partial data instead of empty
-        except Exception as e:
-            logger.error(f"Error navigating to profile: {e}")
-            return profile_data  # Return partial data instead of empty
+            fields = driver.execute_script(PROFILE_EXTRACT_JS, {
+                "name": self.NAME_SELECTORS,
+                "experience_entries": self.EXPERIENCE_ENTRY_SELECTORS,
+                "company_logo": self.COMPANY_LOGO_SELECTOR,
+                "sub_components": self.SUB_COMPONENTS_SELECTOR,
+                "single_company_name": self.SINGLE_COMPANY_NAME_SELECTOR,
+                "position": self.POSITION_SELECTOR,
+                "multi_company_name": self.MULTI_COMPANY_NAME_SELECTOR,
+                "location": self.LOCATION_SELECTORS,
+            })
+        except WebDriverException as e:
+            logger.debug(f"JS profile extraction failed: {e}")
+            return None
 
+        if not fields:
+            return None
+        fields["name"] = self.clean_name(fields.get("name"))
+        # An unrecognised layout is better handled by the selector-by-selector fallback
+        if not fields["name"]:
+            return None
+        if fields.get("found_experience") and not (fields.get("role") and fields.get("company")):
+            return None
+        logger.debug(f"JS extractor found: {fields}")
+        return fields
+
+    def apply_js_profile_fields(self, driver, profile_data, fields):
+        """Copy fields returned by the JS extractor into profile_data, resolving search links to company pages"""
+        for key in ("name", "role", "company", "location"):
+            if fields.get(key):
+                profile_data[key] = fields[key]
+
+        company_url = fields.get("company_url")
+        if not company_url:
+            return
+        if "/company/" in company_url:
+            profile_data["company_url"] = company_url
+        elif "search/results/all" in company_url and profile_data.get("company"):
+            logger.debug(f"Company URL is a search link, searching for company: {profile_data['company']}")
+            try:
+                company_info = self.resolve_company_by_name(driver, profile_data["company"])
+                if company_info.get("company_url"):
+                    profile_data["company_url"] = company_info["company_url"]
+                    logger.debug(f"Found company URL via search: {profile_data['company_url']}")
+            except Exception as e:
+                logger.error(f"Error searching for company: {e}")
+
+    def extract_profile_fields_webdriver(self, driver, profile_data):
+        """Fill name, role, company, company_url and location using per-element WebDriver lookups (fallback path)"""
         # Extract name from profile page
         try:
-            name_selectors = ["h1"]
+            name_selectors = self.NAME_SELECTORS
             for selector in name_selectors:
                 name_element = self.safe_find_element(driver, By.CSS_SELECTOR, selector, timeout=5)
                 if name_element:
@@ -828,16 +946,16 @@ class LinkedInScraper:
             # Scroll and wait for experience section
             driver.execute_script("window.scrollTo(0, 800);")
             WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "li.artdeco-list__item"))
+                EC.presence_of_element_located((By.CSS_SELECTOR, self.EXPERIENCE_ENTRY_SELECTORS[0]))
             )
 
-            experience_list_selectors = ["li.artdeco-list__item"]
+            experience_list_selectors = self.EXPERIENCE_ENTRY_SELECTORS
             experience_entries = []
             
             for selector in experience_list_selectors:
                 entries = self.safe_find_elements(driver, By.CSS_SELECTOR, selector, timeout=5)
                 if entries:
-                    valid_entries = [e for e in entries if e.find_elements(By.CSS_SELECTOR, "a[data-field='experience_company_logo']")]
+                    valid_entries = [e for e in entries if e.find_elements(By.CSS_SELECTOR, self.COMPANY_LOGO_SELECTOR)]
                     if valid_entries:
                         experience_entries = valid_entries
                         logger.debug(f"Found {len(valid_entries)} experience entries with selector: {selector}")
@@ -848,7 +966,7 @@ class LinkedInScraper:
                 logger.debug("Processing first experience entry...")
 
                 try:
-                    sub_components = first_entry.find_elements(By.CSS_SELECTOR, ".pvs-entity__sub-components")
+                    sub_components = first_entry.find_elements(By.CSS_SELECTOR, self.SUB_COMPONENTS_SELECTOR)
                     is_single_company = bool(sub_components)
 
                     if is_single_company:
@@ -856,7 +974,7 @@ class LinkedInScraper:
                         
                         # Extract company name
                         try:
-                            company_elements = first_entry.find_elements(By.CSS_SELECTOR, ".display-flex.align-items-center.mr1.hoverable-link-text.t-bold span[aria-hidden='true']")
+                            company_elements = first_entry.find_elements(By.CSS_SELECTOR, self.SINGLE_COMPANY_NAME_SELECTOR)
                             if company_elements:
                                 company_name = company_elements[0].text.strip()
                                 if company_name and len(company_name) > 1:
@@ -867,7 +985,7 @@ class LinkedInScraper:
 
                         # Extract company URL
                         try:
-                            company_links = first_entry.find_elements(By.CSS_SELECTOR, "a[data-field='experience_company_logo']")
+                            company_links = first_entry.find_elements(By.CSS_SELECTOR, self.COMPANY_LOGO_SELECTOR)
                             if company_links:
                                 company_url = company_links[0].get_attribute("href").split('?')[0]
                                 if "/company/" in company_url:
@@ -877,7 +995,7 @@ class LinkedInScraper:
                                     if profile_data.get("company"):
                                         logger.debug(f"Company URL is a search link, searching for company: {profile_data['company']}")
                                         try:
-                                            company_info = self.search_company_website(driver, profile_data["company"])
+                                            company_info = self.resolve_company_by_name(driver, profile_data["company"])
                                             if company_info.get("company_url"):
                                                 profile_data["company_url"] = company_info["company_url"]
                                                 logger.debug(f"Found company URL via search: {profile_data['company_url']}")
@@ -888,7 +1006,7 @@ class LinkedInScraper:
 
                         # Extract position
                         try:
-                            sub_position_elements = first_entry.find_elements(By.CSS_SELECTOR, ".display-flex.align-items-center.mr1.t-bold span[aria-hidden='true']")
+                            sub_position_elements = first_entry.find_elements(By.CSS_SELECTOR, self.POSITION_SELECTOR)
                             if sub_position_elements:
                                 position = sub_position_elements[0].text.strip()
                                 if position and len(position) > 1:
@@ -902,7 +1020,7 @@ class LinkedInScraper:
                         
                         # Extract position
                         try:
-                            position_elements = first_entry.find_elements(By.CSS_SELECTOR, ".display-flex.align-items-center.mr1.t-bold span[aria-hidden='true']")
+                            position_elements = first_entry.find_elements(By.CSS_SELECTOR, self.POSITION_SELECTOR)
                             if position_elements:
                                 position = position_elements[0].text.strip()
                                 if position and len(position) > 1:
@@ -913,7 +1031,7 @@ class LinkedInScraper:
 
                         # Extract company name
                         try:
-                            company_name_elements = first_entry.find_elements(By.CSS_SELECTOR, ".t-14.t-normal span[aria-hidden='true']")
+                            company_name_elements = first_entry.find_elements(By.CSS_SELECTOR, self.MULTI_COMPANY_NAME_SELECTOR)
                             for element in company_name_elements:
                                 text = element.text.strip()
                                 company_name = text.split("·")[0].strip()
@@ -926,7 +1044,7 @@ class LinkedInScraper:
 
                         # Extract company URL
                         try:
-                            company_links = first_entry.find_elements(By.CSS_SELECTOR, "a[data-field='experience_company_logo']")
+                            company_links = first_entry.find_elements(By.CSS_SELECTOR, self.COMPANY_LOGO_SELECTOR)
                             if company_links:
                                 company_url = company_links[0].get_attribute("href").split('?')[0]
                                 if "/company/" in company_url:
@@ -936,7 +1054,7 @@ class LinkedInScraper:
                                     if profile_data.get("company"):
                                         logger.debug(f"Company URL is a search link, searching for company: {profile_data['company']}")
                                         try:
-                                            company_info = self.search_company_website(driver, profile_data["company"])
+                                            company_info = self.resolve_company_by_name(driver, profile_data["company"])
                                             if company_info.get("company_url"):
                                                 profile_data["company_url"] = company_info["company_url"]
                                                 logger.debug(f"Found company URL via search: {profile_data['company_url']}")
@@ -955,11 +1073,7 @@ class LinkedInScraper:
         
         # Extract location
         try:
-            location_selectors = [
-                ".text-body-small.inline.t-black--light.break-words",
-                ".pv-text-details__left-panel .text-body-small",
-                ".text-body-small"
-            ]
+            location_selectors = self.LOCATION_SELECTORS
             for selector in location_selectors:
                 location_element = self.safe_find_element(driver, By.CSS_SELECTOR, selector, timeout=3)
                 if location_element:
@@ -971,26 +1085,248 @@ class LinkedInScraper:
         except Exception as e:
             logger.error(f"Error extracting location: {e}")
             # Continue processing even if location extraction fails
+
+    def extract_full_profile_data(self, driver, profile_url):
+        """Navigate to individual profile and extract complete data"""
+        profile_data = {
+            "profile_url": profile_url,
+            "name": None,
+            "company": None,
+            "role": None,
+            "company_url": None,
+            "company_website": None,
+            "location": None,
+            "source": "LinkedIn"
+        }
         
-        # Company page navigation + dynamic wait - WRAPPED IN TRY-CATCH
+        try:
+            logger.debug(f"Navigating to profile: {profile_url}")
+            driver.get(profile_url)
+            time.sleep(random.uniform(1, 3))
+
+            # Wait until the profile name or any known element appears
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((
+                    By.CSS_SELECTOR,
+                    "h1.text-heading-xlarge, .pv-text-details__left-panel h1, .text-heading-xlarge, h1"
+                ))
+            )
+        except TimeoutException as e:
+            logger.error(f"Timeout loading profile: {e}")
+            return profile_data  # Return partial data instead of empty
+        except Exception as e:
+            logger.error(f"Error navigating to profile: {e}")
+            return profile_data  # Return partial data instead of empty
+
+        if self.use_js_extractor:
+            fields = self.extract_profile_fields_js(driver)
+            if fields is not None:
+                self.apply_js_profile_fields(driver, profile_data, fields)
+            else:
+                logger.debug("JS extractor could not read the profile, falling back to WebDriver extraction")
+                self.extract_profile_fields_webdriver(driver, profile_data)
+        else:
+            self.extract_profile_fields_webdriver(driver, profile_data)
+
         if profile_data.get("company_url"):
-            try:
-                logger.debug(f"Navigating to company page: {profile_data['company_url']}")
-                driver.get(profile_data["company_url"])
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "a[href^='http']"))
-                )
-                website_info = self.extract_company_website(driver)
-                if website_info.get("company_website"):
-                    profile_data["company_website"] = website_info["company_website"]
-                    logger.debug(f"Found company website: {profile_data['company_website']}")
-            except Exception as e:
-                logger.error(f"Error navigating to company page or extracting website: {e}")
-                # Continue without company website - don't fail the entire profile
-                logger.debug("Continuing without company website information")
+            website_info = self.resolve_company_website(driver, profile_data["company_url"])
+            if website_info.get("company_website"):
+                profile_data["company_website"] = website_info["company_website"]
+                logger.debug(f"Found company website: {profile_data['company_website']}")
 
         return profile_data
 
+    def resolve_company_by_name(self, driver, company_name):
+        """search_company_website through the company cache, when one is configured"""
+        if not self.company_cache:
+            return self.search_company_website(driver, company_name) or {}
+        return self.company_cache.resolve_by_name(company_name, lambda: self.search_company_website(driver, company_name))
+
+    def resolve_company_website(self, driver, company_url):
+        """Company page navigation + website extraction through the company cache, when one is configured"""
+        if not self.company_cache:
+            return self.load_company_website(driver, company_url) or {}
+        return self.company_cache.resolve_by_url(company_url, lambda: self.load_company_website(driver, company_url))
+
+    def load_company_website(self, driver, company_url):
+        """Navigate to the company page and extract its website; None when the page failed to load"""
+        # Company page navigation + dynamic wait - WRAPPED IN TRY-CATCH
+        try:
+            logger.debug(f"Navigating to company page: {company_url}")
+            driver.get(company_url)
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "a[href^='http']"))
+            )
+            website_info = self.extract_company_website(driver)
+            website_info["company_url"] = company_url
+            return website_info
+        except Exception as e:
+            logger.error(f"Error navigating to company page or extracting website: {e}")
+            # Continue without company website - don't fail the entire profile
+            logger.debug("Continuing without company website information")
+            return None
+
+    def fetch_profile(self, driver, profile_url):
+        """
+        Return (profile_data, from_cache). Consults the profile cache before navigating and
+        records the outcome of every visit that loaded the profile.
+        """
+        if self.profile_cache:
+            entry = self.profile_cache.get(profile_url)
+            if entry and entry.negative:
+                logger.debug(f"Skipping cached invalid profile: {profile_url}")
+                return entry.value or {"profile_url": profile_url}, True
+            if entry:
+                logger.debug(f"Using cached profile: {profile_url}")
+                return entry.value, True
+
+        profile_data = self.extract_full_profile_data(driver, profile_url)
+        if self.profile_cache:
+            if self.is_valid_profile(profile_data):
+                self.profile_cache.put(profile_url, profile_data)
+            elif profile_data.get("name"):
+                # Only cache misses for pages that actually loaded; timeouts are retried next run
+                self.profile_cache.put_invalid(profile_url, profile_data)
+        return profile_data, False
+
+    def profile_delay(self, processed_in_batch):
+        """Delay before the next profile visit; returns (delay, reset_batch)"""
+        # Add longer delays for large batches to avoid rate limiting
+        delay = random.uniform(1.0, 2.0)
+        if self.num_profiles >= 20:
+            return random.uniform(2.0, 4.0), False
+        if processed_in_batch >= self.batch_size:
+            delay = random.uniform(3.0, 6.0)  # Longer break after batch
+            logger.debug(f"Batch complete, taking a longer break ({delay:.1f}s)")
+            return delay, True
+        return delay, False
+
+    def process_profiles_sequentially(self, driver, profile_urls):
+        """Visit profile URLs one by one in a single driver until enough valid profiles are found"""
+        # Enhanced processing for large requests
+        valid_profiles = []
+        profile_urls_index = 0
+        additional_search_attempts = 0
+        all_processed_urls = set()
+        
+        logger.debug(f"Target: {self.num_profiles} valid profiles")
+        
+        processed_in_batch = 0
+        
+        while len(valid_profiles) < self.num_profiles:
+            # Check if we have more URLs to process
+            if profile_urls_index >= len(profile_urls):
+                if additional_search_attempts < self.max_additional_searches:
+                    logger.debug(f"\nNeed {self.num_profiles - len(valid_profiles)} more valid profiles")
+                    logger.debug(f"Attempting additional search #{additional_search_attempts + 1}")
+                    
+                    # For large requests, search for more profiles more aggressively
+                    needed_count = (self.num_profiles - len(valid_profiles)) * 2
+                    additional_urls = self.search_for_additional_profiles(driver, list(all_processed_urls), needed_count)
+                    
+                    if additional_urls:
+                        profile_urls.extend(additional_urls)
+                        logger.debug(f"Added {len(additional_urls)} new URLs to process")
+                    else:
+                        logger.debug("No additional URLs found")
+                    
+                    additional_search_attempts += 1
+                else:
+                    logger.debug(f"Reached maximum additional search attempts ({self.max_additional_searches})")
+                    break
+            
+            # If we have URLs to process
+            if profile_urls_index < len(profile_urls):
+                current_url = profile_urls[profile_urls_index]
+                
+                # Skip if already processed
+                if current_url in all_processed_urls:
+                    profile_urls_index += 1
+                    continue
+                
+                try:
+                    logger.debug(f"\nProcessing profile {profile_urls_index + 1}/{len(profile_urls)}: {current_url}")
+                    logger.debug(f"Valid profiles so far: {len(valid_profiles)}/{self.num_profiles}")
+                    
+                    profile_data, from_cache = self.fetch_profile(driver, current_url)
+                    all_processed_urls.add(current_url)
+                    
+                    # Check if profile meets our criteria
+                    if self.is_valid_profile(profile_data):
+                        valid_profiles.append(profile_data)
+                        if self.on_profile:
+                            self.on_profile(profile_data)
+                        logger.debug(f"✅ Valid profile found! Total valid: {len(valid_profiles)}")
+                        logger.debug(f"   Name: {profile_data.get('name')}")
+                        logger.debug(f"   Role: {profile_data.get('role')}")
+                        logger.debug(f"   Company: {profile_data.get('company')}")
+                    else:
+                        logger.debug(f"❌ Profile doesn't meet criteria")
+                    
+                    profile_urls_index += 1
+                    
+                    # Cache hits did not touch LinkedIn, so they need no pacing
+                    if not from_cache:
+                        processed_in_batch += 1
+                        delay, reset_batch = self.profile_delay(processed_in_batch)
+                        if reset_batch:
+                            processed_in_batch = 0
+                        time.sleep(delay)
+                    
+                except Exception as e:
+                    logger.error(f"❌ Error processing profile {profile_urls_index + 1} ({current_url}): {e}")
+                    all_processed_urls.add(current_url)
+                    profile_urls_index += 1
+                    continue
+            else:
+                # No more URLs and no more search attempts
+                break
+        
+        return valid_profiles, all_processed_urls, additional_search_attempts
+
+    def process_profiles_with_pool(self, driver, profile_urls):
+        """Visit profile URLs with a pool of browser workers until enough valid profiles are found"""
+        pool = BrowserPool(
+            self.email,
+            self.num_workers,
+            extract_profile=self.fetch_profile,
+            is_valid_profile=self.is_valid_profile,
+            profile_delay=self.profile_delay,
+            on_profile=self.on_profile
+        )
+        valid_profiles = []
+        all_processed_urls = set()
+        additional_search_attempts = 0
+        pending_urls = list(dict.fromkeys(profile_urls))
+        
+        try:
+            pool.start(driver)
+            logger.debug(f"Target: {self.num_profiles} valid profiles with {len(pool.drivers)} browser workers")
+            while True:
+                pool.process(pending_urls, self.num_profiles, all_processed_urls, valid_profiles)
+                if len(valid_profiles) >= self.num_profiles:
+                    break
+                if additional_search_attempts >= self.max_additional_searches:
+                    logger.debug(f"Reached maximum additional search attempts ({self.max_additional_searches})")
+                    break
+                
+                logger.debug(f"\nNeed {self.num_profiles - len(valid_profiles)} more valid profiles")
+                logger.debug(f"Attempting additional search #{additional_search_attempts + 1}")
+                # Workers are idle here, so the primary driver is free for searching
+                needed_count = (self.num_profiles - len(valid_profiles)) * 2
+                additional_urls = self.search_for_additional_profiles(driver, list(all_processed_urls), needed_count)
+                pending_urls = [url for url in additional_urls if url not in all_processed_urls]
+                if pending_urls:
+                    profile_urls.extend(pending_urls)
+                    logger.debug(f"Added {len(pending_urls)} new URLs to process")
+                else:
+                    logger.debug("No additional URLs found")
+                additional_search_attempts += 1
+        finally:
+            pool.close()
+        
+        return valid_profiles, all_processed_urls, additional_search_attempts
+
     def main(self):
         """Main function to run the scraper with enhanced large-scale support"""
         driver, chrome_process = profile_login_with_email(self.email)
@@ -1012,88 +1348,10 @@ class LinkedInScraper:
             
             logger.debug(f"\nFound {len(profile_urls)} profile URLs across multiple pages")
             
-            # Enhanced processing for large requests
-            valid_profiles = []
-            profile_urls_index = 0
-            additional_search_attempts = 0
-            all_processed_urls = set()
-            
-            logger.debug(f"Target: {self.num_profiles} valid profiles")
-            
-            # Process URLs in batches for better performance
-            batch_size = 5 if self.num_profiles >= 20 else 3
-            processed_in_batch = 0
-            
-            while len(valid_profiles) < self.num_profiles:
-                # Check if we have more URLs to process
-                if profile_urls_index >= len(profile_urls):
-                    if additional_search_attempts < self.max_additional_searches:
-                        logger.debug(f"\nNeed {self.num_profiles - len(valid_profiles)} more valid profiles")
-                        logger.debug(f"Attempting additional search #{additional_search_attempts + 1}")
-                        
-                        # For large requests, search for more profiles more aggressively
-                        needed_count = (self.num_profiles - len(valid_profiles)) * 2
-                        additional_urls = self.search_for_additional_profiles(driver, list(all_processed_urls), needed_count)
-                        
-                        if additional_urls:
-                            profile_urls.extend(additional_urls)
-                            logger.debug(f"Added {len(additional_urls)} new URLs to process")
-                        else:
-                            logger.debug("No additional URLs found")
-                        
-                        additional_search_attempts += 1
-                    else:
-                        logger.debug(f"Reached maximum additional search attempts ({self.max_additional_searches})")
-                        break
-                
-                # If we have URLs to process
-                if profile_urls_index < len(profile_urls):
-                    current_url = profile_urls[profile_urls_index]
-                    
-                    # Skip if already processed
-                    if current_url in all_processed_urls:
-                        profile_urls_index += 1
-                        continue
-                    
-                    try:
-                        logger.debug(f"\nProcessing profile {profile_urls_index + 1}/{len(profile_urls)}: {current_url}")
-                        logger.debug(f"Valid profiles so far: {len(valid_profiles)}/{self.num_profiles}")
-                        
-                        profile_data = self.extract_full_profile_data(driver, current_url)
-                        all_processed_urls.add(current_url)
-                        processed_in_batch += 1
-                        
-                        # Check if profile meets our criteria
-                        if self.is_valid_profile(profile_data):
-                            valid_profiles.append(profile_data)
-                            logger.debug(f"✅ Valid profile found! Total valid: {len(valid_profiles)}")
-                            logger.debug(f"   Name: {profile_data.get('name')}")
-                            logger.debug(f"   Role: {profile_data.get('role')}")
-                            logger.debug(f"   Company: {profile_data.get('company')}")
-                        else:
-                            logger.debug(f"❌ Profile doesn't meet criteria")
-                        
-                        profile_urls_index += 1
-                        
-                        # Add longer delays for large batches to avoid rate limiting
-                        delay = random.uniform(1.0, 2.0)
-                        if self.num_profiles >= 20:
-                            delay = random.uniform(2.0, 4.0)
-                        elif processed_in_batch >= batch_size:
-                            delay = random.uniform(3.0, 6.0)  # Longer break after batch
-                            processed_in_batch = 0
-                            logger.debug(f"Batch complete, taking a longer break ({delay:.1f}s)")
-                        
-                        time.sleep(delay)
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Error processing profile {profile_urls_index + 1} ({current_url}): {e}")
-                        all_processed_urls.add(current_url)
-                        profile_urls_index += 1
-                        continue
-                else:
-                    # No more URLs and no more search attempts
-                    break
+            if self.num_workers > 1:
+                valid_profiles, all_processed_urls, additional_search_attempts = self.process_profiles_with_pool(driver, profile_urls)
+            else:
+                valid_profiles, all_processed_urls, additional_search_attempts = self.process_profiles_sequentially(driver, profile_urls)
             
             # Enhanced summary for large requests
             logger.debug(f"\n📊 Final Processing Summary:")
@@ -1154,22 +1412,58 @@ class CustomLeadDiscoveryAgent:
     input_schema = {}
     output_schema = {"leads": List[Dict]}
 
-    async def run(self, state):
-        logger.debug(f"[{datetime.datetime.now()}] Starting custom_lead_discovery")
+    def __init__(self):
+        self.profile_cache = ProfileCache()
+        self.company_cache = CompanyCache()
+        self.lead_store = get_lead_store()
+
+    def build_scraper(self, state, on_profile=None):
         # Initialize scraper with credentials from .env
         LINKEDIN_EMAIL = os.getenv("LINKEDIN_EMAIL") 
         SEARCH_QUERY = state.get("search_query", "CTO")  # Default to CTO
         NUM_PROFILES = state.get("num_profiles", 2)
 
-        scraper = LinkedInScraper(
+        return LinkedInScraper(
             email=LINKEDIN_EMAIL,
             search_query=SEARCH_QUERY,
-            num_profiles=NUM_PROFILES
+            num_profiles=NUM_PROFILES,
+            on_profile=on_profile,
+            num_workers=state.get("browser_workers", int(os.getenv("LINKEDIN_BROWSER_WORKERS", "1"))),
+            use_js_extractor=os.getenv("LINKEDIN_JS_EXTRACTOR", "true").lower() == "true",
+            known_urls=self.known_profile_urls(state),
+            profile_cache=self.profile_cache,
+            company_cache=self.company_cache
         )
+
+    def known_profile_urls(self, state):
+        """Profile URLs that are already leads, from the current state and the lead store"""
+        known_urls = {lead.get("profile_url") for lead in state.get("leads", []) if lead.get("profile_url")}
+        known_urls.update(self.lead_store.known_profile_urls())
+        return known_urls
+
+    async def run(self, state):
+        logger.debug(f"[{datetime.datetime.now()}] Starting custom_lead_discovery")
+        scraper = self.build_scraper(state)
         results = scraper.main()
         # User's code goes here to populate 'leads' if needed; results is the list
         logger.debug(f"[{datetime.datetime.now()}] Completed custom_lead_discovery: {len(results)} leads found")
         return {"leads": results}
+
+    async def stream(self, state, out_queue):
+        """
+        Runs the scraper in a worker thread and puts each valid profile on out_queue as soon as it is extracted.
+        The scraper thread blocks while out_queue is full, so downstream stages apply backpressure to scraping.
+        """
+        logger.debug(f"[{datetime.datetime.now()}] Starting custom_lead_discovery (streaming)")
+        loop = asyncio.get_running_loop()
+
+        def on_profile(profile_data):
+            asyncio.run_coroutine_threadsafe(out_queue.put(profile_data), loop).result()
+
+        scraper = self.build_scraper(state, on_profile=on_profile)
+        results = await asyncio.to_thread(scraper.main)
+        logger.debug(f"[{datetime.datetime.now()}] Completed custom_lead_discovery (streaming): {len(results)} leads found")
+        return results
     
         
 # if __name__ == "__main__":
@@ -0,0 +1,109 @@
+# disk_cache.py
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from typing import Any, NamedTuple, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = "outputs/cache.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace  TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      TEXT,
+    negative   INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_cache_expires_at ON cache(expires_at);
+"""
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    negative: bool
+
+
+class DiskCache:
+    """
+    Persistent key/value cache shared across runs, stored in SQLite (WAL mode).
+    - Entries live in a namespace so several caches can share one database file.
+    - Every entry has its own expiry; expired entries behave like misses.
+    - Negative entries record that a lookup was done and found nothing, so it is not repeated until they expire.
+    """
+
+    def __init__(self, namespace: str, db_path: Optional[str] = None):
+        self.namespace = namespace
+        self.db_path = db_path or os.getenv("CACHE_DB_PATH", DEFAULT_CACHE_PATH)
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Returns the live entry for key, or None on a miss or an expired entry.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value, negative FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (self.namespace, key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        value = json.loads(row[0]) if row[0] is not None else None
+        return CacheEntry(value=value, negative=bool(row[1]))
+
+    def _put(self, key: str, value: Any, ttl: float, negative: bool):
+        now = time.time()
+        try:
+            with self._lock:
+                self.conn.execute(
+                    """
+                    INSERT INTO cache (namespace, key, value, negative, created_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(namespace, key) DO UPDATE SET
+                        value = excluded.value,
+                        negative = excluded.negative,
+                        created_at = excluded.created_at,
+                        expires_at = excluded.expires_at
+                    """,
+                    (self.namespace, key, json.dumps(value) if value is not None else None, int(negative), now, now + ttl),
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error writing {self.namespace} cache entry {key}: {e}", exc_info=True)
+
+    def set(self, key: str, value: Any, ttl: float):
+        """
+        Stores value under key for ttl seconds.
+        """
+        self._put(key, value, ttl, negative=False)
+
+    def set_negative(self, key: str, ttl: float, value: Any = None):
+        """
+        Records a lookup that found nothing for ttl seconds. value may carry a reason or partial data.
+        """
+        self._put(key, value, ttl, negative=True)
+
+    def delete(self, key: str):
+        with self._lock:
+            self.conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, time.time())
+            )
+        return cursor.rowcount
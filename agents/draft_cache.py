@@ -0,0 +1,70 @@
+# draft_cache.py
+import os
+import re
+import json
+import hashlib
+import logging
+from typing import Dict, Optional
+
+from agents.disk_cache import DiskCache
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60
+
+# Lead fields that feed the email prompt
+PROMPT_LEAD_FIELDS = ("name", "role", "company", "company_website", "location", "experience")
+# Sender fields that feed the email prompt
+PROMPT_SENDER_FIELDS = ("organization_name", "user_name")
+
+
+def _normalize(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip()
+
+
+def draft_fingerprint(lead: Dict, state: Dict, prompt_version: str) -> str:
+    """
+    Content address of a draft: a hash of everything the prompt is built from, so the same person
+    under a different profile URL (or after a state reset) maps to the same entry, and any prompt
+    change (prompt_version) maps to a new one.
+    """
+    payload = {
+        "prompt_version": prompt_version,
+        "lead": {field: _normalize(lead.get(field)) for field in PROMPT_LEAD_FIELDS},
+        "sender": {field: _normalize(state.get(field)) for field in PROMPT_SENDER_FIELDS},
+    }
+    payload["lead"]["company_website"] = payload["lead"]["company_website"].lower().rstrip("/")
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class DraftCache:
+    """
+    Cross-run cache of generated email drafts (subject and body, without the signature) keyed by draft_fingerprint,
+    and of per-company template slot values keyed by company and prompt version.
+    Entries are kept for EMAIL_DRAFT_CACHE_TTL_DAYS (default 30); fallback drafts and slots are never cached.
+    """
+
+    def __init__(self, ttl_days: Optional[float] = None):
+        self.cache = DiskCache("email_drafts")
+        self.ttl = float(ttl_days if ttl_days is not None else os.getenv("EMAIL_DRAFT_CACHE_TTL_DAYS", "30")) * DAY
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        entry = self.cache.get(fingerprint)
+        if entry is None or entry.negative:
+            return None
+        return entry.value
+
+    def put(self, fingerprint: str, subject: str, body: str):
+        self.cache.set(fingerprint, {"subject": subject, "body": body}, self.ttl)
+
+    @staticmethod
+    def slots_key(company_key: str, prompt_version: str) -> str:
+        return f"slots:{prompt_version}:{company_key}"
+
+    def get_slots(self, company_key: str, prompt_version: str) -> Optional[Dict]:
+        return self.get(self.slots_key(company_key, prompt_version))
+
+    def put_slots(self, company_key: str, prompt_version: str, slots: Dict):
+        self.cache.set(self.slots_key(company_key, prompt_version), slots, self.ttl)
@@ -0,0 +1,89 @@
+# email_patterns.py
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional
+
+# Address patterns in Hunter's notation
+PATTERNS = [
+    "{first}.{last}",
+    "{first}{last}",
+    "{f}{last}",
+    "{f}.{last}",
+    "{first}",
+    "{first}_{last}",
+    "{first}-{last}",
+    "{first}{l}",
+    "{first}.{l}",
+    "{last}.{first}",
+    "{last}{first}",
+    "{last}{f}",
+    "{last}",
+    "{f}{l}",
+]
+
+# Confidence given to a pattern Hunter reports without any named addresses backing it
+HUNTER_ONLY_CONFIDENCE = 0.6
+
+
+class DomainPattern(NamedTuple):
+    pattern: str
+    confidence: float  # 0..1
+    samples: int  # named addresses the pattern was learned from
+
+
+def normalize_name_part(value: str) -> str:
+    """ASCII, lower-case letters only: 'José-Luis' -> 'joseluis'"""
+    value = unicodedata.normalize("NFKD", value or "").encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z]", "", value.lower())
+
+
+def render_pattern(pattern: str, first_name: str, last_name: str) -> Optional[str]:
+    """
+    Local part for a name under pattern, or None if the pattern needs a name part that is missing.
+    """
+    first = normalize_name_part(first_name)
+    last = normalize_name_part(last_name)
+    if ("{first}" in pattern or "{f}" in pattern) and not first:
+        return None
+    if ("{last}" in pattern or "{l}" in pattern) and not last:
+        return None
+    return (
+        pattern.replace("{first}", first)
+        .replace("{last}", last)
+        .replace("{f}", first[:1])
+        .replace("{l}", last[:1])
+    )
+
+
+def matching_patterns(local_part: str, first_name: str, last_name: str) -> List[str]:
+    """Patterns that produce local_part for this name"""
+    local_part = (local_part or "").lower()
+    return [p for p in PATTERNS if render_pattern(p, first_name, last_name) == local_part]
+
+
+def learn_pattern(domain_data: Dict) -> Optional[DomainPattern]:
+    """
+    Learns a domain's address pattern from a Hunter domain-search response ('data' object).
+    Each named address votes for the patterns that produce it; confidence is the share of named
+    addresses that follow the winning pattern, and Hunter's own pattern counts as one extra vote.
+    """
+    hunter_pattern = domain_data.get("pattern")
+    votes = Counter()
+    named = 0
+    for entry in domain_data.get("emails") or []:
+        value = entry.get("value") or ""
+        if "@" not in value or not entry.get("first_name") or not entry.get("last_name"):
+            continue
+        named += 1
+        for pattern in matching_patterns(value.split("@")[0], entry["first_name"], entry["last_name"]):
+            votes[pattern] += 1
+
+    if votes:
+        pattern, support = votes.most_common(1)[0]
+        if hunter_pattern == pattern:
+            return DomainPattern(pattern, (support + 1) / (named + 1), named)
+        return DomainPattern(pattern, support / named, named)
+    if hunter_pattern in PATTERNS:
+        return DomainPattern(hunter_pattern, HUNTER_ONLY_CONFIDENCE, 0)
+    return None
@@ -1,5 +1,5 @@
 # email_reviewer.py
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
@@ -7,14 +7,24 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from dotenv import load_dotenv
 import os
+import time
+import random
+import asyncio
 import datetime
 import logging
+import re
 import base64
+import hashlib
 import json
-import smtplib
 from email.mime.text import MIMEText
-from openai import OpenAI
+from email.utils import parseaddr, make_msgid
 from datetime import timedelta  # Added for time check
+from agents.disk_cache import DiskCache
+from agents.lead_store import get_lead_store, lead_key
+from agents.llm import get_llm_gateway
+from agents.reply_rules import classify_reply
+from agents.review_schedule import ReviewSchedule
+from agents.smtp_pool import get_smtp_pool
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -22,23 +32,11 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-class DeepSeekClient:
-    """
-    Client for DeepSeek API, compatible with OpenAI format.
-    """
-    def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("DEEPSEEK_API_KEY"), base_url="https://api.deepseek.com/")
+MESSAGE_ID_PATTERN = re.compile(r"<[^<>\s]+>")
 
-    def chat_completions_create(self, model, messages, response_format=None):
-        params = {
-            "model": model,
-            "messages": messages
-        }
-        if response_format:
-            params["response_format"] = response_format
-        return self.client.chat.completions.create(**params)
-
-deepseek_client = DeepSeekClient()
+# Gmail keeps mailbox history for at least a week; an expired historyId answers 404 and triggers a full scan
+HISTORY_ID_TTL = 30 * 24 * 60 * 60
+DAY = 24 * 60 * 60
 
 class EmailReviewerAgent:
     """
@@ -48,6 +46,19 @@ class EmailReviewerAgent:
     - Analyzes reply content for intent/interest.
     - Sends follow-up based on classification.
     - Merged: Handles time-based follow-up nudges for non-replied leads.
+    - Gmail searches and message fetches go out as batch HTTP requests (GMAIL_BATCH_SIZE calls each),
+      replies are marked read with one batchModify, and reviewed leads are saved in one transaction.
+    - Incremental sync (GMAIL_SYNC_MODE=incremental): after a first full scan, only messages added since
+      the stored historyId are read (users.history.list) and matched to leads through their
+      In-Reply-To/References headers (Message-IDs recorded at send time), or by sender and subject.
+    - Bounces, auto-replies and short unsubscribe/"not interested" answers are classified by local rules
+      (agents/reply_rules.py); only the remaining replies are analyzed by the LLM.
+    - Replies are classified concurrently in their own stage (bounded by the gateway's DeepSeek limits), and
+      analyses are cached on disk by Gmail message id and body hash, so re-reviewing a reply is free.
+    - Each pending lead gets a next_review_at on a decaying schedule (ReviewSchedule) that stops after a
+      cutoff; only leads due in the lead store's next_review_at index are searched, marked pending or nudged.
+      Incremental sync still matches new mail against every lead whose window is open, so early replies are
+      not missed; leads past the cutoff are left out of both the searches and the matching.
     """
     name = "email_reviewer"
     description = "Reviews and parses emails for replies and stages"
@@ -62,7 +73,20 @@ class EmailReviewerAgent:
         ]
         self.credentials_path = os.getenv("GOOGLE_OAUTH_CREDENTIALS_PATH")
         self.token_path = 'token.json'
+        self.mailbox = "me"
         self.service = self.get_gmail_service()
+        self.lead_store = get_lead_store()
+        self.llm = get_llm_gateway()
+        self.smtp_pool = get_smtp_pool()
+        # Gmail allows up to 100 calls per batch request; larger batches are more likely to be rate limited
+        self.gmail_batch_size = min(max(int(os.getenv("GMAIL_BATCH_SIZE", "50")), 1), 100)
+        self.gmail_batch_retries = int(os.getenv("GMAIL_BATCH_MAX_RETRIES", "3"))
+        self.sync_mode = os.getenv("GMAIL_SYNC_MODE", "incremental").lower()
+        self.sync_state = DiskCache("gmail_sync")
+        self.triage = {}
+        self.analysis_cache = DiskCache("reply_analysis")
+        self.analysis_cache_ttl = float(os.getenv("REPLY_ANALYSIS_CACHE_TTL_DAYS", "90")) * DAY
+        self.schedule = ReviewSchedule.from_env()
 
     def get_gmail_service(self):
         """
@@ -92,85 +116,268 @@ class EmailReviewerAgent:
                     with open(self.token_path, 'w') as token:  # Save again
                             token.write(creds.to_json())
             service = build('gmail', 'v1', credentials=creds)
-            service.users().getProfile(userId="me").execute()
+            profile = service.users().getProfile(userId="me").execute()
+            self.mailbox = profile.get("emailAddress", "me")
             logger.info("Gmail API initialized with full scopes.")
             return service
         except Exception as e:
             logger.error(f"Failed to initialize Gmail service: {str(e)}", exc_info=True)
             return None
 
-    def save_leads_state(self, leads):
+    def execute_batch(self, requests: Dict[str, object]) -> Dict[str, Dict]:
         """
-        Saves the updated leads state to final_leads.json immediately.
+        Executes Gmail API requests (request id -> HttpRequest) as batch HTTP requests of up to
+        gmail_batch_size calls each. Returns request id -> response for the calls that succeeded.
+        Calls throttled by Gmail (429) or failing with a 5xx are retried in a later batch with backoff;
+        other failures are logged and left out.
         """
-        leads_file = "outputs/final_leads.json"
-        try:
-            with open(leads_file, "w") as f:
-                json.dump(leads, f, indent=2)
-            logger.info(f"Updated leads saved to {leads_file} after processing")
-        except Exception as e:
-            logger.error(f"Error saving leads: {e}", exc_info=True)
+        responses = {}
+        pending = dict(requests)
+        for attempt in range(self.gmail_batch_retries + 1):
+            retry = {}
 
-    async def run(self, state):
-        logger.info(f"[{datetime.datetime.now()}] Starting email_reviewer")
-        if self.service is None:
-            logger.warning("Gmail service not available.")
-            return {"leads": state.get("leads", [])}
+            def callback(request_id, response, exception):
+                if exception is None:
+                    responses[request_id] = response
+                    return
+                status = getattr(getattr(exception, "resp", None), "status", None)
+                if status is not None and (int(status) == 429 or int(status) >= 500):
+                    retry[request_id] = pending[request_id]
+                else:
+                    logger.error(f"Gmail request {request_id} failed: {exception}")
 
-        leads = state.get("leads", [])
+            ids = list(pending)
+            for start in range(0, len(ids), self.gmail_batch_size):
+                chunk = ids[start:start + self.gmail_batch_size]
+                batch = self.service.new_batch_http_request(callback=callback)
+                for request_id in chunk:
+                    batch.add(pending[request_id], request_id=request_id)
+                try:
+                    batch.execute()
+                except Exception as e:
+                    # The whole batch failed (network error, auth): retry every call in it that has no result
+                    logger.warning(f"Gmail batch of {len(chunk)} requests failed: {e!r}")
+                    retry.update({rid: pending[rid] for rid in chunk if rid not in responses})
+
+            if not retry:
+                break
+            if attempt < self.gmail_batch_retries:
+                delay = min(2 ** attempt, 30) * random.uniform(0.5, 1.5)
+                logger.warning(f"Retrying {len(retry)} throttled Gmail requests in {delay:.1f}s")
+                time.sleep(delay)
+            else:
+                logger.error(f"Giving up on {len(retry)} Gmail requests after {attempt + 1} attempts")
+            pending = retry
+        return responses
+
+    @staticmethod
+    def extract_body(msg_data: Dict) -> str:
+        """Plain-text body of a message fetched with format="full" """
+        payload = msg_data.get("payload", {})
+        if "parts" in payload:
+            for part in payload.get("parts", []):
+                if part.get("mimeType") == "text/plain" and "body" in part and "data" in part["body"]:
+                    return base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8")
+        elif "body" in payload and "data" in payload["body"]:
+            return base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8")
+        return ""
+
+    def select_candidates(self, leads: List[Dict]) -> List[Dict]:
+        """Leads that were emailed, have not replied yet and whose review window is still open"""
         lead_emails = {lead.get("email", "") for lead in leads if lead.get("role", "")}
+        now = datetime.datetime.now()
+        candidates = []
+        for lead in leads:
+            if lead.get("email_review", {}).get("status") == "replied":
+                logger.info(f"Skipping already replied lead: {lead.get('profile_url', 'unknown')}")
+                continue
+            if "next_review_at" in lead and lead["next_review_at"] is None:
+                continue  # Past REVIEW_CUTOFF_DAYS: neither searched nor matched against new mail
+            if not lead.get("email_draft", {}).get("subject", ""):
+                continue
+            lead_email = lead.get("email", "")
+            if not lead.get("email_sent", False) or not lead_email or lead_email not in lead_emails:
+                continue
+            if self.schedule.next_review_at(self.sent_time(lead), now) is None:
+                continue  # Window closed before the lead was ever scheduled (e.g. sent before review scheduling)
+            candidates.append(lead)
+        return candidates
 
-        try:
-            for i, lead in enumerate(leads):
-                review = lead.get("email_review", {})
-                if review.get("status") == "replied":
-                    logger.info(f"Skipping already replied lead: {lead.get('profile_url', 'unknown')}")
-                    continue  # Skip if already replied
-
-                email_draft = lead.get("email_draft", {})
-                subject = email_draft.get("subject", "")
-                if not subject:
-                    continue  # Skip if no subject
-                sent_time_str = lead.get("email_sent_time", "")
-                lead_email = lead.get("email", "")
-
-                if not lead.get("email_sent", False) or not lead_email or lead_email not in lead_emails:
-                    continue
+    @staticmethod
+    def sent_time(lead: Dict) -> datetime.datetime:
+        sent_time_str = lead.get("email_sent_time", "")
+        return datetime.datetime.fromisoformat(sent_time_str) if sent_time_str else datetime.datetime.min
 
-                # Query for replies: subject matches original or Re:, from lead_email, after sent_time
-                sent_time = datetime.datetime.fromisoformat(sent_time_str) if sent_time_str else datetime.datetime.min
-                query = f"from:{lead_email} subject:(\"{subject}\" OR \"Re: {subject}\") after:{int(sent_time.timestamp())}"
-                try:
-                    results = self.service.users().messages().list(userId="me", q=query).execute()
-                    messages = results.get("messages", [])
-                except HttpError as e:
-                    logger.error(f"Gmail query error: {e}", exc_info=True)
-                    messages = []
-
-                if messages:
-                    # Process first matching reply (assume latest)
-                    msg_id = messages[0]["id"]
-                    try:
-                        msg_data = self.service.users().messages().get(userId="me", id=msg_id, format="full").execute()
-                        payload = msg_data.get("payload", {})
-                        body_data = ""
-                        if "parts" in payload:
-                            for part in payload.get("parts", []):
-                                if part.get("mimeType") == "text/plain" and "body" in part and "data" in part["body"]:
-                                    body_data = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8")
-                                    break
-                        elif "body" in payload and "data" in payload["body"]:
-                            body_data = base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8")
-                    except HttpError as e:
-                        logger.error(f"Error getting message {msg_id}: {e}", exc_info=True)
-                        body_data = ""
-
-                    if not body_data:
-                        logger.warning(f"No body data for message {msg_id}")
+    def reply_query(self, lead: Dict) -> str:
+        # Replies: subject matches original or Re:, from the lead's address, after the send time
+        subject = lead.get("email_draft", {}).get("subject", "")
+        return f"from:{lead.get('email', '')} subject:(\"{subject}\" OR \"Re: {subject}\") after:{int(self.sent_time(lead).timestamp())}"
+
+    def due_ids(self, candidates: List[Dict]) -> set:
+        """Indexes (as request ids) of the candidates whose reply check is due, from the lead store's index"""
+        due_keys = set(self.lead_store.due_for_review(datetime.datetime.now().isoformat()))
+        return {str(i) for i, lead in enumerate(candidates) if lead_key(lead) in due_keys}
+
+    def find_replies(self, leads_by_id: Dict[str, Dict]) -> Dict[str, Optional[str]]:
+        """
+        One batched messages.list per chunk of leads. Returns request id -> id of the first matching
+        message (None when there is no reply); leads whose query failed are left out.
+        """
+        messages = self.service.users().messages()
+        responses = self.execute_batch({
+            request_id: messages.list(userId="me", q=self.reply_query(lead)) for request_id, lead in leads_by_id.items()
+        })
+        hits = {}
+        for request_id, result in responses.items():
+            found = result.get("messages", [])
+            # Process first matching reply (assume latest)
+            hits[request_id] = found[0]["id"] if found else None
+        return hits
+
+    def history_key(self) -> str:
+        return f"history_id:{self.mailbox}"
+
+    def current_history_id(self) -> Optional[str]:
+        return self.service.users().getProfile(userId="me").execute().get("historyId")
+
+    def list_history(self, start_history_id: str) -> Tuple[List[str], Optional[str]]:
+        """
+        Ids of messages received since start_history_id (our own sent mail and drafts excluded) and the
+        mailbox's latest historyId. Raises HttpError 404 when start_history_id has expired.
+        """
+        msg_ids, latest, page_token = [], None, None
+        while True:
+            params = {"userId": "me", "startHistoryId": start_history_id, "historyTypes": ["messageAdded"], "maxResults": 500}
+            if page_token:
+                params["pageToken"] = page_token
+            result = self.service.users().history().list(**params).execute()
+            latest = result.get("historyId", latest)
+            for record in result.get("history", []):
+                for added in record.get("messagesAdded", []):
+                    message = added.get("message", {})
+                    labels = message.get("labelIds", [])
+                    if "SENT" in labels or "DRAFT" in labels:
                         continue
+                    msg_ids.append(message["id"])
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return list(dict.fromkeys(msg_ids)), latest
+
+    @staticmethod
+    def thread_index(candidates: List[Dict]) -> Dict[str, int]:
+        """Message-ID of every email we sent a candidate (outreach and nudge) -> candidate index"""
+        index = {}
+        for i, lead in enumerate(candidates):
+            for field in ("email_message_id", "follow_up_message_id"):
+                if lead.get(field):
+                    index[lead[field]] = i
+        return index
+
+    def match_new_messages(self, candidates: List[Dict], msg_ids: List[str]) -> Tuple[Dict[str, Optional[str]], bool]:
+        """
+        Matches new messages to leads using only their headers (batched metadata fetches): a reply whose
+        In-Reply-To/References names one of our Message-IDs is a dictionary lookup, even with an edited subject;
+        mail without them falls back to an email -> lead index plus the subject. Returns candidate index ->
+        latest matching message id (or None) and whether every message could be read.
+        """
+        threads = self.thread_index(candidates)
+        senders = {}
+        for i, lead in enumerate(candidates):
+            senders.setdefault(lead.get("email", "").lower(), []).append(i)
+        hits = {str(i): None for i in range(len(candidates))}
+        received_at = {}
+        messages = self.service.users().messages()
+        responses = self.execute_batch({
+            msg_id: messages.get(
+                userId="me", id=msg_id, format="metadata",
+                metadataHeaders=["From", "Subject", "In-Reply-To", "References"],
+            )
+            for msg_id in msg_ids
+        })
+        for msg_id, msg_data in responses.items():
+            headers = self.message_headers(msg_data)
+            received = datetime.datetime.fromtimestamp(int(msg_data.get("internalDate", 0)) / 1000)
+            referenced = MESSAGE_ID_PATTERN.findall(f"{headers.get('in-reply-to', '')} {headers.get('references', '')}")
+            matched = {threads[ref] for ref in referenced if ref in threads}
+            if not matched:
+                sender = parseaddr(headers.get("from", ""))[1].lower()
+                subject = headers.get("subject", "").lower()
+                matched = {
+                    i for i in senders.get(sender, [])
+                    if candidates[i].get("email_draft", {}).get("subject", "").lower() in subject
+                    and received >= self.sent_time(candidates[i])
+                }
+            for i in matched:
+                if received >= received_at.get(i, received):
+                    received_at[i] = received
+                    hits[str(i)] = msg_id
+        return hits, len(responses) == len(msg_ids)
 
-                    # Analyze with DeepSeek, force JSON
-                    prompt = """
+    def find_new_replies(self, candidates: List[Dict], due: set) -> Tuple[Dict[str, Optional[str]], Optional[str]]:
+        """
+        Candidate index -> id of the lead's reply (None when there is none), and the historyId to resume from
+        once these replies are saved (None when some lead or message could not be checked). Reads only the mail
+        added since the last sync when a historyId is stored, matching it against every candidate. Otherwise
+        runs one search per lead: every candidate when (re)starting incremental sync, only the due ones with
+        GMAIL_SYNC_MODE=full.
+        """
+        entry = self.sync_state.get(self.history_key()) if self.sync_mode == "incremental" else None
+        if entry is not None and entry.value:
+            try:
+                msg_ids, latest = self.list_history(entry.value)
+                hits, complete = self.match_new_messages(candidates, msg_ids) if msg_ids else (
+                    {str(i): None for i in range(len(candidates))}, True
+                )
+                logger.info(f"Incremental Gmail sync: {len(msg_ids)} new messages since history {entry.value}")
+                return hits, (latest or entry.value) if complete else None
+            except HttpError as e:
+                if getattr(e.resp, "status", None) != 404:
+                    raise
+                logger.warning(f"Gmail history {entry.value} has expired; running a full scan")
+
+        incremental = self.sync_mode == "incremental"
+        scan = {str(i): lead for i, lead in enumerate(candidates) if incremental or str(i) in due}
+        # Taken before the scan, so mail arriving while it runs is picked up by the next sync
+        start_history_id = self.current_history_id() if incremental else None
+        hits = self.find_replies(scan) if scan else {}
+        return hits, start_history_id if len(hits) == len(scan) else None
+
+    def save_history_id(self, history_id: Optional[str]):
+        """Moves the incremental sync cursor; called only once the replies read up to it are saved"""
+        if history_id:
+            self.sync_state.set(self.history_key(), history_id, HISTORY_ID_TTL)
+
+    @staticmethod
+    def message_headers(msg_data: Dict) -> Dict[str, str]:
+        """Top-level headers of a fetched message, keyed by lower-cased name"""
+        return {h.get("name", "").lower(): h.get("value", "") for h in msg_data.get("payload", {}).get("headers", [])}
+
+    def fetch_replies(self, msg_ids: List[str]) -> Dict[str, Tuple[Dict[str, str], str]]:
+        """Message id -> (headers, plain-text body), fetched with batched messages.get calls"""
+        messages = self.service.users().messages()
+        responses = self.execute_batch({
+            msg_id: messages.get(userId="me", id=msg_id, format="full") for msg_id in set(msg_ids)
+        })
+        return {
+            msg_id: (self.message_headers(msg_data), self.extract_body(msg_data))
+            for msg_id, msg_data in responses.items()
+        }
+
+    def mark_read(self, msg_ids: List[str]):
+        """Removes UNREAD from the replies with batchModify (up to 1000 ids per call)"""
+        for start in range(0, len(msg_ids), 1000):
+            chunk = msg_ids[start:start + 1000]
+            try:
+                self.service.users().messages().batchModify(
+                    userId="me", body={"ids": chunk, "removeLabelIds": ["UNREAD"]}
+                ).execute()
+            except HttpError as e:
+                logger.error(f"Error marking {len(chunk)} emails as read: {e}", exc_info=True)
+
+    async def analyze_reply(self, body_data: str, msg_id: str) -> Tuple[Dict, bool]:
+        """The LLM analysis of a reply, and whether it succeeded (failures fall back to defaults)"""
+        # Analyze with DeepSeek, force JSON
+        prompt = """
     You must respond with valid JSON only. No additional text, no explanations, no markdown. The response must be a single JSON object starting with { and ending with }.
     Analyze the reply: {body_data}
     Classify interest:
@@ -181,106 +388,241 @@ class EmailReviewerAgent:
     JSON structure: {{"summary": "brief summary", "interest": "interested/not_interested/other", "meeting_details": {{"start": {{"dateTime": "YYYY-MM-DDTHH:MM:SS", "timeZone": "timezone"}}, "end": {{"dateTime": "YYYY-MM-DDTHH:MM:SS", "timeZone": "timezone"}}}} or null if no meeting}}
     Ensure all keys are present and values are correct types. If parse fails, use defaults like null for meeting_details.
     """.replace("{body_data}", body_data)
-                    try:
-                        response = deepseek_client.chat_completions_create(
-                            "deepseek-chat", 
-                            [{"role": "user", "content": prompt}],
-                            response_format={"type": "json_object"}
-                        )
-                        raw_content = response.choices[0].message.content if response and response.choices else "{}"
-                        logger.info(f"Raw LLM response: {raw_content}")
-                    except Exception as e:
-                        logger.error(f"Error analyzing with DeepSeek: {e}", exc_info=True)
-                        raw_content = "{}"
-
-                    try:
-                        interest_json = json.loads(raw_content)
-                        # Ensure all keys exist to avoid KeyError
-                        required_keys = ["summary", "interest", "meeting_details"]
-                        for key in required_keys:
-                            if key not in interest_json:
-                                interest_json[key] = None if key == "meeting_details" else "other" if key == "interest" else "Parse error"
-                    except json.JSONDecodeError as e:
-                        logger.error(f"JSON parse error: {str(e)}. Raw: {raw_content}", exc_info=True)
-                        interest_json = {"summary": "Parse error", "interest": "other", "meeting_details": None}
-
-                    lead["email_review"] = {
-                        "status": "replied",
-                        "full_body": body_data,
-                        "analysis": interest_json
-                    }
-
-                    # Store replied JSON
-                    replied_data = {
-                        "name": lead.get("name", "Unknown"),
-                        "company": lead.get("company", "Unknown"),
-                        "linkedin_url": lead.get("profile_url", "Unknown"),
-                        "reply_body": body_data,
-                        "analysis": interest_json
-                    }
-                    replied_path = f"outputs/replied/{lead.get('profile_url', 'unknown').replace('/', '_')}.json"
-                    try:
-                        with open(replied_path, "w") as f:
-                            json.dump(replied_data, f, indent=2)
-                        logger.info(f"Saved replied JSON at {replied_path}")
-                    except Exception as e:
-                        logger.error(f"Error saving replied JSON: {e}", exc_info=True)
-
-                    # Mark as read
-                    try:
-                        self.service.users().messages().modify(userId="me", id=msg_id, body={"removeLabelIds": ["UNREAD"]}).execute()
-                    except HttpError as e:
-                        logger.error(f"Error marking email as read: {e}", exc_info=True)
-                else:
-                    # Non-replied (pending)
-                    lead["email_review"] = {"status": "pending"}
-                    non_replied_data = {
-                        "name": lead.get("name", "Unknown"),
-                        "company": lead.get("company", "Unknown"),
-                        "company_url": lead.get("company_url", "Unknown"),
-                        "profile_url": lead.get("profile_url", "Unknown")
-                    }
-                    non_replied_path = f"outputs/non_replied/{lead.get('profile_url', 'unknown').replace('/', '_')}.json"
-                    try:
-                        with open(non_replied_path, "w") as f:
-                            json.dump(non_replied_data, f, indent=2)
-                        logger.info(f"Saved non-replied JSON at {non_replied_path}")
-                    except Exception as e:
-                        logger.error(f"Error saving non-replied JSON: {e}", exc_info=True)
-
-                    # Merged follow-up logic: Check time and send nudge if exceeded
-                    if lead.get("email_sent", False) and (datetime.datetime.now() - sent_time) >= timedelta(days=1) and "follow_up_sent" not in lead:
-                        prompt = f"Generate polite nudge email for lead {lead.get('profile_url', 'unknown')} - no reply yet."
-                        try:
-                            response = deepseek_client.chat_completions_create("deepseek-chat", [{"role": "user", "content": prompt}])
-                            follow_up_text = response.choices[0].message.content if response and response.choices else "Follow-up message."
-                        except Exception as e:
-                            logger.error(f"Error generating nudge with DeepSeek: {e}", exc_info=True)
-                            follow_up_text = "Follow-up message."
-
-                        to_email = lead.get("email", "")
-                        subject = lead.get("email_draft", {}).get("subject", "Follow-up")
-                        msg = MIMEText(follow_up_text)
-                        msg["Subject"] = f"Re: {subject}"
-                        msg["From"] = os.getenv("SMTP_USER")
-                        msg["To"] = to_email
-                        try:
-                            with smtplib.SMTP(os.getenv("SMTP_HOST"), 587) as server:
-                                server.starttls()
-                                server.login(os.getenv("SMTP_USER"), os.getenv("SMTP_PASSWORD"))
-                                server.send_message(msg)
-                            lead["follow_up_sent"] = True
-                            logger.info(f"Follow-up sent to {to_email}")
-                        except Exception as e:
-                            logger.error(f"Error sending nudge: {e}", exc_info=True)
-
-                # Save main leads JSON after each lead
-                self.save_leads_state(leads)
+        try:
+            # Not cached by the gateway: analyses are cached once, in the reply_analysis namespace (see classify)
+            response = await self.llm.generate(
+                "deepseek", "deepseek-chat", prompt, json_output=True, cache=False, label=msg_id
+            )
+            raw_content = response.text or "{}"
+            logger.info(f"Raw LLM response: {raw_content}")
+            self.triage["llm_calls"] += 1
+            self.triage["llm_seconds"] += response.latency
+        except Exception as e:
+            logger.error(f"Error analyzing with DeepSeek: {e}", exc_info=True)
+            return {"summary": "Parse error", "interest": "other", "meeting_details": None}, False
+
+        try:
+            interest_json = json.loads(raw_content)
+            # Ensure all keys exist to avoid KeyError
+            required_keys = ["summary", "interest", "meeting_details"]
+            for key in required_keys:
+                if key not in interest_json:
+                    interest_json[key] = None if key == "meeting_details" else "other" if key == "interest" else "Parse error"
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON parse error: {str(e)}. Raw: {raw_content}", exc_info=True)
+            return {"summary": "Parse error", "interest": "other", "meeting_details": None}, False
+        return interest_json, True
+
+    @staticmethod
+    def analysis_key(msg_id: str, body_data: str) -> str:
+        return f"{msg_id}:{hashlib.sha256(body_data.encode('utf-8')).hexdigest()}"
+
+    async def classify(self, headers: Dict[str, str], body_data: str, msg_id: str) -> Tuple[Optional[Dict], str]:
+        """
+        Analysis of a reply and what produced it: "rules:<rule>" for obvious replies, "llm" for the rest.
+        The analysis is None when the LLM call failed or its output could not be parsed.
+        """
+        self.triage["replies"] += 1
+        match = classify_reply(headers, body_data)
+        if match is not None:
+            self.triage["rules"][match.rule] = self.triage["rules"].get(match.rule, 0) + 1
+            logger.info(f"Reply {msg_id} classified by rule '{match.rule}'")
+            return match.analysis, f"rules:{match.rule}"
+
+        key = self.analysis_key(msg_id, body_data)
+        entry = self.analysis_cache.get(key)
+        if entry is not None and not entry.negative:
+            self.triage["cache_hits"] += 1
+            return entry.value, "llm"
+        analysis, ok = await self.analyze_reply(body_data, msg_id)
+        if not ok:
+            return None, "llm"
+        self.analysis_cache.set(key, analysis, self.analysis_cache_ttl)
+        return analysis, "llm"
+
+    async def classify_all(self, replies: List[Tuple[str, Dict[str, str], str]]) -> List[Tuple[Optional[Dict], str]]:
+        """
+        Classifies (msg_id, headers, body) replies concurrently; LLM calls are bounded by the gateway's
+        DeepSeek concurrency and rate limits (LLM_DEEPSEEK_CONCURRENCY).
+        """
+        start = time.monotonic()
+        results = await asyncio.gather(*(self.classify(headers, body, msg_id) for msg_id, headers, body in replies))
+        if replies:
+            logger.info(f"Classified {len(replies)} replies in {time.monotonic() - start:.2f}s")
+        return results
+
+    def log_triage(self):
+        replies, rules = self.triage["replies"], self.triage["rules"]
+        if not replies:
+            return
+        hits = sum(rules.values())
+        breakdown = ", ".join(f"{rule}={count}" for rule, count in sorted(rules.items()))
+        if self.triage["llm_calls"]:
+            avg = self.triage["llm_seconds"] / self.triage["llm_calls"]
+            saved = f"~{hits * avg:.1f}s of LLM time saved ({hits} calls at {avg:.2f}s avg)"
+        else:
+            saved = f"{hits} LLM calls saved"
+        logger.info(f"Reply pre-classifier: {hits}/{replies} replies ({hits / replies:.0%}) resolved by rules"
+                    f"{f' ({breakdown})' if breakdown else ''}, {saved}; "
+                    f"{self.triage['cache_hits']} analyses from cache, {self.triage['llm_calls']} LLM calls")
+
+    def schedule_review(self, lead: Dict):
+        """Sets when the pending lead is checked next; None once its review window has closed"""
+        next_review = self.schedule.next_review_at(self.sent_time(lead), datetime.datetime.now())
+        lead["next_review_at"] = next_review.isoformat() if next_review else None
+        if next_review is None:
+            logger.info(f"No reply from {lead.get('profile_url', 'unknown')} within the review window; no more checks")
+
+    def save_replied(self, lead: Dict, body_data: str, interest_json: Dict, classifier: str = "llm"):
+        lead["next_review_at"] = None
+        lead["email_review"] = {
+            "status": "replied",
+            "full_body": body_data,
+            "analysis": interest_json,
+            "classifier": classifier
+        }
+
+        # Store replied JSON
+        replied_data = {
+            "name": lead.get("name", "Unknown"),
+            "company": lead.get("company", "Unknown"),
+            "linkedin_url": lead.get("profile_url", "Unknown"),
+            "reply_body": body_data,
+            "analysis": interest_json
+        }
+        replied_path = f"outputs/replied/{lead.get('profile_url', 'unknown').replace('/', '_')}.json"
+        try:
+            with open(replied_path, "w") as f:
+                json.dump(replied_data, f, indent=2)
+            logger.info(f"Saved replied JSON at {replied_path}")
+        except Exception as e:
+            logger.error(f"Error saving replied JSON: {e}", exc_info=True)
+
+    def save_pending(self, lead: Dict):
+        # Non-replied (pending)
+        lead["email_review"] = {"status": "pending"}
+        non_replied_data = {
+            "name": lead.get("name", "Unknown"),
+            "company": lead.get("company", "Unknown"),
+            "company_url": lead.get("company_url", "Unknown"),
+            "profile_url": lead.get("profile_url", "Unknown")
+        }
+        non_replied_path = f"outputs/non_replied/{lead.get('profile_url', 'unknown').replace('/', '_')}.json"
+        try:
+            with open(non_replied_path, "w") as f:
+                json.dump(non_replied_data, f, indent=2)
+            logger.info(f"Saved non-replied JSON at {non_replied_path}")
+        except Exception as e:
+            logger.error(f"Error saving non-replied JSON: {e}", exc_info=True)
+
+    async def send_nudge(self, lead: Dict):
+        # Merged follow-up logic: send a nudge once a day has passed without a reply
+        if not lead.get("email_sent", False) or "follow_up_sent" in lead:
+            return
+        if datetime.datetime.now() - self.sent_time(lead) < timedelta(days=1):
+            return
+        prompt = f"Generate polite nudge email for lead {lead.get('profile_url', 'unknown')} - no reply yet."
+        try:
+            response = await self.llm.generate("deepseek", "deepseek-chat", prompt, label=lead.get('profile_url', 'unknown'))
+            follow_up_text = response.text or "Follow-up message."
+        except Exception as e:
+            logger.error(f"Error generating nudge with DeepSeek: {e}", exc_info=True)
+            follow_up_text = "Follow-up message."
+
+        to_email = lead.get("email", "")
+        subject = lead.get("email_draft", {}).get("subject", "Follow-up")
+        sender = os.getenv("SMTP_USER") or ""
+        msg = MIMEText(follow_up_text)
+        msg["Subject"] = f"Re: {subject}"
+        msg["From"] = sender
+        msg["To"] = to_email
+        # Thread the nudge under the original email; replies to it are matched by its own Message-ID
+        message_id = make_msgid(domain=sender.rsplit("@", 1)[-1] if "@" in sender else None)
+        msg["Message-ID"] = message_id
+        if lead.get("email_message_id"):
+            msg["In-Reply-To"] = lead["email_message_id"]
+            msg["References"] = lead["email_message_id"]
+        try:
+            await asyncio.to_thread(self.smtp_pool.send, msg)
+            lead["follow_up_sent"] = True
+            lead["follow_up_message_id"] = message_id
+            logger.info(f"Follow-up sent to {to_email}")
+        except Exception as e:
+            logger.error(f"Error sending nudge: {e}", exc_info=True)
+
+    async def run(self, state):
+        logger.info(f"[{datetime.datetime.now()}] Starting email_reviewer")
+        if self.service is None:
+            logger.warning("Gmail service not available.")
+            return {"leads": state.get("leads", [])}
+
+        leads = state.get("leads", [])
+        reviewed = []
+        # The sync cursor only moves past replies that were classified and saved
+        next_history_id, completed = None, False
+        self.triage = {"replies": 0, "rules": {}, "cache_hits": 0, "llm_calls": 0, "llm_seconds": 0.0}
+
+        try:
+            # 1. Open leads and the ones due for a check, 2. new replies (incremental sync or batched searches),
+            # 3. batched fetch of replies
+            candidates = self.select_candidates(leads)
+            due = self.due_ids(candidates)
+            hits, next_history_id = await asyncio.to_thread(self.find_new_replies, candidates, due) if candidates else ({}, None)
+            reply_ids = [msg_id for msg_id in hits.values() if msg_id]
+            replies = await asyncio.to_thread(self.fetch_replies, reply_ids) if reply_ids else {}
+            logger.info(f"Checked {len(candidates)} open leads ({len(due)} due for review): {len(reply_ids)} replied")
+
+            # 4. Pending leads (and nudges); replies with a body go on to classification
+            to_classify = []
+            for i, lead in enumerate(candidates):
+                if str(i) not in hits:
+                    continue  # Query failed; checked again next run
+                msg_id = hits[str(i)]
+                if msg_id is None:
+                    if str(i) not in due:
+                        continue  # No reply yet and not due: nothing to update
+                    self.save_pending(lead)
+                    await self.send_nudge(lead)
+                    self.schedule_review(lead)
+                    reviewed.append(lead)
+                    continue
+                headers, body_data = replies.get(msg_id, ({}, ""))
+                if not body_data:
+                    # Leave the cursor where it is, so the reply is read again next run
+                    logger.warning(f"No body data for message {msg_id}; it will be checked again next run")
+                    next_history_id = None
+                    continue
+                to_classify.append((lead, msg_id, headers, body_data))
+
+            # 5. Classify every reply concurrently, then update the replied leads
+            results = await self.classify_all([(msg_id, headers, body) for _, msg_id, headers, body in to_classify])
+            read_ids = []
+            for (lead, msg_id, _, body_data), (analysis, classifier) in zip(to_classify, results):
+                if analysis is None:
+                    # Lead stays unreplied and the cursor stays put, so the reply is analyzed again next run
+                    logger.warning(f"Analysis of reply {msg_id} failed; it will be analyzed again next run")
+                    next_history_id = None
+                    continue
+                self.save_replied(lead, body_data, analysis, classifier)
+                read_ids.append(msg_id)
+                reviewed.append(lead)
+
+            # 6. Mark replies as read and persist every reviewed lead in one transaction
+            if read_ids:
+                await asyncio.to_thread(self.mark_read, read_ids)
+            completed = True
 
         except HttpError as e:
             logger.error(f"Gmail error: {str(e)}", exc_info=True)
         except Exception as e:
             logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+        finally:
+            saved = self.lead_store.upsert_many(reviewed) == len(reviewed) if reviewed else True
+            if completed and saved:
+                self.save_history_id(next_history_id)
+            elif next_history_id:
+                logger.warning("Review did not complete; the Gmail sync cursor was not advanced")
+            self.log_triage()
 
         logger.info(f"[{datetime.datetime.now()}] Completed email_reviewer")
-        return {"leads": leads}
\ No newline at end of file
+        return {"leads": leads}
@@ -0,0 +1,71 @@
+# email_templates.py
+import jinja2
+from pydantic import BaseModel
+
+# Only these parts of an outreach email are personalised; they depend on the company, not the person,
+# so they are generated once per company and shared by every lead there.
+class CompanySlots(BaseModel):
+    subject: str
+    industry: str
+    user_experience: str
+    operational_efficiency: str
+    smarter_decisions: str
+
+
+# Used when slot generation fails, so the lead still gets a complete (if generic) email
+DEFAULT_SLOTS = CompanySlots(
+    subject="",
+    industry="your domain",
+    user_experience="We build AI-driven personalization layers that improve user engagement and retention.",
+    operational_efficiency="From automating internal workflows to improving QA/testing cycles, our AI tools streamline your team's day-to-day.",
+    smarter_decisions="We help teams make data-backed decisions with intelligent analytics and forecasting models.",
+)
+
+SUBJECT_TEMPLATE = "{{ slots.subject or 'Exploring AI Possibilities for ' ~ company }}"
+
+BODY_TEMPLATE = """
+<p>Hi {{ first_name }},</p>
+<p>I hope you're doing well.</p>
+<p>I'm {{ user_name }} from {{ org_name }}. I came across the exciting work you're doing at {{ company }}, especially in {{ slots.industry }}. It caught my attention because it aligns with some of the AI-led transformations we're helping companies implement across similar domains.</p>
+<p>At {{ org_name }}, we're enabling businesses to unlock value through custom AI solutions — with a focus on real outcomes, not buzzwords. Here's how we typically add value:</p>
+<ul>
+<li><strong>Enhance User Experience</strong>: {{ slots.user_experience }}</li>
+<li><strong>Boost Operational Efficiency</strong>: {{ slots.operational_efficiency }}</li>
+<li><strong>Enable Smarter Decisions</strong>: {{ slots.smarter_decisions }}</li>
+</ul>
+<p>If any of these areas resonate with what you're working on, I'd love to exchange ideas or explore if there's a fit.</p>
+<p>Would you be open to a short call sometime next week to discuss where AI might make the biggest impact for {{ company }}?</p>
+"""
+
+SLOTS_INSTRUCTION = """
+IMPORTANT: Output ONLY a JSON object with the keys 'subject', 'industry', 'user_experience', 'operational_efficiency' and 'smarter_decisions'. NO other text, NO explanations, NO HTML.
+
+The values are inserted into a fixed outreach email from an AI services company to people at the company given in the user message:
+- subject: 8-12 words, benefit-focused, naming the company, e.g. 'Exploring AI Possibilities for Acme Corp's Apps'
+- industry: a short phrase completing "I came across the exciting work you're doing at <company>, especially in ...", inferred from the website or roles, e.g. 'wellness app development for meditation, fitness, and nutrition'
+- user_experience: one sentence on how AI-driven personalization would help this company's users
+- operational_efficiency: one sentence on how automating workflows would help this company's teams
+- smarter_decisions: one sentence on how analytics and forecasting would help this company decide
+
+Tone: Professional, warm, conversational—like a peer from India. Short sentences, no sales clichés ('significant value', 'game-changer'). Ban: email addresses, links.
+"""
+
+# Compiled once at import; the body is HTML so values are escaped, the subject is plain text
+_html_env = jinja2.Environment(autoescape=True)
+_text_env = jinja2.Environment(autoescape=False)
+subject_template = _text_env.from_string(SUBJECT_TEMPLATE)
+body_template = _html_env.from_string(BODY_TEMPLATE.strip())
+
+
+def render_email(slots: CompanySlots, lead: dict, org_name: str, user_name: str) -> dict:
+    """
+    Renders the templated subject and HTML body for a lead from its company's slot values (signature not included).
+    """
+    context = {
+        "slots": slots,
+        "first_name": lead.get("name", "there").split()[0] if lead.get("name") else "there",
+        "company": lead.get("company") or "your company",
+        "org_name": org_name,
+        "user_name": user_name,
+    }
+    return {"subject": subject_template.render(context), "body": body_template.render(context)}
@@ -1,14 +1,19 @@
 # email_writer.py
 import json
-from pydantic import BaseModel
-from typing import List, Dict
+from pydantic import BaseModel, ValidationError
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
 import os
 import datetime
 import logging
-from google import genai
-# from google.generativeai.types import GenerationConfig
-from google.genai import types
+import hashlib
+import asyncio
+from agents.lead_store import get_lead_store
+from agents.llm import get_llm_gateway
+from agents.draft_cache import DraftCache, draft_fingerprint
+from agents.email_templates import CompanySlots, DEFAULT_SLOTS, SLOTS_INSTRUCTION, BODY_TEMPLATE, render_email
+from agents.enrichment_cache import normalize_domain
+from agents.company_cache import normalize_company_name
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,13 +22,17 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini
-# genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+EMAIL_MODEL = "gemini-2.5-flash"
+# Bump when the prompt changes in a way the hashed instructions don't capture; invalidates cached drafts
+PROMPT_VERSION = "1"
+
+SINGLE_OUTPUT_FORMAT = "IMPORTANT: Output ONLY a JSON object with keys 'subject' and 'body'. NO other text, NO explanations, NO extras. The 'body' should be HTML-ready, include the CTA as the last paragraph, and be detailed but concise (150-200 words), professional, humanized—like a tech professional from India."
+BATCH_OUTPUT_FORMAT = "IMPORTANT: The user message contains several leads, each with a lead_id. Output ONLY a JSON array with one object per lead, with keys 'lead_id', 'subject' and 'body'. NO other text, NO explanations, NO extras. Write each email independently for its own lead. Each 'body' should be HTML-ready, include the CTA as the last paragraph, and be detailed but concise (150-200 words), professional, humanized—like a tech professional from India."
 
 class Email(BaseModel):
     subject: str
     body: str
-    cta: str
+    cta: Optional[str] = None
     lead_id: str
 
 class EmailWriterAgent:
@@ -33,11 +42,34 @@ class EmailWriterAgent:
     output_schema = {"leads": List[Dict]}  # Update same leads list
 
     def __init__(self):
-        self.client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+        # Concurrency, rate limits, timeouts and retries for Gemini are configured on the gateway
+        self.llm = get_llm_gateway()
+        self.lead_store = get_lead_store()
+        # Static instructions go into a Gemini cached context, created once per campaign
+        self.context_cache = os.getenv("EMAIL_WRITER_CONTEXT_CACHE", "true").lower() == "true"
+        self.context_cache_ttl = int(os.getenv("EMAIL_WRITER_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+        self._contexts = {}  # system instruction -> Task resolving to a cached context name or None
+        self._contexts_loop = None
+        self.usage = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+        self.draft_cache = DraftCache()
+        self.draft_cache_hits = 0
+        # "llm": Gemini writes the whole email per lead
+        # "template": Jinja2 template, Gemini only fills the company-level slots once per company
+        self.mode = os.getenv("EMAIL_WRITER_MODE", "llm").lower()
+        self._company_slots = {}  # company key -> Task resolving to CompanySlots
+        self._company_slots_loop = None
+        # "batch": K leads per request; leads arriving within EMAIL_WRITER_BATCH_WAIT_SECONDS are grouped
+        self.batch_size = max(int(os.getenv("EMAIL_WRITER_BATCH_SIZE", "5")), 1)
+        self.batch_wait = float(os.getenv("EMAIL_WRITER_BATCH_WAIT_SECONDS", "0.5"))
+        self._pending_batch = []  # (lead, fingerprint, Future resolving to True when the batch drafted it)
+        self._batch_timer = None
+        self._batch_loop = None
+        self._batch_tasks = set()  # in-flight write_batch tasks, kept referenced until they finish
 
-    async def run(self, state):
-        print(f"[{datetime.datetime.now()}] Starting email_writer")
-        leads = state.get("leads", [])
+    def build_signature(self, state):
+        """
+        Builds the HTML signature appended to every draft from the sender details in state.
+        """
         org_name = state.get("organization_name", "Your Company")
         user_name = state.get("user_name", "Sales Team")
         company_email = state.get("company_email", "sales@company.com")
@@ -69,82 +101,396 @@ class EmailWriterAgent:
                                 alt="LinkedIn" width="20" style="vertical-align:middle;">
                         </a>
                         """
-        for lead in leads:
-            if "email_draft" in lead:
-                continue
+        return signature
+
+    def build_system_instruction(self, state, output_format=SINGLE_OUTPUT_FORMAT):
+        """
+        Static part of the prompt: output format, example, structure and tone rules.
+        It only depends on the sender, so it is built once per campaign and sent as a (cached) system instruction.
+        """
+        org_name = state.get("organization_name", "Your Company")
+        user_name = state.get("user_name", "Sales Team")
+
+        return f"""
+        {output_format}
+
+        Example Output:
+        {{
+            "subject": "Exploring AI for Acme Corp's Apps",
+            "body": "Hi Jane,<br>I hope you're doing well.<br>I'm John Doe from Bacancy Technology. I came across the exciting work you're doing at Acme Corp, especially in app development. It caught my attention because it aligns with some of the AI-led transformations we're helping companies implement across similar domains.<br>At Bacancy Technology, we're enabling businesses to unlock value through custom AI solutions — with a focus on real outcomes, not buzzwords. Here's how we typically add value:<br><ul><li><strong>Enhance User Experience</strong>: Build AI-driven personalization to boost engagement.</li><li><strong>Boost Operational Efficiency</strong>: Automate workflows for smoother operations.</li><li><strong>Enable Smarter Decisions</strong>: Integrate analytics for data-backed insights.</li></ul><br>If any of these areas resonate with what you're working on, I'd love to exchange ideas or explore if there's a fit.<br>Would you be open to a short call next week?"
+        }}
+
+        Generate for the lead given in the user message. In the template below, <first name>, <company>, <role> and <company website> refer to that lead's details.
+
+        subject: [8-12 words: Benefit-focused, personalized, e.g., 'Exploring AI Possibilities for <company>' - clear and engaging]
+
+        body: [HTML formatted:  
+        <p>Hi <first name>,</p>
+        <p>I hope you're doing well.</p>
+        <p>I'm {user_name} from {org_name}. I came across the exciting work you're doing at <company>, especially in [brief mention of industry/domain from <company website> or <role>]. It caught my attention because it aligns with some of the AI-led transformations we're helping companies implement across similar domains.</p>
+        <p>At {org_name}, we're enabling businesses to unlock value through custom AI solutions — with a focus on real outcomes, not buzzwords. Here's how we typically add value:</p>
+        <ul>
+        <li><strong>Enhance User Experience</strong>: [Benefit tied to lead, e.g., 'We build AI-driven personalization layers that improve user engagement and retention for <company>'s apps.']</li>
+        <li><strong>Boost Operational Efficiency</strong>: [Benefit, e.g., 'From automating internal workflows to improving QA/testing cycles, our AI tools streamline <role>'s day-to-day.']</li>
+        <li><strong>Enable Smarter Decisions</strong>: [Benefit, e.g., 'We help <company> make data-backed decisions with intelligent analytics and forecasting models.']</li>
+        </ul>
+        <p>[Wrap-up: 1-2 sentences, e.g., 'If any of these areas resonate with what you're working on, I'd love to exchange ideas or explore if there's a fit.']</p>
+        <p>[CTA: 1-2 sentences: Non-pushy, e.g., 'Would you be open to a short call sometime next week to discuss where AI might make the biggest impact for <company>?']</p>]
+
+        Tone: Professional, warm, conversational—like a peer from India. Short sentences, no sales clichés ('significant value', 'game-changer'). Personalize to lead's details, infer industry from website or role (e.g., for BreakthroughApps.io, use 'wellness app development for meditation, fitness, and nutrition'). Ban: From, To, email addresses, links except lead's website if relevant.
+        """
+
+    def build_prompt(self, lead, state):
+        """
+        Per-lead part of the prompt; only this is sent in full on every call.
+        """
+        return f"""
+        Lead Details:
+        - First Name: {lead.get('name', 'there').split()[0] if lead.get('name') else 'there'}
+        - Name: {lead.get('name', 'Unknown')}
+        - Role: {lead.get('role', 'Unknown')}
+        - Company: {lead.get('company', 'Unknown')}
+        - Location: {lead.get('location', 'Unknown')}
+        - Experience: {lead.get('experience', '')}
+        - Company Website: {lead.get('company_website', '')}
+        """
+
+    async def create_context(self, system_instruction):
+        """
+        Creates a Gemini cached context holding the system instruction. Returns its name, or None when
+        caching is disabled or not available (e.g. the instruction is below the model's minimum cache size).
+        """
+        if not self.context_cache:
+            return None
+        try:
+            name = await self.llm.create_context(
+                "gemini", EMAIL_MODEL, system_instruction, self.context_cache_ttl, "email-writer-instructions"
+            )
+            logger.info(f"Created Gemini context cache {name}")
+            return name
+        except Exception as e:
+            logger.warning(f"Gemini context caching unavailable, sending the instructions as a system instruction: {e}")
+            return None
+
+    async def context_name(self, system_instruction):
+        """
+        Cached context for the campaign's instructions, or None to send them as a plain system instruction
+        (still eligible for Gemini's implicit prefix caching). Concurrent callers share a single cache creation.
+        """
+        loop = asyncio.get_running_loop()
+        if self._contexts_loop is not loop:
+            # Tasks are bound to their loop; a context created on an earlier loop is simply re-created
+            self._contexts = {}
+            self._contexts_loop = loop
+        task = self._contexts.get(system_instruction)
+        if task is None:
+            task = asyncio.ensure_future(self.create_context(system_instruction))
+            self._contexts[system_instruction] = task
+        return await asyncio.shield(task)
+
+    def drop_context(self, system_instruction):
+        """
+        Forgets the campaign's cached context (e.g. it expired), so later calls fall back to the system instruction.
+        """
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        self._contexts[system_instruction] = future
+
+    def prompt_version(self, system_instruction):
+        """
+        PROMPT_VERSION plus a hash of the instruction block and model, so editing the prompt invalidates cached drafts.
+        """
+        digest = hashlib.sha256(f"{EMAIL_MODEL}\n{system_instruction}".encode("utf-8")).hexdigest()[:16]
+        return f"{PROMPT_VERSION}:{digest}"
+
+    def log_usage(self, response):
+        """Adds a gateway response's token counts to this agent's totals"""
+        self.usage["calls"] += 1
+        self.usage["prompt_tokens"] += response.prompt_tokens
+        self.usage["cached_tokens"] += response.cached_tokens
+        self.usage["output_tokens"] += response.output_tokens
+
+    async def generate(self, prompt, system_instruction, label=""):
+        """
+        Calls Gemini through the LLM gateway, using the campaign's cached context when there is one.
+        """
+        cached_name = await self.context_name(system_instruction)
+        try:
+            response = await self.llm.generate(
+                "gemini", EMAIL_MODEL, prompt,
+                system_instruction=system_instruction, temperature=0.1, cached_content=cached_name, label=label
+            )
+        except Exception:
+            if not cached_name:
+                raise
+            # Most likely an expired or evicted context; retry without it
+            self.drop_context(system_instruction)
+            response = await self.llm.generate(
+                "gemini", EMAIL_MODEL, prompt, system_instruction=system_instruction, temperature=0.1, label=label
+            )
+        self.log_usage(response)
+        return response
+
+    async def write_email_for_lead(self, lead, state, signature):
+        """
+        Generates, persists and saves the outreach draft for a single lead. Leads that already have a draft are left as-is.
+        """
+        if "email_draft" in lead:
+            return lead
+        if self.mode == "template":
+            return await self.write_templated_email(lead, state, signature)
+        org_name = state.get("organization_name", "Your Company")
+        user_name = state.get("user_name", "Sales Team")
+        prompt = self.build_prompt(lead, state)
+        fingerprint = draft_fingerprint(lead, state, self.prompt_version(self.build_system_instruction(state)))
+
+        cached = self.draft_cache.get(fingerprint)
+        if cached is not None:
+            self.draft_cache_hits += 1
+            lead["email_draft"] = {
+                "subject": cached["subject"],
+                "body": cached["body"] + signature
+            }
+            self.save_draft(lead)
+            return lead
+
+        if self.mode == "batch" and await self.batch_draft(lead, state, signature, fingerprint):
+            return lead
+
+        try:
+            response = await self.generate(prompt, self.build_system_instruction(state), lead.get("profile_url", "unknown"))
+            
+            email_content = response.text.strip("```json").strip("```").strip()
+            
+            print(email_content)
+
+            # Parse JSON
+            email_draft = json.loads(email_content)
+            subject = email_draft.get("subject", "Personalized AI Outreach")
+            body = email_draft.get("body", "Default body with CTA included.")
+            self.draft_cache.put(fingerprint, subject, body)
+            
+            # Append signature manually
+            body += signature
+            
+            lead["email_draft"] = {
+                "subject": subject,
+                "body": body
+            }
+        except Exception as e:
+            logger.error(f"Error generating or parsing email: {e}", exc_info=True)
+            lead["email_draft"] = {
+                "subject": f"Exploring AI for {lead.get('company', 'your company')}",
+                "body": f"<p>Hi {lead.get('name', 'there').split()[0] if lead.get('name') else 'there'},</p><p>I hope you're doing well.</p><p>I'm {user_name} from {org_name}. Let's discuss AI opportunities.</p><p>Would you be open to a call?</p>" + signature
+            }
+        self.save_draft(lead)
+        return lead
+
+    async def batch_draft(self, lead, state, signature, fingerprint):
+        """
+        Queues the lead for the next batched request. Returns True once the batch drafted it, False when its
+        item was missing or invalid (or the request failed), in which case the caller generates it on its own.
+        """
+        loop = asyncio.get_running_loop()
+        if self._batch_loop is not loop:
+            self._pending_batch = []
+            self._batch_timer = None
+            self._batch_tasks = set()
+            self._batch_loop = loop
+        future = loop.create_future()
+        self._pending_batch.append((lead, fingerprint, future))
+        if len(self._pending_batch) >= self.batch_size:
+            self.flush_batch(state, signature)
+        elif self._batch_timer is None:
+            self._batch_timer = loop.call_later(self.batch_wait, self.flush_batch, state, signature)
+        return await future
 
-            # Updated prompt for JSON output
-            prompt = f"""
-            IMPORTANT: Output ONLY a JSON object with keys 'subject' and 'body'. NO other text, NO explanations, NO extras. The 'body' should be HTML-ready, include the CTA as the last paragraph, and be detailed but concise (150-200 words), professional, humanized—like a tech professional from India.
-
-            Example Output:
-            {{
-                "subject": "Exploring AI for Acme Corp's Apps",
-                "body": "Hi Jane,<br>I hope you're doing well.<br>I'm John Doe from Bacancy Technology. I came across the exciting work you're doing at Acme Corp, especially in app development. It caught my attention because it aligns with some of the AI-led transformations we're helping companies implement across similar domains.<br>At Bacancy Technology, we're enabling businesses to unlock value through custom AI solutions — with a focus on real outcomes, not buzzwords. Here's how we typically add value:<br><ul><li><strong>Enhance User Experience</strong>: Build AI-driven personalization to boost engagement.</li><li><strong>Boost Operational Efficiency</strong>: Automate workflows for smoother operations.</li><li><strong>Enable Smarter Decisions</strong>: Integrate analytics for data-backed insights.</li></ul><br>If any of these areas resonate with what you're working on, I'd love to exchange ideas or explore if there's a fit.<br>Would you be open to a short call next week?"
-            }}
-
-            Now, generate for this lead:
-
-            subject: [8-12 words: Benefit-focused, personalized, e.g., 'Exploring AI Possibilities for {lead.get('company', 'your company')}' - clear and engaging]
-
-            body: [HTML formatted:  
-            <p>Hi {lead.get('name', 'there').split()[0] if lead.get('name') else 'there'},</p>
-            <p>I hope you're doing well.</p>
-            <p>I'm {user_name} from {org_name}. I came across the exciting work you're doing at {lead.get('company', 'your company')}, especially in [brief mention of industry/domain from website {lead.get('company_website', '')} or role {lead.get('role', 'Unknown')}]. It caught my attention because it aligns with some of the AI-led transformations we're helping companies implement across similar domains.</p>
-            <p>At {org_name}, we're enabling businesses to unlock value through custom AI solutions — with a focus on real outcomes, not buzzwords. Here's how we typically add value:</p>
-            <ul>
-            <li><strong>Enhance User Experience</strong>: [Benefit tied to lead, e.g., 'We build AI-driven personalization layers that improve user engagement and retention for {lead.get('company', 'your company')}'s apps.']</li>
-            <li><strong>Boost Operational Efficiency</strong>: [Benefit, e.g., 'From automating internal workflows to improving QA/testing cycles, our AI tools streamline {lead.get('role', 'your team')}'s day-to-day.']</li>
-            <li><strong>Enable Smarter Decisions</strong>: [Benefit, e.g., 'We help {lead.get('company', 'your company')} make data-backed decisions with intelligent analytics and forecasting models.']</li>
-            </ul>
-            <p>[Wrap-up: 1-2 sentences, e.g., 'If any of these areas resonate with what you're working on, I'd love to exchange ideas or explore if there's a fit.']</p>
-            <p>[CTA: 1-2 sentences: Non-pushy, e.g., 'Would you be open to a short call sometime next week to discuss where AI might make the biggest impact for {lead.get('company', 'your company')}?']</p>]
-
-            Lead Details:
-            - Name: {lead.get('name', 'Unknown')}
-            - Role: {lead.get('role', 'Unknown')}
-            - Company: {lead.get('company', 'Unknown')}
-            - Location: {lead.get('location', 'Unknown')}
-            - Experience: {lead.get('experience', '')}
-            - Company Website: {lead.get('company_website', '')}
-
-            Tone: Professional, warm, conversational—like a peer from India. Short sentences, no sales clichés ('significant value', 'game-changer'). Personalize to lead's details, infer industry from website or role (e.g., for BreakthroughApps.io, use 'wellness app development for meditation, fitness, and nutrition'). Ban: From, To, email addresses, links except lead's website if relevant.
-            """
+    def flush_batch(self, state, signature):
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        items, self._pending_batch = self._pending_batch, []
+        if items:
+            task = asyncio.ensure_future(self.write_batch(items, state, signature))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
 
+    async def wait_for_batches(self):
+        """
+        Waits for batch requests still in flight, so none is cut off when the stage returns.
+        """
+        if self._batch_tasks and self._batch_loop is asyncio.get_running_loop():
+            for result in await asyncio.gather(*self._batch_tasks, return_exceptions=True):
+                if isinstance(result, Exception):
+                    logger.error(f"Email batch failed: {result}", exc_info=result)
+
+    def build_batch_prompt(self, leads):
+        return "\n".join(
+            f"lead_id: {lead_id}{self.build_prompt(lead, None)}" for lead_id, lead in enumerate(leads, start=1)
+        )
+
+    def parse_batch(self, text):
+        """
+        Validated Email items from a batched response, keyed by lead_id; malformed items are skipped.
+        """
+        data = json.loads(text.strip().strip("```json").strip("```").strip())
+        if isinstance(data, dict):
+            data = data.get("emails", [data])
+        emails = {}
+        for item in data if isinstance(data, list) else []:
+            if not isinstance(item, dict):
+                continue
             try:
-                response = self.client.models.generate_content(
-                    model="gemini-2.5-flash",
-                    contents=prompt,
-                    config=types.GenerateContentConfig(temperature=0.1)
-                )
-                
-                email_content = response.text.strip("```json").strip("```").strip()
-                
-                print(email_content)
-
-                # Parse JSON
-                email_draft = json.loads(email_content)
-                subject = email_draft.get("subject", "Personalized AI Outreach")
-                body = email_draft.get("body", "Default body with CTA included.")
-                
-                # Append signature manually
-                body += signature
-                
+                email = Email(**dict(item, lead_id=str(item.get("lead_id", "")).strip()))
+            except ValidationError:
+                continue
+            emails[email.lead_id] = email
+        return emails
+
+    async def write_batch(self, items, state, signature):
+        """
+        Drafts up to batch_size leads in one request and resolves each lead's future with whether it was drafted.
+        Drafts are cached per lead under its own fingerprint; leads that hit the draft cache by the time the batch
+        is flushed (e.g. a duplicate drafted by an earlier batch) are not sent to the LLM.
+        """
+        try:
+            misses = []
+            for lead, fingerprint, future in items:
+                cached = self.draft_cache.get(fingerprint)
+                if cached is None:
+                    misses.append((lead, fingerprint, future))
+                    continue
+                self.draft_cache_hits += 1
                 lead["email_draft"] = {
-                    "subject": subject,
-                    "body": body
+                    "subject": cached["subject"],
+                    "body": cached["body"] + signature
                 }
-            except Exception as e:
-                logger.error(f"Error generating or parsing email: {e}", exc_info=True)
+                self.save_draft(lead)
+                future.set_result(True)
+
+            emails = {}
+            if misses:
+                try:
+                    response = await self.generate(
+                        self.build_batch_prompt([lead for lead, _, _ in misses]),
+                        self.build_system_instruction(state, BATCH_OUTPUT_FORMAT),
+                        f"batch of {len(misses)}"
+                    )
+                    emails = self.parse_batch(response.text)
+                except Exception as e:
+                    logger.error(f"Error generating or parsing email batch, retrying leads individually: {e}", exc_info=True)
+
+            for lead_id, (lead, fingerprint, future) in enumerate(misses, start=1):
+                email = emails.get(str(lead_id))
+                if email is None:
+                    future.set_result(False)
+                    continue
+                self.draft_cache.put(fingerprint, email.subject, email.body)
                 lead["email_draft"] = {
-                    "subject": f"Exploring AI for {lead.get('company', 'your company')}",
-                    "body": f"<p>Hi {lead.get('name', 'there').split()[0] if lead.get('name') else 'there'},</p><p>I hope you're doing well.</p><p>I'm {user_name} from {org_name}. Let's discuss AI opportunities.</p><p>Would you be open to a call?</p>" + signature
+                    "subject": email.subject,
+                    "body": email.body + signature
                 }
+                self.save_draft(lead)
+                future.set_result(True)
+        finally:
+            # Never leave a caller waiting
+            for _, _, future in items:
+                if not future.done():
+                    future.set_result(False)
+        failed = sum(1 for _, _, future in items if not future.result())
+        if failed:
+            logger.warning(f"{failed} of {len(items)} leads in a batch were not drafted, retrying individually")
 
-            try:
-                with open(f"outputs/email/{lead.get('profile_url', 'unknown').replace('/', '_')}.json", "w") as f:
-                    json.dump(lead["email_draft"], f, indent=2)
-            except Exception as e:
-                logger.error(f"Error saving email draft: {e}", exc_info=True)
+    def company_key(self, lead):
+        """
+        Leads at the same company share slot values: keyed by registrable domain, or by company name without a website.
+        """
+        domain = normalize_domain(lead.get("company_website"))
+        if domain:
+            return f"domain:{domain}"
+        return f"name:{normalize_company_name(lead.get('company'))}"
+
+    async def generate_company_slots(self, lead, company_key):
+        """
+        Asks Gemini for the personalised slot values of the lead's company (cached across runs).
+        Falls back to generic slot values, which are not cached, when generation or validation fails.
+        """
+        version = self.prompt_version(SLOTS_INSTRUCTION + BODY_TEMPLATE)
+        cached = self.draft_cache.get_slots(company_key, version)
+        if cached is not None:
+            self.draft_cache_hits += 1
+            return CompanySlots(**cached)
+
+        prompt = f"""
+        Company: {lead.get('company', 'Unknown')}
+        Company Website: {lead.get('company_website', '')}
+        """
+        try:
+            response = await self.generate(prompt, SLOTS_INSTRUCTION, company_key)
+            slots = CompanySlots(**json.loads(response.text.strip("```json").strip("```").strip()))
+        except Exception as e:
+            logger.error(f"Error generating template slots for {company_key}: {e}", exc_info=True)
+            return DEFAULT_SLOTS
+        self.draft_cache.put_slots(company_key, version, slots.model_dump())
+        return slots
+
+    async def get_company_slots(self, lead):
+        """
+        Slot values for the lead's company; concurrent leads at the same company share one generation.
+        """
+        loop = asyncio.get_running_loop()
+        if self._company_slots_loop is not loop:
+            self._company_slots = {}
+            self._company_slots_loop = loop
+        company_key = self.company_key(lead)
+        task = self._company_slots.get(company_key)
+        if task is None:
+            task = asyncio.ensure_future(self.generate_company_slots(lead, company_key))
+            self._company_slots[company_key] = task
+        return await asyncio.shield(task)
+
+    async def write_templated_email(self, lead, state, signature):
+        """
+        Renders the lead's draft from the email template and its company's slot values.
+        """
+        slots = await self.get_company_slots(lead)
+        draft = render_email(
+            slots,
+            lead,
+            state.get("organization_name", "Your Company"),
+            state.get("user_name", "Sales Team"),
+        )
+        lead["email_draft"] = {
+            "subject": draft["subject"],
+            "body": draft["body"] + signature
+        }
+        self.save_draft(lead)
+        return lead
+
+    def save_draft(self, lead):
+        """
+        Persists the lead and writes its draft to outputs/email.
+        """
+        self.lead_store.upsert(lead)
+        try:
+            with open(f"outputs/email/{lead.get('profile_url', 'unknown').replace('/', '_')}.json", "w") as f:
+                json.dump(lead["email_draft"], f, indent=2)
+        except Exception as e:
+            logger.error(f"Error saving email draft: {e}", exc_info=True)
+
+    async def run(self, state):
+        print(f"[{datetime.datetime.now()}] Starting email_writer")
+        leads = state.get("leads", [])
+        signature = self.build_signature(state)
+        # Each draft is persisted and written to outputs/email as soon as it completes
+        await asyncio.gather(*(self.write_email_for_lead(lead, state, signature) for lead in leads if "email_draft" not in lead))
+        await self.wait_for_batches()
         print(f"[{datetime.datetime.now()}] Completed email_writer: Emails generated for {len(leads)} leads")
+        if self.draft_cache_hits:
+            logger.info(f"Reused {self.draft_cache_hits} cached drafts")
+        if self.usage["calls"]:
+            logger.info(
+                f"Gemini usage: {self.usage['calls']} calls, {self.usage['prompt_tokens']} prompt tokens "
+                f"({self.usage['cached_tokens']} cached), {self.usage['output_tokens']} output tokens"
+            )
         return {"leads": leads}
\ No newline at end of file
@@ -0,0 +1,88 @@
+# enrichment_cache.py
+import os
+import re
+import logging
+from urllib.parse import urlsplit
+from typing import Optional
+
+from agents.disk_cache import DiskCache, CacheEntry
+from agents.email_patterns import DomainPattern, normalize_name_part
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60
+
+# Second-level labels under which registrations happen one level deeper (acme.co.uk, acme.com.au)
+MULTI_PART_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "ltd.uk", "plc.uk", "me.uk",
+    "com.au", "net.au", "org.au", "co.nz", "org.nz", "co.in", "net.in", "org.in", "firm.in",
+    "co.jp", "ne.jp", "or.jp", "co.kr", "com.cn", "com.hk", "com.sg", "com.my", "com.tw",
+    "com.br", "com.mx", "com.ar", "com.co", "com.tr", "co.za", "co.il", "com.sa", "com.eg",
+}
+
+
+def normalize_domain(website: str) -> str:
+    """
+    Registrable domain for a company website: 'https://www.Acme.co.uk/about?x=1' -> 'acme.co.uk'.
+    """
+    website = (website or "").strip().lower()
+    if not website:
+        return ""
+    host = urlsplit(website if "://" in website else f"http://{website}").hostname or ""
+    host = host.strip(".")
+    if not host or re.fullmatch(r"[\d.]+", host):
+        return host
+    labels = host.split(".")
+    if len(labels) >= 3 and ".".join(labels[-2:]) in MULTI_PART_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+class EnrichmentCache:
+    """
+    Cross-run cache of Hunter lookups.
+    - Person lookups are keyed by registrable domain plus normalized first and last name.
+    - Learned domain patterns are keyed by registrable domain.
+    - Hits and misses have separate TTLs (HUNTER_CACHE_TTL_DAYS, HUNTER_CACHE_NEGATIVE_TTL_DAYS),
+      so a definitive "not found" is not asked again until the miss TTL expires.
+    """
+
+    def __init__(self, ttl_days: Optional[float] = None, negative_ttl_days: Optional[float] = None):
+        self.cache = DiskCache("hunter_enrichment")
+        self.ttl = float(ttl_days if ttl_days is not None else os.getenv("HUNTER_CACHE_TTL_DAYS", "90")) * DAY
+        self.negative_ttl = float(
+            negative_ttl_days if negative_ttl_days is not None else os.getenv("HUNTER_CACHE_NEGATIVE_TTL_DAYS", "7")
+        ) * DAY
+
+    @staticmethod
+    def person_key(domain: str, first_name: str, last_name: str) -> str:
+        return f"person:{normalize_domain(domain)}|{normalize_name_part(first_name)}|{normalize_name_part(last_name)}"
+
+    @staticmethod
+    def pattern_key(domain: str) -> str:
+        return f"pattern:{normalize_domain(domain)}"
+
+    def get_email(self, domain: str, first_name: str, last_name: str) -> Optional[CacheEntry]:
+        return self.cache.get(self.person_key(domain, first_name, last_name))
+
+    def put_email(self, domain: str, first_name: str, last_name: str, email: Optional[str]):
+        key = self.person_key(domain, first_name, last_name)
+        if email:
+            self.cache.set(key, email, self.ttl)
+        else:
+            self.cache.set_negative(key, self.negative_ttl)
+
+    def get_pattern(self, domain: str) -> Optional[CacheEntry]:
+        entry = self.cache.get(self.pattern_key(domain))
+        if entry and entry.value:
+            return CacheEntry(DomainPattern(*entry.value), entry.negative)
+        return entry
+
+    def put_pattern(self, domain: str, pattern: Optional[DomainPattern]):
+        key = self.pattern_key(domain)
+        if pattern:
+            self.cache.set(key, list(pattern), self.ttl)
+        else:
+            self.cache.set_negative(key, self.negative_ttl)
@@ -1,10 +1,17 @@
 # lead_enricher.py
 from typing import List, Dict
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 import os
 import datetime
 import logging
+import random
+import asyncio
+from agents.lead_store import get_lead_store
+from agents.rate_limiter import AsyncRateLimiter
+from agents.email_patterns import learn_pattern, render_pattern
+from agents.enrichment_cache import EnrichmentCache, normalize_domain
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -13,6 +20,21 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+HUNTER_EMAIL_FINDER_URL = "https://api.hunter.io/v2/email-finder"
+HUNTER_DOMAIN_SEARCH_URL = "https://api.hunter.io/v2/domain-search"
+FALLBACK_EMAIL = "pitaji.injala@gmail.com"
+
+
+def split_name(full_name):
+    """
+    Returns (first_name, last_name) from a display name; single-word names get an empty last name.
+    """
+    parts = (full_name or "").split()
+    if not parts:
+        return "", ""
+    return parts[0], parts[-1] if len(parts) > 1 else ""
+
+
 class LeadEnricherAgent:
     name = "lead_enricher"
     description = "Enriches leads with contact data using Hunter.io"
@@ -21,33 +43,215 @@ class LeadEnricherAgent:
 
     def __init__(self):
         self.hunter_api_key = os.getenv("HUNTER_API_KEY")
+        self.lead_store = get_lead_store()
+        self.concurrency = int(os.getenv("HUNTER_CONCURRENCY", "10"))
+        self.timeout = float(os.getenv("HUNTER_TIMEOUT_SECONDS", "15"))
+        self.max_retries = int(os.getenv("HUNTER_MAX_RETRIES", "4"))
+        # Hunter allows 15 requests/second on the finder endpoints
+        self.rate_limiter = AsyncRateLimiter(float(os.getenv("HUNTER_RATE_PER_SECOND", "15")))
+        # One pooled session: lookups reuse TLS connections instead of opening one per lead
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency))
+        self._semaphore = None
+        self._semaphore_loop = None
+        # "finder": one email-finder call per lead
+        # "domain": one domain-search per domain, derive addresses from the learned pattern
+        self.mode = os.getenv("HUNTER_ENRICH_MODE", "finder").lower()
+        self.pattern_min_confidence = float(os.getenv("HUNTER_PATTERN_MIN_CONFIDENCE", "0.7"))
+        self.domain_search_limit = int(os.getenv("HUNTER_DOMAIN_SEARCH_LIMIT", "10"))
+        self._domain_patterns = {}  # domain -> Task resolving to a DomainPattern or None
+        self.enrichment_cache = EnrichmentCache()
 
-    async def run(self, state):
-        print(f"[{datetime.datetime.now()}] Starting lead_enricher")
-        leads = state.get("leads", [])
-        for lead in leads:
-            if lead.get("email"):
-                continue  
+    def _get_semaphore(self):
+        # asyncio primitives are bound to the loop that first uses them
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def _retry_delay(self, response, attempt):
+        """
+        Seconds to wait before retrying: Retry-After when the server sends it, otherwise exponential backoff with jitter.
+        """
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return min(2 ** attempt, 30) + random.uniform(0, 1)
+
+    async def hunter_get(self, url, params):
+        """
+        Rate-limited, bounded-concurrency GET against the Hunter API with retries on 429/5xx and network errors.
+        Returns the final response, or None if every attempt failed with a network error.
+        """
+        params = dict(params, api_key=self.hunter_api_key)
+        response = None
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
             try:
-                company_website = lead.get("company_website")
-                name_list = lead.get('name', "").split(" ")
-                if name_list:
-                    first_name = name_list[0]
-                    last_name = name_list[1]
-                else : 
-                    first_name = ""
-                    last_name = ""
-                response = requests.get(
-                    f"https://api.hunter.io/v2/email-finder?domain={company_website}&first_name={first_name}&last_name={last_name}&api_key={self.hunter_api_key}"
-                )
-                data = response.json().get("data", {})
-                if response.status_code != 200:
-                    email = "pitaji.injala@gmail.com"
-                else:
-                    email = data.get("emails", [{}])[0].get("value", "unknown@example.com")
+                async with self._get_semaphore():
+                    response = await asyncio.to_thread(self.session.get, url, params=params, timeout=self.timeout)
             except requests.RequestException as e:
+                logger.warning(f"Hunter request failed (attempt {attempt + 1}): {e}")
+                response = None
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self._retry_delay(None, attempt))
+                continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt < self.max_retries:
+                    delay = self._retry_delay(response, attempt)
+                    logger.warning(f"Hunter returned {response.status_code}, backing off {delay:.1f}s")
+                    if response.status_code == 429:
+                        # Slow every in-flight lookup down, not just this one
+                        self.rate_limiter.pause(delay)
+                    await asyncio.sleep(delay)
+                    continue
+            return response
+        return response
+
+    def _is_definitive(self, response):
+        """
+        True when a response settles the lookup (found or not found) and may be cached: a 200, or a 404.
+        Everything else is transient and retried on a later run: network failures, rate limits, server errors,
+        and other 4xx such as a bad or expired API key (401/403) or an exhausted quota, which would otherwise
+        cache a miss for every domain looked up with that key.
+        """
+        if response is None:
+            return False
+        status = response.status_code
+        if status in (200, 404):
+            return True
+        if 400 <= status < 500 and status != 429:
+            logger.error(
+                f"Hunter returned {status} (bad request, HUNTER_API_KEY or quota problem); result not cached: "
+                f"{response.text[:200]}"
+            )
+        return False
+
+    async def find_email(self, domain, first_name, last_name):
+        """
+        Looks up an address with Hunter's email-finder. Returns (email or None, definitive).
+        """
+        response = await self.hunter_get(
+            HUNTER_EMAIL_FINDER_URL,
+            {"domain": domain, "first_name": first_name, "last_name": last_name},
+        )
+        if response is None or response.status_code != 200:
+            return None, self._is_definitive(response)
+        try:
+            data = response.json().get("data") or {}
+        except ValueError:
+            return None, False
+        if data.get("email"):
+            return data["email"], True
+        return (data.get("emails") or [{}])[0].get("value"), True
+
+    async def search_domain_pattern(self, domain):
+        """
+        Calls Hunter's domain-search once and learns the domain's address pattern. Returns a DomainPattern or None.
+        """
+        cached = self.enrichment_cache.get_pattern(domain)
+        if cached is not None:
+            return None if cached.negative else cached.value
+
+        response = await self.hunter_get(
+            HUNTER_DOMAIN_SEARCH_URL,
+            {"domain": domain, "type": "personal", "limit": self.domain_search_limit},
+        )
+        if response is None or response.status_code != 200:
+            if self._is_definitive(response):
+                self.enrichment_cache.put_pattern(domain, None)
+            return None
+        try:
+            data = response.json().get("data") or {}
+        except ValueError:
+            return None
+        pattern = learn_pattern(data)
+        logger.info(f"Learned email pattern for {domain}: {pattern}")
+        self.enrichment_cache.put_pattern(domain, pattern)
+        return pattern
+
+    async def get_domain_pattern(self, domain):
+        """
+        Domain pattern for this run; concurrent leads at the same domain share one domain-search call.
+        """
+        task = self._domain_patterns.get(domain)
+        if task is None:
+            task = asyncio.ensure_future(self.search_domain_pattern(domain))
+            self._domain_patterns[domain] = task
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            logger.error(f"Error searching domain {domain} with Hunter.io: {e}", exc_info=True)
+            return None
+
+    async def derive_email(self, domain, first_name, last_name):
+        """
+        Derives an address from the domain's learned pattern. Returns None when the pattern is
+        unknown, below the confidence threshold, or needs a name part the lead doesn't have.
+        """
+        pattern = await self.get_domain_pattern(domain)
+        if not pattern or pattern.confidence < self.pattern_min_confidence:
+            return None
+        local_part = render_pattern(pattern.pattern, first_name, last_name)
+        return f"{local_part}@{domain}" if local_part else None
+
+    async def lookup_email(self, domain, first_name, last_name):
+        """
+        Resolves an address for a person, checking the enrichment cache before any network call.
+        Returns (email or None, source).
+        """
+        cached = self.enrichment_cache.get_email(domain, first_name, last_name)
+        if cached is not None:
+            return (None, "cache_miss") if cached.negative else (cached.value, "cache")
+
+        if self.mode == "domain":
+            email = await self.derive_email(domain, first_name, last_name)
+            if email:
+                # Derived addresses are not cached per person; the domain pattern already is
+                return email, "hunter_pattern"
+
+        email, definitive = await self.find_email(domain, first_name, last_name)
+        if definitive:
+            self.enrichment_cache.put_email(domain, first_name, last_name, email)
+        return email, "hunter_finder"
+
+    def needs_enrichment(self, lead):
+        """
+        Leads without an email, and unsent leads that only got the fallback address on an earlier run.
+        """
+        if not lead.get("email"):
+            return True
+        return lead.get("email_source") == "fallback" and not lead.get("email_sent")
+
+    async def enrich_lead(self, lead):
+        """
+        Looks up the email for a single lead and persists it. Leads that already have an email are left as-is.
+        """
+        if not self.needs_enrichment(lead):
+            return lead
+        domain = normalize_domain(lead.get("company_website"))
+        first_name, last_name = split_name(lead.get("name", ""))
+        email, source = None, None
+        if domain:
+            try:
+                email, source = await self.lookup_email(domain, first_name, last_name)
+            except Exception as e:
                 logger.error(f"Error enriching lead with Hunter.io: {e}", exc_info=True)
-                email = "pitaji.injala@gmail.com"  # Changed fallback to generic
-            lead["email"] = email
+                email = None
+        lead["email"] = email or FALLBACK_EMAIL  # Changed fallback to generic
+        lead["email_source"] = source if email else "fallback"
+        self.lead_store.upsert(lead)
+        return lead
+
+    async def run(self, state):
+        print(f"[{datetime.datetime.now()}] Starting lead_enricher")
+        leads = state.get("leads", [])
+        await asyncio.gather(*(self.enrich_lead(lead) for lead in leads if self.needs_enrichment(lead)))
+        self._domain_patterns.clear()
         print(f"[{datetime.datetime.now()}] Completed lead_enricher: {len(leads)} leads enriched")
-        return {"leads": leads}
\ No newline at end of file
+        return {"leads": leads}
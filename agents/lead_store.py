@@ -0,0 +1,281 @@
+# lead_store.py
+import os
+import json
+import sqlite3
+import threading
+import datetime
+import logging
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Iterable
+from agents.review_schedule import ReviewSchedule
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "outputs/leads.db"
+LEGACY_LEADS_FILE = "outputs/final_leads.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    lead_key    TEXT PRIMARY KEY,
+    profile_url TEXT,
+    email       TEXT,
+    status      TEXT NOT NULL,
+    data        TEXT NOT NULL,
+    updated_at  TEXT NOT NULL,
+    next_review_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_leads_profile_url ON leads(profile_url);
+CREATE INDEX IF NOT EXISTS idx_leads_email ON leads(email);
+CREATE INDEX IF NOT EXISTS idx_leads_status ON leads(status);
+CREATE INDEX IF NOT EXISTS idx_leads_next_review_at ON leads(next_review_at) WHERE next_review_at IS NOT NULL;
+"""
+
+
+def lead_key(lead: Dict) -> Optional[str]:
+    """
+    Stable primary key for a lead: the LinkedIn profile URL, or the email for leads without one.
+    """
+    profile_url = (lead.get("profile_url") or "").strip()
+    if profile_url:
+        return profile_url
+    email = (lead.get("email") or "").strip().lower()
+    if email:
+        return f"email:{email}"
+    return None
+
+
+def lead_status(lead: Dict) -> str:
+    """
+    Derives the pipeline status of a lead from the fields the agents set on it.
+    """
+    if lead.get("meeting_scheduled"):
+        return "meeting_scheduled"
+    review_status = lead.get("email_review", {}).get("status")
+    if review_status == "replied":
+        return "replied"
+    if lead.get("email_sent"):
+        return "pending" if review_status == "pending" else "sent"
+    if lead.get("email_draft"):
+        return "drafted"
+    if lead.get("email"):
+        return "enriched"
+    return "discovered"
+
+
+def review_due_at(lead: Dict) -> Optional[str]:
+    """
+    When the lead should next be checked for a reply (ISO time), or None if it needs no more checks.
+    The reviewer sets next_review_at; a sent lead it has not scheduled yet is first due REVIEW_FIRST_INTERVAL_HOURS
+    after the send, as in ReviewSchedule.next_review_at (right away when the send time is unknown).
+    """
+    if lead.get("email_review", {}).get("status") == "replied" or not lead.get("email_sent"):
+        return None
+    if "next_review_at" in lead:
+        return lead["next_review_at"]
+    try:
+        sent_time = datetime.datetime.fromisoformat(lead.get("email_sent_time", ""))
+    except ValueError:
+        return datetime.datetime.min.isoformat()
+    return (sent_time + ReviewSchedule.from_env().first_interval).isoformat()
+
+
+class LeadStore:
+    """
+    SQLite (WAL mode) backed store for leads.
+    - One row per lead, keyed by profile_url, with the full lead dict stored as JSON.
+    - Indexed on profile_url, email, pipeline status and the time of the next reply check.
+    - Per-lead upserts run inside their own transaction, so agents can persist progress
+      after every lead without rewriting the whole leads file.
+    - Imports/exports the legacy outputs/final_leads.json format.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("LEAD_STORE_PATH", DEFAULT_DB_PATH)
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+
+    def _migrate(self):
+        # Stores created before the review schedule have no next_review_at column; fill it from the lead data
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(leads)")}
+        if columns and "next_review_at" not in columns:
+            with self.transaction() as conn:
+                conn.execute("ALTER TABLE leads ADD COLUMN next_review_at TEXT")
+                rows = conn.execute("SELECT lead_key, data FROM leads").fetchall()
+                conn.executemany(
+                    "UPDATE leads SET next_review_at = ? WHERE lead_key = ?",
+                    [(review_due_at(json.loads(data)), key) for key, data in rows],
+                )
+
+    @contextmanager
+    def transaction(self):
+        """
+        Runs the enclosed statements in a single write transaction.
+        """
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            else:
+                self.conn.execute("COMMIT")
+
+    def _upsert_row(self, conn, lead: Dict) -> bool:
+        key = lead_key(lead)
+        if not key:
+            logger.warning("Skipping lead without profile_url or email")
+            return False
+        conn.execute(
+            """
+            INSERT INTO leads (lead_key, profile_url, email, status, data, updated_at, next_review_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(lead_key) DO UPDATE SET
+                profile_url = excluded.profile_url,
+                email = excluded.email,
+                status = excluded.status,
+                data = excluded.data,
+                updated_at = excluded.updated_at,
+                next_review_at = excluded.next_review_at
+            """,
+            (
+                key,
+                lead.get("profile_url"),
+                (lead.get("email") or "").lower() or None,
+                lead_status(lead),
+                json.dumps(lead),
+                datetime.datetime.now().isoformat(),
+                review_due_at(lead),
+            ),
+        )
+        return True
+
+    def upsert(self, lead: Dict) -> bool:
+        """
+        Inserts or updates a single lead in its own transaction.
+        """
+        try:
+            with self.transaction() as conn:
+                return self._upsert_row(conn, lead)
+        except sqlite3.Error as e:
+            logger.error(f"Error saving lead {lead.get('profile_url', 'unknown')}: {e}", exc_info=True)
+            return False
+
+    def upsert_many(self, leads: Iterable[Dict]) -> int:
+        """
+        Inserts or updates many leads in one transaction. Returns the number of rows written.
+        """
+        count = 0
+        try:
+            with self.transaction() as conn:
+                for lead in leads:
+                    if self._upsert_row(conn, lead):
+                        count += 1
+        except sqlite3.Error as e:
+            logger.error(f"Error saving leads: {e}", exc_info=True)
+            return 0
+        return count
+
+    def _query(self, sql: str, params=()) -> List[Dict]:
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get(self, profile_url: str) -> Optional[Dict]:
+        rows = self._query("SELECT data FROM leads WHERE profile_url = ?", (profile_url,))
+        return rows[0] if rows else None
+
+    def find_by_email(self, email: str) -> List[Dict]:
+        return self._query("SELECT data FROM leads WHERE email = ? ORDER BY rowid", ((email or "").lower(),))
+
+    def by_status(self, *statuses: str) -> List[Dict]:
+        placeholders = ",".join("?" for _ in statuses)
+        return self._query(f"SELECT data FROM leads WHERE status IN ({placeholders}) ORDER BY rowid", statuses)
+
+    def due_for_review(self, now: Optional[str] = None) -> List[str]:
+        """
+        Keys of leads whose next reply check is due at now (ISO time, default the current time),
+        earliest first. Uses the next_review_at index, so it only touches due leads.
+        """
+        now = now or datetime.datetime.now().isoformat()
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT lead_key FROM leads WHERE next_review_at IS NOT NULL AND next_review_at <= ? ORDER BY next_review_at",
+                (now,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def known_profile_urls(self) -> set:
+        with self._lock:
+            rows = self.conn.execute("SELECT profile_url FROM leads WHERE profile_url IS NOT NULL").fetchall()
+        return {row[0] for row in rows}
+
+    def load_leads(self) -> List[Dict]:
+        """
+        Returns all leads in insertion order.
+        """
+        return self._query("SELECT data FROM leads ORDER BY rowid")
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+
+    def import_json(self, path: str = LEGACY_LEADS_FILE) -> int:
+        """
+        Imports leads from a final_leads.json style file (a JSON list of lead dicts).
+        """
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return 0
+        try:
+            with open(path, "r") as f:
+                leads = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Error reading leads from {path}: {e}", exc_info=True)
+            return 0
+        count = self.upsert_many(leads)
+        logger.info(f"Imported {count} leads from {path} into {self.db_path}")
+        return count
+
+    def export_json(self, path: str = LEGACY_LEADS_FILE) -> int:
+        """
+        Writes all leads to a final_leads.json style file. The file is replaced atomically.
+        """
+        leads = self.load_leads()
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(leads, f, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Error exporting leads to {path}: {e}", exc_info=True)
+            return 0
+        logger.info(f"Exported {len(leads)} leads to {path}")
+        return len(leads)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_lead_store() -> LeadStore:
+    """
+    Returns the process-wide LeadStore shared by all agents.
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = LeadStore()
+        return _default_store
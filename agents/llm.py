@@ -0,0 +1,324 @@
+# llm.py
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Dict, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+from agents.disk_cache import DiskCache
+from agents.rate_limiter import AsyncRateLimiter
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+DAY = 24 * 60 * 60
+
+# Per-provider defaults; every value can be overridden with LLM_<PROVIDER>_<SETTING>, e.g. LLM_GEMINI_CONCURRENCY
+PROVIDERS = {
+    "gemini": {"api_key_env": "GOOGLE_API_KEY", "concurrency": 5, "rate_per_second": 0, "timeout": 60},
+    "openai": {"api_key_env": "OPENAI_API_KEY", "concurrency": 4, "rate_per_second": 0, "timeout": 120},
+    "deepseek": {
+        "api_key_env": "DEEPSEEK_API_KEY",
+        "base_url": "https://api.deepseek.com/",
+        "concurrency": 4,
+        "rate_per_second": 0,
+        "timeout": 60,
+    },
+}
+
+
+class LLMResponse(NamedTuple):
+    text: str
+    provider: str
+    model: str
+    prompt_tokens: int
+    cached_tokens: int  # prompt tokens served from the provider's prompt/context cache
+    output_tokens: int
+    latency: float  # seconds, 0 for response-cache hits
+    from_cache: bool  # served from the gateway's on-disk response cache
+
+
+def _status_code(error) -> Optional[int]:
+    """HTTP status of a provider SDK error (openai: status_code, google-genai: code), if any"""
+    for attr in ("status_code", "code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def _is_retryable(error) -> bool:
+    """Timeouts, network errors, 429 and 5xx are retried; other 4xx (bad request, auth) are not"""
+    status = _status_code(error)
+    return status is None or status == 429 or status >= 500
+
+
+class _Provider:
+    """
+    Settings, limits and the SDK client for one provider.
+    - Clients are created lazily, so a missing API key only matters for providers that are actually used.
+    - Async clients, semaphores and connection pools are bound to the event loop that created them,
+      so they are re-created when a new loop is used (e.g. separate asyncio.run calls).
+    """
+
+    def __init__(self, name: str, defaults: Dict):
+        prefix = f"LLM_{name.upper()}_"
+        self.name = name
+        self.api_key_env = defaults["api_key_env"]
+        self.base_url = os.getenv(f"{prefix}BASE_URL", defaults.get("base_url"))
+        self.concurrency = int(os.getenv(f"{prefix}CONCURRENCY", defaults["concurrency"]))
+        self.timeout = float(os.getenv(f"{prefix}TIMEOUT_SECONDS", defaults["timeout"]))
+        self.max_retries = int(os.getenv(f"{prefix}MAX_RETRIES", os.getenv("LLM_MAX_RETRIES", "3")))
+        self.rate_limiter = AsyncRateLimiter(float(os.getenv(f"{prefix}RATE_PER_SECOND", defaults["rate_per_second"])))
+        self._client = None
+        self._semaphore = None
+        self._loop = None
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._client = None
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+
+    def semaphore(self):
+        self._bind_loop()
+        return self._semaphore
+
+    def client(self):
+        self._bind_loop()
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+
+    def _create_client(self):
+        api_key = os.getenv(self.api_key_env)
+        if self.name == "gemini":
+            from google import genai
+            return genai.Client(api_key=api_key).aio
+        import httpx
+        from openai import AsyncOpenAI
+        # One pooled HTTP client per provider, sized to its concurrency; retries are done by the gateway
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            timeout=self.timeout,
+        )
+        return AsyncOpenAI(api_key=api_key, base_url=self.base_url, http_client=http_client, max_retries=0)
+
+    async def call(self, model, prompt, system_instruction, temperature, json_output, cached_content):
+        """
+        One request through the provider's SDK. Returns (text, prompt_tokens, cached_tokens, output_tokens).
+        """
+        if self.name == "gemini":
+            from google.genai import types
+            config = types.GenerateContentConfig(temperature=temperature)
+            if cached_content:
+                config.cached_content = cached_content
+            elif system_instruction:
+                config.system_instruction = system_instruction
+            if json_output:
+                config.response_mime_type = "application/json"
+            response = await self.client().models.generate_content(model=model, contents=prompt, config=config)
+            usage = getattr(response, "usage_metadata", None)
+            return (
+                response.text or "",
+                (usage.prompt_token_count or 0) if usage else 0,
+                (usage.cached_content_token_count or 0) if usage else 0,
+                (usage.candidates_token_count or 0) if usage else 0,
+            )
+
+        messages = []
+        if system_instruction:
+            messages.append({"role": "system", "content": system_instruction})
+        messages.append({"role": "user", "content": prompt})
+        params = {"model": model, "messages": messages}
+        if temperature is not None:
+            params["temperature"] = temperature
+        if json_output:
+            params["response_format"] = {"type": "json_object"}
+        response = await self.client().chat.completions.create(**params)
+        text = response.choices[0].message.content if response.choices else ""
+        usage = response.usage
+        if usage is None:
+            return text or "", 0, 0, 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        # OpenAI reports cached prompt tokens in prompt_tokens_details, DeepSeek as prompt_cache_hit_tokens
+        cached = (getattr(details, "cached_tokens", None) if details else None) or getattr(usage, "prompt_cache_hit_tokens", 0) or 0
+        return text or "", usage.prompt_tokens or 0, cached, usage.completion_tokens or 0
+
+
+class LLMGateway:
+    """
+    Single entry point for every LLM call in the pipeline (Gemini, OpenAI, DeepSeek).
+    - Per-provider concurrency (semaphore), request rate (token bucket), timeout and retries with
+      exponential backoff plus jitter; a 429 pauses the provider's limiter for every caller.
+    - Shared, pooled SDK clients per provider.
+    - Optional on-disk response cache (per call, cache=True) keyed by a hash of provider, model and prompt;
+      disabled globally with LLM_RESPONSE_CACHE=false.
+    - Latency and token metrics per provider/model, logged per call and summarized by log_metrics().
+    """
+
+    def __init__(self):
+        self.providers = {name: _Provider(name, defaults) for name, defaults in PROVIDERS.items()}
+        self.response_cache_enabled = os.getenv("LLM_RESPONSE_CACHE", "true").lower() == "true"
+        self.response_cache_ttl = float(os.getenv("LLM_RESPONSE_CACHE_TTL_DAYS", "7")) * DAY
+        self._response_cache = None
+        self._metrics_lock = threading.Lock()
+        self.metrics = {}  # "provider/model" -> counters
+
+    @property
+    def response_cache(self):
+        if self._response_cache is None:
+            self._response_cache = DiskCache("llm_responses")
+        return self._response_cache
+
+    def provider(self, name: str) -> _Provider:
+        if name not in self.providers:
+            raise ValueError(f"Unknown LLM provider: {name}")
+        return self.providers[name]
+
+    @staticmethod
+    def cache_key(provider, model, prompt, system_instruction, temperature, json_output) -> str:
+        payload = json.dumps(
+            [provider, model, system_instruction or "", prompt, temperature, bool(json_output)],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _record(self, response: Optional[LLMResponse], provider: str, model: str, retries: int = 0, error: bool = False):
+        with self._metrics_lock:
+            m = self.metrics.setdefault(f"{provider}/{model}", {
+                "calls": 0, "errors": 0, "retries": 0, "cache_hits": 0, "latency": 0.0,
+                "prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0,
+            })
+            m["retries"] += retries
+            if error:
+                m["errors"] += 1
+                return
+            if response.from_cache:
+                m["cache_hits"] += 1
+                return
+            m["calls"] += 1
+            m["latency"] += response.latency
+            m["prompt_tokens"] += response.prompt_tokens
+            m["cached_tokens"] += response.cached_tokens
+            m["output_tokens"] += response.output_tokens
+
+    async def generate(
+        self,
+        provider: str,
+        model: str,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        temperature: Optional[float] = None,
+        json_output: bool = False,
+        cached_content: Optional[str] = None,
+        cache: bool = False,
+        label: str = "",
+    ) -> LLMResponse:
+        """
+        Generates a completion for prompt. cached_content (Gemini only) names a provider-side context that
+        already holds system_instruction. Raises the provider's last error once retries are exhausted.
+        """
+        p = self.provider(provider)
+        key = None
+        if cache and self.response_cache_enabled:
+            key = self.cache_key(provider, model, prompt, system_instruction, temperature, json_output)
+            entry = self.response_cache.get(key)
+            if entry is not None and not entry.negative:
+                response = LLMResponse(entry.value, provider, model, 0, 0, 0, 0.0, True)
+                self._record(response, provider, model)
+                return response
+
+        for attempt in range(p.max_retries + 1):
+            await p.rate_limiter.acquire()
+            start = time.monotonic()
+            try:
+                async with p.semaphore():
+                    text, prompt_tokens, cached_tokens, output_tokens = await asyncio.wait_for(
+                        p.call(model, prompt, system_instruction, temperature, json_output, cached_content),
+                        timeout=p.timeout,
+                    )
+            except Exception as e:
+                if attempt >= p.max_retries or not _is_retryable(e):
+                    self._record(None, provider, model, retries=attempt, error=True)
+                    raise
+                delay = min(2 ** attempt, 30) * random.uniform(0.5, 1.5)
+                if _status_code(e) == 429:
+                    # Slow every caller of this provider down, not just this one
+                    p.rate_limiter.pause(delay)
+                logger.warning(f"{provider} request failed (attempt {attempt + 1}): {e!r}; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            response = LLMResponse(
+                text, provider, model, prompt_tokens, cached_tokens, output_tokens, time.monotonic() - start, False
+            )
+            self._record(response, provider, model, retries=attempt)
+            logger.info(
+                f"LLM {provider}/{model}{f' [{label}]' if label else ''}: {response.latency:.2f}s "
+                f"prompt={prompt_tokens} (cached={cached_tokens}) output={output_tokens}"
+            )
+            if key is not None:
+                self.response_cache.set(key, text, self.response_cache_ttl)
+            return response
+
+    async def create_context(self, provider: str, model: str, system_instruction: str, ttl_seconds: int,
+                             display_name: str = "") -> str:
+        """
+        Creates a provider-side cached context holding system_instruction and returns its name (Gemini only;
+        other providers raise ValueError, and callers send system_instruction inline instead).
+        """
+        if provider != "gemini":
+            raise ValueError(f"Context caching is only supported for gemini, not {provider}")
+        from google.genai import types
+        p = self.provider(provider)
+        async with p.semaphore():
+            cached = await asyncio.wait_for(
+                p.client().caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        display_name=display_name or None,
+                        system_instruction=system_instruction,
+                        ttl=f"{ttl_seconds}s",
+                    ),
+                ),
+                timeout=p.timeout,
+            )
+        return cached.name
+
+    def log_metrics(self):
+        with self._metrics_lock:
+            metrics = {name: dict(m) for name, m in self.metrics.items()}
+        for name, m in metrics.items():
+            avg_latency = m["latency"] / m["calls"] if m["calls"] else 0.0
+            logger.info(
+                f"LLM usage {name}: {m['calls']} calls ({m['cache_hits']} cached, {m['errors']} failed, "
+                f"{m['retries']} retries), avg latency {avg_latency:.2f}s, {m['prompt_tokens']} prompt tokens "
+                f"({m['cached_tokens']} cached), {m['output_tokens']} output tokens"
+            )
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """
+    Process-wide gateway shared by all agents, so limits and connection pools are shared too.
+    """
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
@@ -0,0 +1,240 @@
+# outbox.py
+import os
+import json
+import sqlite3
+import hashlib
+import datetime
+import threading
+import logging
+from typing import Dict, Optional
+
+from agents.lead_store import DEFAULT_DB_PATH, lead_key
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    idempotency_key TEXT PRIMARY KEY,
+    lead_key        TEXT NOT NULL,
+    recipient       TEXT,
+    subject         TEXT,
+    state           TEXT NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    in_doubt        INTEGER NOT NULL DEFAULT 0,
+    error           TEXT,
+    created_at      TEXT NOT NULL,
+    updated_at      TEXT NOT NULL,
+    sent_at         TEXT,
+    due_at          TEXT,
+    message_id      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_state ON outbox(state, due_at);
+CREATE INDEX IF NOT EXISTS idx_outbox_lead_key ON outbox(lead_key);
+"""
+
+
+def idempotency_key(lead: Dict) -> str:
+    """
+    One key per lead and draft: the same email to the same person is journaled (and sent) once,
+    while a new draft for the lead gets a new entry.
+    """
+    draft = lead.get("email_draft", {})
+    payload = json.dumps(
+        [lead_key(lead), (lead.get("email") or "").lower(), draft.get("subject", ""), draft.get("body", "")],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Outbox:
+    """
+    Durable journal of outreach sends, stored next to the leads (SQLite, WAL, synchronous=FULL).
+    - Every message moves queued -> sending -> sent | failed, and each transition is committed before
+      the process moves on, so a crash never loses a completed send.
+    - claim() is atomic, so a message is only ever handed to one sender.
+    - Entries still 'sending' at startup are in doubt (the process died mid-send). By default they are
+      marked failed and not retried, since resending could email a prospect twice; set
+      OUTBOX_RESEND_IN_DOUBT=true to queue them again.
+    - Sends whose connection dropped after the message was handed over are in doubt too, and handled the same way.
+    - Failed sends are retried on later runs until OUTBOX_MAX_ATTEMPTS is reached.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("LEAD_STORE_PATH", DEFAULT_DB_PATH)
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.max_attempts = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "3"))
+        self.resend_in_doubt = os.getenv("OUTBOX_RESEND_IN_DOUBT", "false").lower() == "true"
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+
+    def _migrate(self):
+        # Journals created before send windows have no due_at column, and before threading no message_id
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(outbox)")}
+        if columns and "due_at" not in columns:
+            self.conn.execute("ALTER TABLE outbox ADD COLUMN due_at TEXT")
+            self.conn.execute("DROP INDEX IF EXISTS idx_outbox_state")
+        if columns and "message_id" not in columns:
+            self.conn.execute("ALTER TABLE outbox ADD COLUMN message_id TEXT")
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.datetime.now().isoformat()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM outbox WHERE idempotency_key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def enqueue(self, lead: Dict, due_at: Optional[str] = None) -> Dict:
+        """
+        Journals the lead's current draft as queued (no-op if it is already journaled) and returns its entry.
+        due_at (ISO time) records when the send window lets it go out; it is refreshed while still queued.
+        """
+        key = idempotency_key(lead)
+        now = self._now()
+        with self._lock:
+            self.conn.execute(
+                """
+                INSERT INTO outbox (idempotency_key, lead_key, recipient, subject, state, created_at, updated_at, due_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(idempotency_key) DO UPDATE SET
+                    due_at = COALESCE(excluded.due_at, outbox.due_at)
+                WHERE outbox.state = 'queued'
+                """,
+                (key, lead_key(lead) or "", lead.get("email"), lead.get("email_draft", {}).get("subject"), QUEUED, now, now, due_at),
+            )
+            return self.get(key)
+
+    def claim(self, key: str) -> bool:
+        """
+        Moves a queued (or retryable failed) entry to sending. Returns False if it is not sendable.
+        """
+        with self._lock:
+            cursor = self.conn.execute(
+                """
+                UPDATE outbox SET state = ?, attempts = attempts + 1, updated_at = ?
+                WHERE idempotency_key = ?
+                  AND (state = ? OR (state = ? AND in_doubt = 0 AND attempts < ?))
+                """,
+                (SENDING, self._now(), key, QUEUED, FAILED, self.max_attempts),
+            )
+            return cursor.rowcount == 1
+
+    def message_id(self, key: str, new_message_id: str) -> str:
+        """
+        The Message-ID of the entry, recording new_message_id first if it has none yet. A retried send
+        reuses it, so replies to either attempt thread back to the same lead.
+        """
+        with self._lock:
+            self.conn.execute(
+                "UPDATE outbox SET message_id = COALESCE(message_id, ?) WHERE idempotency_key = ?",
+                (new_message_id, key),
+            )
+            row = self.conn.execute("SELECT message_id FROM outbox WHERE idempotency_key = ?", (key,)).fetchone()
+        return row["message_id"] if row and row["message_id"] else new_message_id
+
+    def mark_sent(self, key: str, sent_at: str):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE outbox SET state = ?, error = NULL, sent_at = ?, updated_at = ? WHERE idempotency_key = ?",
+                (SENT, sent_at, self._now(), key),
+            )
+
+    def mark_failed(self, key: str, error: str):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE outbox SET state = ?, error = ?, updated_at = ? WHERE idempotency_key = ?",
+                (FAILED, error[:500], self._now(), key),
+            )
+
+    def mark_in_doubt(self, key: str, error: str):
+        """
+        The send may or may not have gone out (the connection dropped mid-send); like an interrupted send,
+        it is only retried with OUTBOX_RESEND_IN_DOUBT=true.
+        """
+        with self._lock:
+            self.conn.execute(
+                "UPDATE outbox SET state = ?, in_doubt = ?, error = ?, updated_at = ? WHERE idempotency_key = ?",
+                (FAILED, 0 if self.resend_in_doubt else 1, f"in doubt: {error}"[:500], self._now(), key),
+            )
+
+    def recover(self) -> int:
+        """
+        Resolves entries left 'sending' by a previous process. Returns how many were found.
+        """
+        now = self._now()
+        with self._lock:
+            if self.resend_in_doubt:
+                cursor = self.conn.execute(
+                    "UPDATE outbox SET state = ?, updated_at = ? WHERE state = ?", (QUEUED, now, SENDING)
+                )
+            else:
+                cursor = self.conn.execute(
+                    "UPDATE outbox SET state = ?, in_doubt = 1, error = ?, updated_at = ? WHERE state = ?",
+                    (FAILED, "in doubt: interrupted while sending", now, SENDING),
+                )
+        if cursor.rowcount:
+            logger.warning(f"Outbox: {cursor.rowcount} sends were interrupted by a previous run "
+                           f"({'queued again' if self.resend_in_doubt else 'marked failed, not resent'})")
+        return cursor.rowcount
+
+    def sent_by_lead(self) -> Dict[str, Dict]:
+        """
+        lead_key -> {sent_at, message_id} of the latest completed send, for reconciling leads with the journal.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT lead_key, sent_at, message_id FROM outbox WHERE state = ? ORDER BY sent_at", (SENT,)
+            ).fetchall()
+        return {row["lead_key"]: {"sent_at": row["sent_at"], "message_id": row["message_id"]} for row in rows}
+
+    def due_counts(self) -> Dict[str, int]:
+        """
+        Queued entries per due date (UTC day), to see how sends are spread by the send window.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT substr(due_at, 1, 10) AS day, COUNT(*) AS n FROM outbox WHERE state = ? GROUP BY day ORDER BY day",
+                (QUEUED,),
+            ).fetchall()
+        return {row["day"] or "now": row["n"] for row in rows}
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) AS n FROM outbox GROUP BY state").fetchall()
+        return {row["state"]: row["n"] for row in rows}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+_default_outbox = None
+_default_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    """
+    Returns the process-wide Outbox. Entries interrupted by a previous process are recovered when it is
+    first opened, before this process sends anything.
+    """
+    global _default_outbox
+    with _default_outbox_lock:
+        if _default_outbox is None:
+            _default_outbox = Outbox()
+            _default_outbox.recover()
+        return _default_outbox
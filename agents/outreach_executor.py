@@ -1,12 +1,15 @@
 # outreach_executor.py
-import smtplib
 from email.mime.text import MIMEText
+from email.utils import make_msgid
 from typing import List, Dict
 from dotenv import load_dotenv
 import os
 import datetime
-import time
 import logging  # Added logging
+from agents.lead_store import get_lead_store, lead_key
+from agents.outbox import get_outbox, idempotency_key
+from agents.smtp_pool import get_smtp_pool, SendInDoubt
+from agents.send_scheduler import SendScheduler
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -20,37 +23,107 @@ class OutreachExecutorAgent:
     input_schema = {"leads": List[Dict]}
     output_schema = {"leads": List[Dict]}  # Update same leads list
 
+    def __init__(self):
+        self.lead_store = get_lead_store()
+        self.smtp_pool = get_smtp_pool()
+        # Pacing (per sender and per recipient domain) without blocking the event loop
+        self.scheduler = SendScheduler(self.send_lead)
+        # Write-ahead journal of every send, so a restart neither loses nor repeats completed sends
+        self.outbox = get_outbox()
+
+    def record_sent(self, lead, sent_time, message_id=None):
+        """Marks the lead as sent and persists it, with the Message-ID replies will reference"""
+        lead["email_sent"] = True
+        lead["email_sent_time"] = sent_time
+        if message_id:
+            lead["email_message_id"] = message_id
+        self.lead_store.upsert(lead)
+
+    def resume(self, leads):
+        """
+        Marks leads as sent when the outbox journal has a completed send for them that never reached the
+        lead record (e.g. the process died right after sending). Returns how many leads were updated.
+        """
+        sent = self.outbox.sent_by_lead()
+        resumed = 0
+        for lead in leads:
+            entry = sent.get(lead_key(lead))
+            if entry and not lead.get("email_sent"):
+                self.record_sent(lead, entry["sent_at"], entry["message_id"])
+                resumed += 1
+        if resumed:
+            logger.info(f"Recovered {resumed} sends from the outbox journal")
+        return resumed
+
+    def journal(self, lead):
+        """
+        Journals the lead's draft as queued in the outbox before it waits for its send slot.
+        """
+        if "email_draft" in lead and "email_sent" not in lead:
+            self.outbox.enqueue(lead, self.scheduler.due_at(lead).isoformat())
+
+    async def submit(self, lead):
+        self.journal(lead)
+        return await self.scheduler.submit(lead)
+
+    def send_lead(self, lead):
+        """
+        Sends the drafted email for a single lead and records the send. Returns True if an email went out.
+        """
+        if "email_draft" not in lead or "email_sent" in lead:  # Skip if already sent
+            return False
+        to_email = lead.get("email", "lead@example.com")
+        draft = lead.get("email_draft", {})
+        # msg = MIMEText(draft.get("body", "") + "<br><br>" + draft.get("cta", ""), _subtype="html")
+        html_content = f"""
+                        <html>
+                        <body>
+                            {draft.get("body", "")}<br>
+                            {draft.get("cta", "")}
+                        </body>
+                        </html>
+                        """
+        msg = MIMEText(html_content, _subtype="html")
+
+        sender = os.getenv("SMTP_USER") or ""
+        msg["Subject"] = draft.get("subject", "Default Subject")
+        msg["From"] = sender
+        msg["To"] = to_email
+
+        key = idempotency_key(lead)
+        entry = self.outbox.enqueue(lead)
+        if entry["state"] == "sent":
+            # Already went out in an earlier run; only the lead record was behind
+            self.record_sent(lead, entry["sent_at"], entry.get("message_id"))
+            return False
+        if not self.outbox.claim(key):
+            logger.warning(f"Not sending to {to_email}: outbox entry is {entry['state']} ({entry.get('error') or 'no error'})")
+            return False
+        # Unique per send and journaled before it goes out; replies carry it in In-Reply-To/References
+        message_id = self.outbox.message_id(key, make_msgid(domain=sender.rsplit("@", 1)[-1] if "@" in sender else None))
+        msg["Message-ID"] = message_id
+        try:
+            self.smtp_pool.send(msg)
+        except SendInDoubt as e:
+            self.outbox.mark_in_doubt(key, str(e))
+            logger.error(f"Email to {to_email} may or may not have been delivered; marked in doubt, not resent: {e}")
+            return False
+        except Exception as e:
+            self.outbox.mark_failed(key, str(e))
+            logger.error(f"Error sending email to {to_email}: {e}", exc_info=True)
+            return False
+        sent_time = datetime.datetime.now().isoformat()
+        self.outbox.mark_sent(key, sent_time)  # Journal first: it is what a restart trusts
+        self.record_sent(lead, sent_time, message_id)
+        logger.info(f"Email sent to {to_email} for lead {lead.get('profile_url', 'unknown')}")
+        return True
+
     async def run(self, state):
         print(f"[{datetime.datetime.now()}] Starting outreach_executor")  # Kept print for consistency
         leads = state.get("leads", [])  # Use .get to avoid KeyError
+        self.resume(leads)
         for lead in leads:
-            if "email_draft" in lead and "email_sent" not in lead:  # Skip if already sent
-                to_email = lead.get("email", "lead@example.com")
-                draft = lead.get("email_draft", {})
-                # msg = MIMEText(draft.get("body", "") + "<br><br>" + draft.get("cta", ""), _subtype="html")
-                html_content = f"""
-                                <html>
-                                <body>
-                                    {draft.get("body", "")}<br>
-                                    {draft.get("cta", "")}
-                                </body>
-                                </html>
-                                """
-                msg = MIMEText(html_content, _subtype="html")
-
-                msg["Subject"] = draft.get("subject", "Default Subject")
-                msg["From"] = os.getenv("SMTP_USER")
-                msg["To"] = to_email
-                try:
-                    with smtplib.SMTP(os.getenv("SMTP_HOST"), 587) as server:
-                        server.starttls()
-                        server.login(os.getenv("SMTP_USER"), os.getenv("SMTP_PASSWORD"))
-                        server.send_message(msg)
-                    logger.info(f"Email sent to {to_email} for lead {lead.get('profile_url', 'unknown')}")
-                    lead["email_sent"] = True
-                    lead["email_sent_time"] = datetime.datetime.now().isoformat()
-                    time.sleep(5)  # Delay for sequencing
-                except Exception as e:
-                    logger.error(f"Error sending email to {to_email}: {e}", exc_info=True)
+            self.journal(lead)
+        await self.scheduler.send_all(leads)
         print(f"[{datetime.datetime.now()}] Completed outreach_executor: Emails sent for {len(leads)} leads")
         return {"leads": leads}
\ No newline at end of file
@@ -0,0 +1,56 @@
+# profile_cache.py
+import os
+import logging
+from urllib.parse import urlsplit, unquote
+from typing import Dict, Optional
+
+from agents.disk_cache import DiskCache, CacheEntry
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60
+
+
+def normalize_profile_url(url: str) -> str:
+    """
+    Canonical form of a LinkedIn profile URL: https://www.linkedin.com/in/<slug>, lower-cased,
+    without query string, fragment, locale suffix or trailing slash.
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip() if "://" in url else f"https://{url.strip()}")
+    path = unquote(parts.path).rstrip("/").lower()
+    if "/in/" in path:
+        slug = path.split("/in/", 1)[1].split("/")[0]
+        return f"https://www.linkedin.com/in/{slug}"
+    host = parts.netloc.lower()
+    if host.endswith("linkedin.com"):
+        host = "www.linkedin.com"
+    return f"https://{host}{path}"
+
+
+class ProfileCache:
+    """
+    Cross-run cache of extract_full_profile_data results keyed by normalized profile URL.
+    - Valid profiles are kept for PROFILE_CACHE_TTL_DAYS (default 7).
+    - Profiles that loaded but did not meet the lead criteria are cached as negative entries
+      for PROFILE_CACHE_NEGATIVE_TTL_DAYS (default 1) so they are not revisited every run.
+    """
+
+    def __init__(self, ttl_days: Optional[float] = None, negative_ttl_days: Optional[float] = None):
+        self.cache = DiskCache("linkedin_profiles")
+        self.ttl = float(ttl_days if ttl_days is not None else os.getenv("PROFILE_CACHE_TTL_DAYS", "7")) * DAY
+        self.negative_ttl = float(
+            negative_ttl_days if negative_ttl_days is not None else os.getenv("PROFILE_CACHE_NEGATIVE_TTL_DAYS", "1")
+        ) * DAY
+
+    def get(self, profile_url: str) -> Optional[CacheEntry]:
+        return self.cache.get(normalize_profile_url(profile_url))
+
+    def put(self, profile_url: str, profile_data: Dict):
+        self.cache.set(normalize_profile_url(profile_url), profile_data, self.ttl)
+
+    def put_invalid(self, profile_url: str, profile_data: Optional[Dict] = None):
+        self.cache.set_negative(normalize_profile_url(profile_url), self.negative_ttl, profile_data)
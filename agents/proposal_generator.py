@@ -3,11 +3,12 @@ import jinja2
 import pdfkit
 from pydantic import BaseModel
 from typing import List, Dict
-from openai import OpenAI
 from dotenv import load_dotenv
 import os
 import datetime
 import logging
+from agents.lead_store import get_lead_store
+from agents.llm import get_llm_gateway
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -27,7 +28,8 @@ class ProposalGeneratorAgent:
     output_schema = {"leads": List[Dict]}  # Update same leads list
 
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.llm = get_llm_gateway()
+        self.lead_store = get_lead_store()
         self.env = jinja2.Environment()
         # Embed the template as a string instead of loading from external HTML file
         self.template_string = """
@@ -65,11 +67,10 @@ class ProposalGeneratorAgent:
                 Use fixed-price model. Include scope, timeline, deliverables.
                 """
                 try:
-                    response = self.client.chat.completions.create(
-                        model="gpt-4",
-                        messages=[{"role": "user", "content": prompt}]
+                    response = await self.llm.generate(
+                        "openai", "gpt-4", prompt, cache=True, label=lead.get('profile_url', 'unknown')
                     )
-                    sow_content = response.choices[0].message.content
+                    sow_content = response.text
                 except Exception as e:
                     logger.error(f"Error generating SoW with AI: {e}", exc_info=True)
                     sow_content = "Default SoW content"
@@ -87,5 +88,6 @@ class ProposalGeneratorAgent:
                 lead["proposal"] = {
                     "proposal_path": proposal_path
                 }
+                self.lead_store.upsert(lead)
         print(f"[{datetime.datetime.now()}] Completed proposal_generator: Proposals generated for {generated_count} leads")
         return {"leads": leads}
\ No newline at end of file
@@ -0,0 +1,52 @@
+# rate_limiter.py
+import time
+import asyncio
+from typing import Optional
+
+
+class AsyncRateLimiter:
+    """
+    Token bucket for asyncio code.
+    - Allows `rate` acquisitions per second on average, with bursts of up to `burst`.
+    - pause() stops all acquisitions for a while, e.g. after the server answered 429.
+    - A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(self.rate, 1.0))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = None
+        self._loop = None
+
+    def _get_lock(self):
+        # asyncio primitives are bound to the loop that first uses them
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._get_lock():
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
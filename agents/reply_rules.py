@@ -0,0 +1,97 @@
+# reply_rules.py
+import re
+from typing import Dict, NamedTuple, Optional
+
+
+class RuleMatch(NamedTuple):
+    rule: str  # name of the rule that decided the reply
+    analysis: Dict  # same shape as the LLM analysis: summary, interest, meeting_details
+
+
+# Senders and subjects of delivery failure notices
+BOUNCE_SENDER = re.compile(r"^(mailer-daemon|postmaster|mail-daemon|bounces?)@", re.IGNORECASE)
+BOUNCE_SUBJECT = re.compile(
+    r"(delivery status notification|undeliverable|undelivered mail|mail delivery (failed|failure|subsystem)"
+    r"|returned mail|delivery (has )?failed|failure notice)",
+    re.IGNORECASE,
+)
+# RFC 3834 auto-replies (Auto-Submitted other than "no") and the vendor headers used by common responders
+AUTO_SUBMITTED = re.compile(r"^\s*auto-(replied|generated|notified)", re.IGNORECASE)
+AUTO_REPLY_HEADERS = ("x-autoreply", "x-autorespond", "x-autoresponse")
+AUTO_PRECEDENCE = re.compile(r"^\s*(auto_reply|bulk|junk)\s*$", re.IGNORECASE)
+AUTO_REPLY_SUBJECT = re.compile(
+    r"^\s*(automatic reply|auto[- ]?reply|autoreply|auto[- ]?response|out of (the )?office|ooo\b|abwesenheit|absence)",
+    re.IGNORECASE,
+)
+OUT_OF_OFFICE_BODY = re.compile(
+    r"\b(i am|i'm|i will be|i'll be)\s+(currently\s+)?(out of (the )?office|on (annual |parental |sick |maternity |paternity )?leave"
+    r"|on (vacation|holiday)|away from (the|my) (office|desk))\b",
+    re.IGNORECASE,
+)
+UNSUBSCRIBE = re.compile(
+    r"(^\W*(unsubscribe|stop|remove( me)?|opt[- ]?out)\W*$"
+    r"|\bunsubscribe me\b|\bremove me from (your|this|the) (mailing |email )?list\b"
+    r"|\b(take|drop) me off (your|this|the) (mailing |email )?list\b|\bstop (emailing|contacting|messaging) me\b)",
+    re.IGNORECASE,
+)
+NOT_INTERESTED = re.compile(
+    r"\b(not interested|no thanks|no,? thank you|not a (good )?fit|we('re| are) (all set|not looking)"
+    r"|(don't|do not) (contact|email) (me|us)( again)?|not (something|anything) we need|pass on this)\b",
+    re.IGNORECASE,
+)
+# Anything hinting at a follow-up, question or meeting makes a short negative reply ambiguous
+AMBIGUOUS = re.compile(
+    r"\?|\b(but|however|unless|maybe|perhaps|later|next (week|month|quarter|year)|in the future|reach out"
+    r"|call|meet|meeting|demo|schedule)\b",
+    re.IGNORECASE,
+)
+# Quoted history: "On <date>, <name> wrote:" and everything after it, plus "> " lines
+QUOTE_HEADER = re.compile(r"^\s*(on .+ wrote:|-+\s*original message\s*-+|from: .+)$", re.IGNORECASE | re.MULTILINE)
+MAX_SHORT_REPLY_CHARS = 300
+
+
+def new_text(body: str) -> str:
+    """The part of a reply its sender wrote, without the quoted thread"""
+    match = QUOTE_HEADER.search(body)
+    if match:
+        body = body[:match.start()]
+    return "\n".join(line for line in body.splitlines() if not line.lstrip().startswith(">")).strip()
+
+
+def _result(rule: str, summary: str, interest: str) -> RuleMatch:
+    return RuleMatch(rule, {"summary": summary, "interest": interest, "meeting_details": None})
+
+
+def classify_reply(headers: Dict[str, str], body: str) -> Optional[RuleMatch]:
+    """
+    Resolves obvious replies without the LLM: bounces, auto-replies and out-of-office notices, and short
+    unsubscribe or "not interested" answers. headers maps lower-cased header names to values.
+    Returns None when the reply needs the LLM.
+    """
+    sender = headers.get("from", "")
+    address = sender[sender.find("<") + 1:sender.rfind(">")] if "<" in sender else sender.strip()
+    subject = headers.get("subject", "")
+    content_type = headers.get("content-type", "")
+
+    if BOUNCE_SENDER.match(address) or BOUNCE_SUBJECT.search(subject) or "report-type=delivery-status" in content_type.lower():
+        return _result("bounce", "Delivery failure notice (bounce).", "other")
+
+    if (
+        AUTO_SUBMITTED.match(headers.get("auto-submitted", ""))
+        or any(name in headers for name in AUTO_REPLY_HEADERS)
+        or AUTO_PRECEDENCE.match(headers.get("precedence", ""))
+        or AUTO_REPLY_SUBJECT.match(subject)
+    ):
+        return _result("auto_reply", "Automatic reply (out of office or autoresponder).", "other")
+
+    text = new_text(body)
+    if OUT_OF_OFFICE_BODY.search(text) and len(text) <= MAX_SHORT_REPLY_CHARS * 2:
+        return _result("out_of_office", "Out-of-office notice.", "other")
+
+    if not text or len(text) > MAX_SHORT_REPLY_CHARS:
+        return None
+    if UNSUBSCRIBE.search(text):
+        return _result("unsubscribe", "Asked to be removed from the mailing list.", "not_interested")
+    if NOT_INTERESTED.search(text) and not AMBIGUOUS.search(text):
+        return _result("not_interested", "Declined: not interested.", "not_interested")
+    return None
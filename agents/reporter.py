@@ -1,5 +1,4 @@
 # reporter.py
-import smtplib
 from email.mime.text import MIMEText
 from typing import Dict, List
 from dotenv import load_dotenv
@@ -7,6 +6,7 @@ import os
 import datetime
 import json
 import logging
+from agents.smtp_pool import get_smtp_pool
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -38,10 +38,7 @@ class ReporterAgent:
         msg["To"] = state.get("reporting_email", "salesmanager@bacancy.com") # reporting_email
 
         try:
-            with smtplib.SMTP(os.getenv("SMTP_HOST"), 587) as server:
-                server.starttls()
-                server.login(os.getenv("SMTP_USER"), os.getenv("SMTP_PASSWORD"))
-                server.send_message(msg)
+            get_smtp_pool().send(msg)
             logger.info("Summary email sent successfully")
         except Exception as e:
             logger.error(f"Error sending summary email: {e}", exc_info=True)
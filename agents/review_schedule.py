@@ -0,0 +1,51 @@
+# review_schedule.py
+import os
+import datetime
+from typing import Optional
+
+
+class ReviewSchedule:
+    """
+    Decaying schedule for checking a sent lead for replies: frequent right after the send, sparser later,
+    and no more checks once `cutoff` has passed since the send.
+    Check times are offsets from the send time: first_interval, then each gap grows by `factor`
+    (capped at max_interval), so they only depend on the send time and the current time.
+    """
+
+    def __init__(
+        self,
+        first_interval: datetime.timedelta,
+        factor: float,
+        max_interval: datetime.timedelta,
+        cutoff: datetime.timedelta,
+    ):
+        self.first_interval = max(first_interval, datetime.timedelta(minutes=1))
+        self.factor = max(factor, 1.0)
+        self.max_interval = max(max_interval, self.first_interval)
+        self.cutoff = cutoff
+
+    @classmethod
+    def from_env(cls) -> "ReviewSchedule":
+        """
+        REVIEW_FIRST_INTERVAL_HOURS (default 4), REVIEW_BACKOFF_FACTOR (default 2),
+        REVIEW_MAX_INTERVAL_HOURS (default 72) and REVIEW_CUTOFF_DAYS (default 30).
+        """
+        return cls(
+            datetime.timedelta(hours=float(os.getenv("REVIEW_FIRST_INTERVAL_HOURS", "4"))),
+            float(os.getenv("REVIEW_BACKOFF_FACTOR", "2")),
+            datetime.timedelta(hours=float(os.getenv("REVIEW_MAX_INTERVAL_HOURS", "72"))),
+            datetime.timedelta(days=float(os.getenv("REVIEW_CUTOFF_DAYS", "30"))),
+        )
+
+    def next_review_at(self, sent_time: datetime.datetime, now: datetime.datetime) -> Optional[datetime.datetime]:
+        """
+        First check time after now for an email sent at sent_time, or None once the cutoff has passed.
+        """
+        end = sent_time + self.cutoff
+        if now >= end:
+            return None
+        offset, gap = self.first_interval, self.first_interval
+        while sent_time + offset <= now:
+            gap = min(gap * self.factor, self.max_interval)
+            offset += gap
+        return min(sent_time + offset, end)
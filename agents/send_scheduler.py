@@ -0,0 +1,160 @@
+# send_scheduler.py
+import os
+import heapq
+import asyncio
+import datetime
+import itertools
+import logging
+from typing import Callable, Dict, List, Optional
+
+from agents.rate_limiter import AsyncRateLimiter
+from agents.timezones import SendWindow
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def recipient_domain(lead: Dict) -> str:
+    email = lead.get("email") or ""
+    return email.rsplit("@", 1)[-1].lower() if "@" in email else ""
+
+
+class DueQueue:
+    """
+    Min-heap of sends keyed by due time, drained by a single dispatcher task: waiters sleep on a future
+    instead of one timer each, and the dispatcher only wakes for the earliest due entry (or a new, earlier one).
+    """
+
+    def __init__(self):
+        self._heap = []  # (due timestamp, sequence, Future)
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._dispatcher = None
+        self._loop = None
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._heap = []
+            self._wakeup = asyncio.Event()
+            self._dispatcher = None
+            self._loop = loop
+
+    def __len__(self):
+        return len(self._heap)
+
+    async def wait_until(self, due_at: datetime.datetime):
+        """Returns once due_at (timezone-aware) has passed"""
+        self._bind_loop()
+        due = due_at.timestamp()
+        if due <= datetime.datetime.now(datetime.timezone.utc).timestamp():
+            return
+        future = self._loop.create_future()
+        heapq.heappush(self._heap, (due, next(self._seq), future))
+        if self._heap[0][2] is future:
+            self._wakeup.set()  # New earliest entry: the dispatcher re-arms its timer
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        while self._heap:
+            now = datetime.datetime.now(datetime.timezone.utc).timestamp()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, future = heapq.heappop(self._heap)
+                if not future.done():
+                    future.set_result(None)
+            if not self._heap:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._heap[0][0] - now)
+            except asyncio.TimeoutError:
+                pass
+
+
+class SendScheduler:
+    """
+    Non-blocking pacing for outreach sends.
+    - Every send waits for a token from its sender's bucket and from its recipient domain's bucket,
+      so one busy domain doesn't hold back sends to other domains.
+    - Sends run in worker threads (the blocking SMTP call goes through the shared pool) and at most
+      `workers` run at once; waiting never blocks the event loop.
+    - With a send window configured (OUTREACH_SEND_WINDOW), each send first waits in a due-time heap until
+      the window opens at the recipient's location, so a long-running sender spreads sends across timezones.
+    - `send` is a blocking callable taking a lead and returning True when an email went out.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Dict], bool],
+        workers: Optional[int] = None,
+        sender_rate_per_minute: Optional[float] = None,
+        domain_rate_per_minute: Optional[float] = None,
+        window: Optional[SendWindow] = None,
+    ):
+        self.send = send
+        self.workers = max(int(workers or os.getenv("OUTREACH_SEND_WORKERS", "2")), 1)
+        self.sender_rate = float(
+            sender_rate_per_minute if sender_rate_per_minute is not None
+            else os.getenv("OUTREACH_SENDER_RATE_PER_MINUTE", "12")
+        ) / 60
+        self.domain_rate = float(
+            domain_rate_per_minute if domain_rate_per_minute is not None
+            else os.getenv("OUTREACH_DOMAIN_RATE_PER_MINUTE", "6")
+        ) / 60
+        self.window = window if window is not None else SendWindow.from_env()
+        self.due_queue = DueQueue()
+        self.sender_limiters = {}  # sender address -> AsyncRateLimiter
+        self.domain_limiters = {}  # recipient domain -> AsyncRateLimiter
+        self._semaphore = None
+        self._semaphore_loop = None
+
+    def _get_semaphore(self):
+        # asyncio primitives are bound to the loop that first uses them
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.workers)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def _limiter(self, limiters, key, rate):
+        limiter = limiters.get(key)
+        if limiter is None:
+            # burst of 1: tokens are spaced evenly instead of the first minute going out at once
+            limiter = limiters[key] = AsyncRateLimiter(rate, burst=1)
+        return limiter
+
+    def due_at(self, lead: Dict) -> datetime.datetime:
+        """
+        When the lead may be sent: now, or the next opening of the send window at the lead's location.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if self.window is None:
+            return now
+        return self.window.next_send_time(lead.get("location", ""), now)
+
+    async def submit(self, lead: Dict, sender: Optional[str] = None) -> bool:
+        """
+        Waits for the lead's send window and pacing slot, then sends it. Returns True if an email went out.
+        """
+        if "email_draft" not in lead or "email_sent" in lead:
+            return False
+        sender = sender or os.getenv("SMTP_USER") or ""
+        await self.due_queue.wait_until(self.due_at(lead))
+        await self._limiter(self.domain_limiters, recipient_domain(lead), self.domain_rate).acquire()
+        await self._limiter(self.sender_limiters, sender, self.sender_rate).acquire()
+        async with self._get_semaphore():
+            try:
+                return await asyncio.to_thread(self.send, lead)
+            except Exception as e:
+                logger.error(f"Error sending to lead {lead.get('profile_url', 'unknown')}: {e}", exc_info=True)
+                return False
+
+    async def send_all(self, leads: List[Dict]) -> int:
+        """
+        Schedules every lead at once and returns how many emails went out.
+        """
+        results = await asyncio.gather(*(self.submit(lead) for lead in leads))
+        return sum(1 for sent in results if sent)
@@ -0,0 +1,196 @@
+# smtp_pool.py
+import os
+import time
+import atexit
+import smtplib
+import logging
+import threading
+from typing import Optional
+
+from dotenv import load_dotenv
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+
+class SendInDoubt(smtplib.SMTPException):
+    """
+    The connection dropped after the message was handed to the server, so it may or may not have been delivered.
+    Not retried: resending could deliver it twice.
+    """
+
+
+def _is_connection_error(error: Exception) -> bool:
+    """
+    True when the session is no longer usable: the server hung up, a socket error, or a 421 reply.
+    SMTPException subclasses OSError, so other SMTP errors (e.g. a refused recipient) are excluded.
+    """
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code == 421
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class _Session:
+    """One authenticated SMTP connection and how much it has been used"""
+
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.server.quit()
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+
+
+class SMTPPool:
+    """
+    Shared, thread-safe pool of authenticated SMTP sessions (STARTTLS + LOGIN done once per connection).
+    - Up to `size` connections are kept open and reused for many messages.
+    - A connection is retired after `max_messages` messages, since many servers limit messages per session.
+    - Connections idle for longer than `idle_check` seconds are probed with NOOP before reuse.
+    - Opening a connection (connect, STARTTLS, login) is retried once. A connection lost while the message is
+      being sent raises SendInDoubt instead of resending it, since the server may already have accepted it.
+    """
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        size: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        idle_check: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.host = host or os.getenv("SMTP_HOST")
+        self.port = int(port or os.getenv("SMTP_PORT", "587"))
+        self.user = user or os.getenv("SMTP_USER")
+        self.password = password or os.getenv("SMTP_PASSWORD")
+        self.size = max(int(size or os.getenv("SMTP_POOL_SIZE", "2")), 1)
+        self.max_messages = int(max_messages or os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "50"))
+        self.idle_check = float(idle_check if idle_check is not None else os.getenv("SMTP_IDLE_CHECK_SECONDS", "30"))
+        self.timeout = float(timeout or os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+        self._idle = []  # open sessions not in use
+        self._open = 0  # sessions open, in use or idle
+        self._cond = threading.Condition()
+
+    def _connect(self) -> _Session:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.starttls()
+            server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        logger.info(f"Opened SMTP session to {self.host}:{self.port}")
+        return _Session(server)
+
+    def _acquire(self) -> Optional[_Session]:
+        """
+        An idle session, or None when the caller may open a new one (a slot is reserved for it).
+        Blocks while all `size` sessions are in use.
+        """
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._open < self.size:
+                    self._open += 1
+                    return None
+                self._cond.wait()
+
+    def _release(self, session: Optional[_Session], broken: bool = False):
+        """Returns a session to the pool, or closes it if it is broken or used up, freeing its slot"""
+        retire = session is None or broken or session.sent >= self.max_messages
+        if retire and session is not None:
+            session.close()
+        with self._cond:
+            if retire:
+                self._open -= 1
+            else:
+                session.last_used = time.monotonic()
+                self._idle.append(session)
+            self._cond.notify()
+
+    def _is_alive(self, session: _Session) -> bool:
+        if time.monotonic() - session.last_used < self.idle_check:
+            return True
+        try:
+            return session.server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def send(self, msg):
+        """
+        Sends an email.message.Message over a pooled session. Raises the SMTP error if it cannot be sent.
+        """
+        session = self._acquire()
+        try:
+            if session is not None and not self._is_alive(session):
+                session.close()
+                session = None
+            for attempt in range(2):
+                if session is not None:
+                    break
+                try:
+                    session = self._connect()
+                except Exception as e:
+                    if attempt or not _is_connection_error(e):
+                        raise
+                    logger.warning(f"Could not open SMTP session ({e!r}), retrying")
+            try:
+                session.server.send_message(msg)
+            except Exception as e:
+                if not _is_connection_error(e):
+                    raise
+                session.close()
+                session = None
+                raise SendInDoubt(f"SMTP session dropped while sending, the message may have been delivered: {e!r}") from e
+            session.sent += 1
+        except Exception:
+            self._release(session, broken=session is not None and not self._is_healthy_after_error(session))
+            raise
+        self._release(session)
+
+    def _is_healthy_after_error(self, session: _Session) -> bool:
+        # Recipient or data errors leave the session usable; RSET clears the failed transaction
+        try:
+            return session.server.rset()[0] == 250
+        except Exception:
+            return False
+
+    def close(self):
+        with self._cond:
+            sessions, self._idle = self._idle, []
+            self._open -= len(sessions)
+        for session in sessions:
+            session.close()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPPool:
+    """
+    Returns the process-wide SMTP pool shared by all agents; its sessions are closed at exit.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = SMTPPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
@@ -0,0 +1,148 @@
+# streaming_pipeline.py
+import os
+import time
+import asyncio
+import datetime
+import logging
+from typing import List, Dict
+
+from agents.lead_store import get_lead_store
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's output; one is forwarded downstream once all workers of a stage are done
+_END = object()
+
+
+class StreamingPipeline:
+    """
+    Per-lead streaming pipeline: discovery -> enrich -> write_email -> execute_outreach.
+    - Stages are connected by bounded asyncio queues, so a slow stage applies backpressure upstream
+      (all the way back to the scraper thread).
+    - Each lead moves to the next stage as soon as it is ready, so the first email can go out while
+      later profiles are still being scraped, and network waits of different stages overlap.
+    - Leads already in state that have not been sent yet are fed into the pipeline ahead of discovery.
+    """
+    name = "streaming_pipeline"
+    description = "Streams leads from discovery through outreach"
+    input_schema = {"leads": List[Dict]}
+    output_schema = {"leads": List[Dict]}
+
+    def __init__(self, discovery, enricher, writer, outreach):
+        self.discovery = discovery
+        self.enricher = enricher
+        self.writer = writer
+        self.outreach = outreach
+        self.lead_store = get_lead_store()
+        self.queue_size = int(os.getenv("STREAM_QUEUE_SIZE", "5"))
+        self.enrich_workers = int(os.getenv("STREAM_ENRICH_WORKERS", "2"))
+        self.write_workers = int(os.getenv("STREAM_WRITE_WORKERS", "2"))
+        # Leads waiting for their pacing slot each hold a worker; more workers let other domains go ahead
+        self.send_workers = int(os.getenv("STREAM_SEND_WORKERS", "4"))
+
+    async def _discover(self, state, out_queue):
+        leads = state.setdefault("leads", [])
+        known_urls = {lead.get("profile_url", "") for lead in leads}
+
+        # Resume leads from earlier runs that never made it to outreach
+        for lead in leads:
+            if not lead.get("email_sent"):
+                await out_queue.put(lead)
+
+        new_queue = asyncio.Queue(maxsize=self.queue_size)
+        discovery_task = asyncio.create_task(self._discovery_to_queue(state, new_queue))
+        added = 0
+        while True:
+            profile = await new_queue.get()
+            if profile is _END:
+                break
+            if profile.get("profile_url", "") in known_urls:
+                continue
+            known_urls.add(profile.get("profile_url", ""))
+            leads.append(profile)
+            self.lead_store.upsert(profile)
+            added += 1
+            await out_queue.put(profile)
+        await discovery_task
+        logger.info(f"[{datetime.datetime.now()}] Added {added} new unique leads")
+        await out_queue.put(_END)
+
+    async def _discovery_to_queue(self, state, queue):
+        try:
+            await self.discovery.stream(state, queue)
+        except Exception as e:
+            logger.error(f"Error in streaming lead discovery: {e}", exc_info=True)
+        finally:
+            await queue.put(_END)
+
+    async def _stage(self, name, in_queue, out_queue, handler, workers):
+        async def worker():
+            while True:
+                lead = await in_queue.get()
+                if lead is _END:
+                    # Let sibling workers see the end marker as well
+                    await in_queue.put(_END)
+                    return
+                try:
+                    result = await handler(lead)
+                except Exception as e:
+                    logger.error(f"Error in {name} stage for lead {lead.get('profile_url', 'unknown')}: {e}", exc_info=True)
+                    continue
+                if out_queue is not None and result is not None:
+                    await out_queue.put(result)
+
+        await asyncio.gather(*(worker() for _ in range(max(workers, 1))))
+        if out_queue is not None:
+            await out_queue.put(_END)
+
+    async def run(self, state):
+        logger.info(f"[{datetime.datetime.now()}] Starting streaming_pipeline")
+        start = time.monotonic()
+        first_send = None
+        sent_count = 0
+        signature = self.writer.build_signature(state)
+        self.outreach.resume(state.setdefault("leads", []))
+
+        discovered = asyncio.Queue(maxsize=self.queue_size)
+        enriched = asyncio.Queue(maxsize=self.queue_size)
+        drafted = asyncio.Queue(maxsize=self.queue_size)
+
+        async def enrich(lead):
+            return await self.enricher.enrich_lead(lead)
+
+        async def write(lead):
+            return await self.writer.write_email_for_lead(lead, state, signature)
+
+        async def deliver(lead):
+            nonlocal first_send, sent_count
+            # The outreach scheduler paces sends per sender and recipient domain
+            if await self.outreach.submit(lead):
+                sent_count += 1
+                if first_send is None:
+                    first_send = time.monotonic() - start
+                    logger.info(f"Time to first send: {first_send:.2f} seconds")
+
+        windowed_sends = set()
+
+        async def send(lead):
+            if self.outreach.scheduler.window is not None:
+                # A lead may wait hours for its send window; don't hold a stage worker meanwhile
+                windowed_sends.add(asyncio.ensure_future(deliver(lead)))
+            else:
+                await deliver(lead)
+            return None
+
+        await asyncio.gather(
+            self._discover(state, discovered),
+            self._stage("enrich", discovered, enriched, enrich, self.enrich_workers),
+            self._stage("write_email", enriched, drafted, write, self.write_workers),
+            self._stage("execute_outreach", drafted, None, send, self.send_workers),
+        )
+        await self.writer.wait_for_batches()
+        if windowed_sends:
+            logger.info(f"Waiting for {len(windowed_sends)} sends scheduled into recipients' send windows")
+            await asyncio.gather(*windowed_sends)
+        logger.info(f"[{datetime.datetime.now()}] Completed streaming_pipeline: {sent_count} emails sent in {time.monotonic() - start:.2f} seconds")
+        return {"leads": state.get("leads", [])}
@@ -0,0 +1,286 @@
+# timezones.py
+import os
+import re
+import datetime
+import unicodedata
+import logging
+from typing import Optional, Set
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Offline lookup tables for LinkedIn-style locations ("Austin, Texas, United States", "Bengaluru, Karnataka, India").
+# Cities and regions are checked before countries, so countries spanning several zones resolve correctly
+# when the city or state is known; otherwise the country's most populous zone is used.
+CITY_TIMEZONES = {
+    # North America
+    "new york": "America/New_York", "new york city": "America/New_York", "nyc": "America/New_York",
+    "boston": "America/New_York", "philadelphia": "America/New_York", "washington dc": "America/New_York",
+    "atlanta": "America/New_York", "miami": "America/New_York", "charlotte": "America/New_York",
+    "pittsburgh": "America/New_York", "detroit": "America/Detroit", "toronto": "America/Toronto",
+    "montreal": "America/Toronto", "ottawa": "America/Toronto", "chicago": "America/Chicago",
+    "dallas": "America/Chicago", "houston": "America/Chicago", "austin": "America/Chicago",
+    "minneapolis": "America/Chicago", "nashville": "America/Chicago", "kansas city": "America/Chicago",
+    "st louis": "America/Chicago", "winnipeg": "America/Winnipeg", "denver": "America/Denver",
+    "boulder": "America/Denver", "salt lake city": "America/Denver", "calgary": "America/Edmonton",
+    "edmonton": "America/Edmonton", "phoenix": "America/Phoenix", "scottsdale": "America/Phoenix",
+    "san francisco": "America/Los_Angeles", "los angeles": "America/Los_Angeles", "san diego": "America/Los_Angeles",
+    "san jose": "America/Los_Angeles", "palo alto": "America/Los_Angeles", "mountain view": "America/Los_Angeles",
+    "seattle": "America/Los_Angeles", "las vegas": "America/Los_Angeles",
+    "vancouver": "America/Vancouver", "mexico city": "America/Mexico_City", "guadalajara": "America/Mexico_City",
+    "monterrey": "America/Monterrey", "tijuana": "America/Tijuana", "honolulu": "Pacific/Honolulu",
+    "anchorage": "America/Anchorage",
+    # South America
+    "sao paulo": "America/Sao_Paulo", "rio de janeiro": "America/Sao_Paulo", "buenos aires": "America/Argentina/Buenos_Aires",
+    "santiago": "America/Santiago", "bogota": "America/Bogota", "lima": "America/Lima",
+    # Europe
+    "london": "Europe/London", "manchester": "Europe/London", "edinburgh": "Europe/London",
+    "dublin": "Europe/Dublin", "paris": "Europe/Paris", "berlin": "Europe/Berlin", "munich": "Europe/Berlin",
+    "hamburg": "Europe/Berlin", "frankfurt": "Europe/Berlin", "amsterdam": "Europe/Amsterdam",
+    "brussels": "Europe/Brussels", "zurich": "Europe/Zurich", "geneva": "Europe/Zurich", "vienna": "Europe/Vienna",
+    "madrid": "Europe/Madrid", "barcelona": "Europe/Madrid", "lisbon": "Europe/Lisbon", "milan": "Europe/Rome",
+    "rome": "Europe/Rome", "stockholm": "Europe/Stockholm", "copenhagen": "Europe/Copenhagen", "oslo": "Europe/Oslo",
+    "helsinki": "Europe/Helsinki", "warsaw": "Europe/Warsaw", "prague": "Europe/Prague", "budapest": "Europe/Budapest",
+    "bucharest": "Europe/Bucharest", "athens": "Europe/Athens", "istanbul": "Europe/Istanbul", "kyiv": "Europe/Kyiv",
+    "moscow": "Europe/Moscow",
+    # Middle East and Africa
+    "dubai": "Asia/Dubai", "abu dhabi": "Asia/Dubai", "riyadh": "Asia/Riyadh", "doha": "Asia/Qatar",
+    "tel aviv": "Asia/Jerusalem", "cairo": "Africa/Cairo", "lagos": "Africa/Lagos", "nairobi": "Africa/Nairobi",
+    "johannesburg": "Africa/Johannesburg", "cape town": "Africa/Johannesburg", "tbilisi": "Asia/Tbilisi",
+    # Asia Pacific
+    "bengaluru": "Asia/Kolkata", "bangalore": "Asia/Kolkata", "mumbai": "Asia/Kolkata", "delhi": "Asia/Kolkata",
+    "new delhi": "Asia/Kolkata", "gurugram": "Asia/Kolkata", "gurgaon": "Asia/Kolkata", "noida": "Asia/Kolkata",
+    "hyderabad": "Asia/Kolkata", "chennai": "Asia/Kolkata", "pune": "Asia/Kolkata", "ahmedabad": "Asia/Kolkata",
+    "kolkata": "Asia/Kolkata", "karachi": "Asia/Karachi", "lahore": "Asia/Karachi", "dhaka": "Asia/Dhaka",
+    "colombo": "Asia/Colombo", "singapore": "Asia/Singapore", "kuala lumpur": "Asia/Kuala_Lumpur",
+    "jakarta": "Asia/Jakarta", "bangkok": "Asia/Bangkok", "ho chi minh city": "Asia/Ho_Chi_Minh",
+    "hanoi": "Asia/Ho_Chi_Minh", "manila": "Asia/Manila", "hong kong": "Asia/Hong_Kong", "shanghai": "Asia/Shanghai",
+    "beijing": "Asia/Shanghai", "shenzhen": "Asia/Shanghai", "taipei": "Asia/Taipei", "seoul": "Asia/Seoul",
+    "tokyo": "Asia/Tokyo", "osaka": "Asia/Tokyo", "sydney": "Australia/Sydney", "melbourne": "Australia/Melbourne",
+    "brisbane": "Australia/Brisbane", "adelaide": "Australia/Adelaide",
+    "auckland": "Pacific/Auckland", "wellington": "Pacific/Auckland",
+}
+
+REGION_TIMEZONES = {
+    # US states
+    "alabama": "America/Chicago", "alaska": "America/Anchorage", "arizona": "America/Phoenix",
+    "arkansas": "America/Chicago", "california": "America/Los_Angeles", "colorado": "America/Denver",
+    "connecticut": "America/New_York", "delaware": "America/New_York", "district of columbia": "America/New_York",
+    "florida": "America/New_York", "georgia": "America/New_York", "hawaii": "Pacific/Honolulu",
+    "idaho": "America/Boise", "illinois": "America/Chicago", "indiana": "America/Indiana/Indianapolis",
+    "iowa": "America/Chicago", "kansas": "America/Chicago", "kentucky": "America/New_York",
+    "louisiana": "America/Chicago", "maine": "America/New_York", "maryland": "America/New_York",
+    "massachusetts": "America/New_York", "michigan": "America/Detroit", "minnesota": "America/Chicago",
+    "mississippi": "America/Chicago", "missouri": "America/Chicago", "montana": "America/Denver",
+    "nebraska": "America/Chicago", "nevada": "America/Los_Angeles", "new hampshire": "America/New_York",
+    "new jersey": "America/New_York", "new mexico": "America/Denver", "north carolina": "America/New_York",
+    "north dakota": "America/Chicago", "ohio": "America/New_York", "oklahoma": "America/Chicago",
+    "oregon": "America/Los_Angeles", "pennsylvania": "America/New_York", "rhode island": "America/New_York",
+    "south carolina": "America/New_York", "south dakota": "America/Chicago", "tennessee": "America/Chicago",
+    "texas": "America/Chicago", "utah": "America/Denver", "vermont": "America/New_York",
+    "virginia": "America/New_York", "washington": "America/Los_Angeles", "west virginia": "America/New_York",
+    "wisconsin": "America/Chicago", "wyoming": "America/Denver",
+    # Canadian provinces
+    "british columbia": "America/Vancouver", "alberta": "America/Edmonton", "saskatchewan": "America/Regina",
+    "manitoba": "America/Winnipeg", "ontario": "America/Toronto", "quebec": "America/Toronto",
+    "nova scotia": "America/Halifax", "new brunswick": "America/Moncton", "newfoundland and labrador": "America/St_Johns",
+    # Australian states
+    "new south wales": "Australia/Sydney", "victoria": "Australia/Melbourne", "queensland": "Australia/Brisbane",
+    "western australia": "Australia/Perth", "south australia": "Australia/Adelaide", "tasmania": "Australia/Hobart",
+    "australian capital territory": "Australia/Sydney",
+    # UK nations
+    "england": "Europe/London", "scotland": "Europe/London", "wales": "Europe/London", "northern ireland": "Europe/London",
+}
+
+# "Austin, TX" style US state abbreviations. Used after a city when the location names the US, or as the last
+# part of "City, XX" when nothing else names a country and the code is not also a country code (CA, DE, IN, ...)
+US_STATE_ABBREVIATIONS = {
+    "al": "alabama", "ak": "alaska", "az": "arizona", "ar": "arkansas", "ca": "california", "co": "colorado",
+    "ct": "connecticut", "de": "delaware", "dc": "district of columbia", "fl": "florida", "ga": "georgia",
+    "hi": "hawaii", "id": "idaho", "il": "illinois", "in": "indiana", "ia": "iowa", "ks": "kansas",
+    "ky": "kentucky", "la": "louisiana", "me": "maine", "md": "maryland", "ma": "massachusetts", "mi": "michigan",
+    "mn": "minnesota", "ms": "mississippi", "mo": "missouri", "mt": "montana", "ne": "nebraska", "nv": "nevada",
+    "nh": "new hampshire", "nj": "new jersey", "nm": "new mexico", "ny": "new york", "nc": "north carolina",
+    "nd": "north dakota", "oh": "ohio", "ok": "oklahoma", "or": "oregon", "pa": "pennsylvania",
+    "ri": "rhode island", "sc": "south carolina", "sd": "south dakota", "tn": "tennessee", "tx": "texas",
+    "ut": "utah", "vt": "vermont", "va": "virginia", "wa": "washington", "wv": "west virginia",
+    "wi": "wisconsin", "wy": "wyoming",
+}
+
+COUNTRY_TIMEZONES = {
+    "united states": "America/New_York", "united states of america": "America/New_York", "usa": "America/New_York",
+    "us": "America/New_York", "canada": "America/Toronto", "mexico": "America/Mexico_City",
+    "brazil": "America/Sao_Paulo", "argentina": "America/Argentina/Buenos_Aires", "chile": "America/Santiago",
+    "colombia": "America/Bogota", "peru": "America/Lima",
+    "united kingdom": "Europe/London", "uk": "Europe/London", "ireland": "Europe/Dublin", "france": "Europe/Paris",
+    "germany": "Europe/Berlin", "netherlands": "Europe/Amsterdam", "belgium": "Europe/Brussels",
+    "switzerland": "Europe/Zurich", "austria": "Europe/Vienna", "spain": "Europe/Madrid", "portugal": "Europe/Lisbon",
+    "italy": "Europe/Rome", "sweden": "Europe/Stockholm", "denmark": "Europe/Copenhagen", "norway": "Europe/Oslo",
+    "finland": "Europe/Helsinki", "poland": "Europe/Warsaw", "czechia": "Europe/Prague",
+    "czech republic": "Europe/Prague", "hungary": "Europe/Budapest", "romania": "Europe/Bucharest",
+    "greece": "Europe/Athens", "turkey": "Europe/Istanbul", "turkiye": "Europe/Istanbul", "ukraine": "Europe/Kyiv",
+    "russia": "Europe/Moscow", "israel": "Asia/Jerusalem", "united arab emirates": "Asia/Dubai", "uae": "Asia/Dubai",
+    "saudi arabia": "Asia/Riyadh", "qatar": "Asia/Qatar", "egypt": "Africa/Cairo", "nigeria": "Africa/Lagos",
+    "kenya": "Africa/Nairobi", "south africa": "Africa/Johannesburg",
+    "india": "Asia/Kolkata", "pakistan": "Asia/Karachi", "bangladesh": "Asia/Dhaka", "sri lanka": "Asia/Colombo",
+    "singapore": "Asia/Singapore", "malaysia": "Asia/Kuala_Lumpur", "indonesia": "Asia/Jakarta",
+    "thailand": "Asia/Bangkok", "vietnam": "Asia/Ho_Chi_Minh", "philippines": "Asia/Manila",
+    "hong kong": "Asia/Hong_Kong", "china": "Asia/Shanghai", "taiwan": "Asia/Taipei", "south korea": "Asia/Seoul",
+    "japan": "Asia/Tokyo", "australia": "Australia/Sydney", "new zealand": "Pacific/Auckland",
+}
+
+US_NAMES = {"united states", "united states of america", "usa", "us"}
+
+# ISO 3166 codes of the countries above, for "Stuttgart, DE" style locations
+COUNTRY_CODES = {
+    "ca": "canada", "mx": "mexico", "br": "brazil", "ar": "argentina", "cl": "chile", "co": "colombia", "pe": "peru",
+    "gb": "united kingdom", "ie": "ireland", "fr": "france", "de": "germany", "nl": "netherlands", "be": "belgium",
+    "ch": "switzerland", "at": "austria", "es": "spain", "pt": "portugal", "it": "italy", "se": "sweden",
+    "dk": "denmark", "no": "norway", "fi": "finland", "pl": "poland", "cz": "czechia", "hu": "hungary",
+    "ro": "romania", "gr": "greece", "tr": "turkey", "ua": "ukraine", "ru": "russia", "il": "israel",
+    "ae": "united arab emirates", "sa": "saudi arabia", "qa": "qatar", "eg": "egypt", "ng": "nigeria",
+    "ke": "kenya", "za": "south africa", "in": "india", "pk": "pakistan", "bd": "bangladesh", "lk": "sri lanka",
+    "sg": "singapore", "my": "malaysia", "id": "indonesia", "th": "thailand", "vn": "vietnam", "ph": "philippines",
+    "hk": "hong kong", "cn": "china", "tw": "taiwan", "kr": "south korea", "jp": "japan", "au": "australia",
+    "nz": "new zealand",
+}
+
+# Names shared by places in different zones resolve only with a qualifier elsewhere in the location
+# ("Portland, OR", "Savannah, Georgia, United States"); without one they are skipped.
+AMBIGUOUS_PLACES = {
+    # Portland, Oregon or Portland, Maine
+    "portland": {"or": "America/Los_Angeles", "oregon": "America/Los_Angeles",
+                 "me": "America/New_York", "maine": "America/New_York"},
+    # The US state or the country
+    "georgia": {"united states": "America/New_York", "united states of america": "America/New_York",
+                "usa": "America/New_York", "us": "America/New_York"},
+    # Perth, Western Australia or Perth, Scotland
+    "perth": {"australia": "Australia/Perth", "western australia": "Australia/Perth", "wa": "Australia/Perth",
+              "scotland": "Europe/London", "united kingdom": "Europe/London", "uk": "Europe/London"},
+}
+
+_LOCATION_NOISE = re.compile(r"\b(greater|metropolitan|metro|bay|area|region|city of)\b")
+
+WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+
+
+def _clean(part: str) -> str:
+    part = unicodedata.normalize("NFKD", part).encode("ascii", "ignore").decode("ascii")
+    part = part.lower().replace(".", "")
+    return " ".join(_LOCATION_NOISE.sub(" ", part).split())
+
+
+def _qualified(name: str, parts) -> Optional[str]:
+    """Zone of an ambiguous place name, picked by a qualifier among the other location parts"""
+    qualifiers = AMBIGUOUS_PLACES[name]
+    for part in parts:
+        if part != name and part in qualifiers:
+            return qualifiers[part]
+    return None
+
+
+def timezone_for_location(location: str) -> Optional[str]:
+    """
+    IANA timezone for a free-text location, or None if nothing in it is known.
+    """
+    parts = [_clean(p) for p in (location or "").split(",")]
+    parts = [p for p in parts if p]
+    for part in parts:
+        if part in AMBIGUOUS_PLACES:
+            zone = _qualified(part, parts)
+            if zone:
+                return zone
+        elif part in CITY_TIMEZONES:
+            return CITY_TIMEZONES[part]
+    # Full region names from the end: in "Washington, District of Columbia" the district decides
+    for part in reversed(parts):
+        if part in REGION_TIMEZONES and part not in AMBIGUOUS_PLACES:
+            return REGION_TIMEZONES[part]
+    # State codes after a city; in a US location they take precedence over the country's default zone
+    if US_NAMES.intersection(parts):
+        for part in reversed(parts[1:]):
+            if part in US_STATE_ABBREVIATIONS:
+                return REGION_TIMEZONES[US_STATE_ABBREVIATIONS[part]]
+    for part in reversed(parts):
+        if part in COUNTRY_TIMEZONES and part not in AMBIGUOUS_PLACES:
+            return COUNTRY_TIMEZONES[part]
+    # "City, XX" with no country named: a code that is both a state and a country code stays unresolved
+    if len(parts) > 1:
+        code = parts[-1]
+        if code in US_STATE_ABBREVIATIONS and code not in COUNTRY_CODES:
+            return REGION_TIMEZONES[US_STATE_ABBREVIATIONS[code]]
+        if code in COUNTRY_CODES and code not in US_STATE_ABBREVIATIONS:
+            return COUNTRY_TIMEZONES[COUNTRY_CODES[code]]
+    return None
+
+
+def _parse_days(spec: str) -> Set[int]:
+    """'mon-fri' or 'mon,wed,fri' -> weekday numbers"""
+    days = set()
+    for item in spec.lower().replace(" ", "").split(","):
+        if "-" in item:
+            start, end = (WEEKDAYS[d[:3]] for d in item.split("-", 1))
+            days.update(range(start, end + 1) if start <= end else [*range(start, 7), *range(0, end + 1)])
+        elif item:
+            days.add(WEEKDAYS[item[:3]])
+    return days
+
+
+class SendWindow:
+    """
+    Local-time window in which outreach may reach a recipient, e.g. 09:00-17:00 on weekdays.
+    A window whose end is before its start crosses midnight (22:00-06:00); `days` are the days it opens on.
+    Leads whose location doesn't map to a timezone use the default timezone.
+    """
+
+    def __init__(self, start: datetime.time, end: datetime.time, days: Set[int], default_timezone: str = "UTC"):
+        if start == end:
+            raise ValueError(f"Send window {start}-{end} is empty; leave OUTREACH_SEND_WINDOW unset to send at any time")
+        if not days or not days <= set(range(7)):
+            raise ValueError(f"Send window needs at least one valid weekday, got {sorted(days or [])}")
+        self.start = start
+        self.end = end
+        self.days = set(days)
+        self.default_timezone = default_timezone
+
+    @classmethod
+    def from_env(cls) -> Optional["SendWindow"]:
+        """
+        OUTREACH_SEND_WINDOW (e.g. '09:00-17:00'), OUTREACH_SEND_DAYS (default 'mon-fri') and
+        OUTREACH_DEFAULT_TIMEZONE (default 'UTC'). Returns None when no window is configured.
+        """
+        spec = os.getenv("OUTREACH_SEND_WINDOW", "").strip()
+        if not spec:
+            return None
+        start, end = (datetime.time.fromisoformat(t.strip()) for t in spec.split("-", 1))
+        return cls(start, end, _parse_days(os.getenv("OUTREACH_SEND_DAYS", "mon-fri")),
+                   os.getenv("OUTREACH_DEFAULT_TIMEZONE", "UTC"))
+
+    def zone(self, location: str) -> ZoneInfo:
+        name = timezone_for_location(location) or self.default_timezone
+        try:
+            return ZoneInfo(name)
+        except ZoneInfoNotFoundError:
+            logger.warning(f"Unknown timezone {name}, using UTC")
+            return ZoneInfo("UTC")
+
+    def next_send_time(self, location: str, now: Optional[datetime.datetime] = None) -> datetime.datetime:
+        """
+        Earliest moment at or after now (timezone-aware) that falls inside the window at the recipient's location.
+        """
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        local = now.astimezone(self.zone(location))
+        wraps = self.end < self.start
+        # Start from yesterday: a window crossing midnight may have opened then and still be open
+        for offset in range(-1, 8):
+            day = local.date() + datetime.timedelta(days=offset)
+            if day.weekday() not in self.days:
+                continue
+            opens = datetime.datetime.combine(day, self.start, tzinfo=local.tzinfo)
+            closes = datetime.datetime.combine(day + datetime.timedelta(days=1 if wraps else 0), self.end, tzinfo=local.tzinfo)
+            if local < closes:
+                return max(local, opens).astimezone(datetime.timezone.utc)
+        # Unreachable: days is non-empty, so a window opens within the next week
+        raise RuntimeError(f"No send window found for days {sorted(self.days)}")
@@ -0,0 +1,90 @@
+# email_batch_benchmark.py
+"""
+Measures EmailWriterAgent throughput and token use per email at different batch sizes.
+
+    python -m benchmarks.email_batch_benchmark --leads 20 --batch-sizes 1,5,10
+
+Batch size 1 is the regular one-request-per-lead mode. Uses the real Gemini API (GOOGLE_API_KEY);
+drafts go to a throwaway lead store and cache, nothing is written to outputs/.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_LEADS = [
+    ("Priya Shah", "CTO", "BreakthroughApps", "https://breakthroughapps.io", "San Francisco, CA"),
+    ("Daniel Kim", "VP Engineering", "Ledgerly", "https://ledgerly.com", "New York, NY"),
+    ("Maria Lopez", "Head of Product", "CareBridge Health", "https://carebridgehealth.com", "Austin, TX"),
+    ("Tom Becker", "Founder", "ShipFast Logistics", "https://shipfast.io", "Chicago, IL"),
+    ("Aisha Khan", "Director of Data", "RetailPulse", "https://retailpulse.ai", "Seattle, WA"),
+]
+
+
+def sample_leads(count, run):
+    leads = []
+    for i in range(count):
+        name, role, company, website, location = SAMPLE_LEADS[i % len(SAMPLE_LEADS)]
+        leads.append({
+            "name": f"{name} {i}",
+            "role": role,
+            "company": company,
+            "company_website": website,
+            "location": location,
+            "profile_url": f"https://www.linkedin.com/in/benchmark-{run}-{i}",
+        })
+    return leads
+
+
+async def bench(batch_size, count, state):
+    from agents.email_writer import EmailWriterAgent
+
+    agent = EmailWriterAgent()
+    agent.mode = "batch" if batch_size > 1 else "llm"
+    agent.batch_size = batch_size
+    agent.save_draft = lambda lead: None
+    agent.draft_cache.get = lambda fingerprint: None
+    leads = sample_leads(count, batch_size)
+    start = time.monotonic()
+    await agent.run(dict(state, leads=leads))
+    elapsed = time.monotonic() - start
+    usage = agent.usage
+    return {
+        "batch_size": batch_size,
+        "seconds": elapsed,
+        "calls": usage["calls"],
+        "prompt_tokens_per_email": usage["prompt_tokens"] / count,
+        "output_tokens_per_email": usage["output_tokens"] / count,
+        "emails_per_second": count / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=20)
+    parser.add_argument("--batch-sizes", default="1,5,10")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="email_bench_")
+    # A fresh cache and store so no draft is served from an earlier run
+    os.environ["CACHE_DB_PATH"] = os.path.join(tmp_dir, "cache.db")
+    os.environ["LEAD_STORE_PATH"] = os.path.join(tmp_dir, "leads.db")
+    os.environ["EMAIL_WRITER_BATCH_WAIT_SECONDS"] = "0"
+
+    state = {"organization_name": "Bacancy Technology", "user_name": "Benchmark User"}
+    results = [asyncio.run(bench(int(k), args.leads, state)) for k in args.batch_sizes.split(",")]
+
+    print(f"\n{'batch':>5} {'seconds':>8} {'calls':>6} {'emails/s':>9} {'prompt tok/email':>17} {'output tok/email':>17}")
+    for r in results:
+        print(
+            f"{r['batch_size']:>5} {r['seconds']:>8.2f} {r['calls']:>6} {r['emails_per_second']:>9.2f} "
+            f"{r['prompt_tokens_per_email']:>17.1f} {r['output_tokens_per_email']:>17.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
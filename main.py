@@ -1,5 +1,4 @@
 import os
-import json
 import logging
 import asyncio
 from datetime import datetime
@@ -19,6 +18,9 @@ from agents.email_reviewer import EmailReviewerAgent
 from agents.proposal_generator import ProposalGeneratorAgent
 from agents.calendar_manager import CalendarManagerAgent
 from agents.reporter import ReporterAgent
+from agents.lead_store import get_lead_store
+from agents.streaming_pipeline import StreamingPipeline
+from agents.llm import get_llm_gateway
 
 # Define langgraph state
 class AgentState(TypedDict, total=False):
@@ -32,6 +34,7 @@ class AgentState(TypedDict, total=False):
     company_logo: str
     num_profiles: int
     email_reviews: List[dict]
+    streaming: bool
 
 
 # Initialize all agents
@@ -43,6 +46,8 @@ email_reviewer = EmailReviewerAgent()
 proposal_generator = ProposalGeneratorAgent()
 calendar_manager = CalendarManagerAgent()
 reporter = ReporterAgent() 
+streaming_pipeline = StreamingPipeline(custom_lead_discovery, lead_enricher, email_writer, outreach_executor)
+lead_store = get_lead_store()
 
 leads_file = "outputs/final_leads.json"
 
@@ -53,19 +58,27 @@ async def load_leads(state: AgentState) -> AgentState:
     os.makedirs("outputs/replied", exist_ok=True)
     os.makedirs("outputs/non_replied", exist_ok=True)
 
-    if os.path.exists(leads_file) and os.path.getsize(leads_file) > 0:
-        with open(leads_file, "r") as f:
-            state["leads"] = json.load(f)
-        logger.info(f"[{datetime.now()}] Loaded {len(state['leads'])} previous leads from {leads_file}")
+    # One-time migration of the legacy JSON file into the lead store
+    if lead_store.count() == 0:
+        lead_store.import_json(leads_file)
+
+    if lead_store.count() > 0:
+        state["leads"] = lead_store.load_leads()
+        logger.info(f"[{datetime.now()}] Loaded {len(state['leads'])} previous leads from {lead_store.db_path}")
     else:
-        logger.info(f"[{datetime.now()}] JSON file is blank or not found. Skipping review/proposal/calendar/reporter.")
+        logger.info(f"[{datetime.now()}] No previous leads found. Skipping review/proposal/calendar/reporter.")
         state["leads"] = []
 
     return state
 
 # Condition check
 async def check_leads_exist(state: AgentState) -> str:
-    return "review_pipeline" if state.get("leads") else "discovery_pipeline"
+    if state.get("leads"):
+        return "review_pipeline"
+    return await select_discovery_mode(state)
+
+async def select_discovery_mode(state: AgentState) -> str:
+    return "streaming_pipeline" if state.get("streaming") else "discovery_pipeline"
 
 # Agent wrappers
 async def run_email_reviewer(state: AgentState) -> AgentState:
@@ -86,6 +99,7 @@ async def run_custom_lead_discovery(state: AgentState) -> AgentState:
     existing_urls = {lead.get("profile_url", "") for lead in state.get("leads" , [])}
     new_unique_leads = [lead for lead in new_leads if lead.get("profile_url", "") not in existing_urls]
     state.setdefault("leads", []).extend(new_unique_leads)
+    lead_store.upsert_many(new_unique_leads)
     logger.info(f"[{datetime.now()}] Added {len(new_unique_leads)} new unique leads")
     return state
 
@@ -97,11 +111,17 @@ async def run_email_writer(state: AgentState) -> AgentState:
 
 async def run_outreach_executor(state: AgentState) -> AgentState:
     result = await outreach_executor.run(state)
-    with open(leads_file, "w") as f:
-        json.dump(state["leads"], f, indent=2)
+    # Leads are persisted per lead by the agents; export once for the legacy JSON consumers
+    lead_store.export_json(leads_file)
     logger.info(f"[{datetime.now()}] pipeline completed, leads saved to {leads_file}")
     return result
 
+async def run_streaming_pipeline(state: AgentState) -> AgentState:
+    result = await streaming_pipeline.run(state)
+    lead_store.export_json(leads_file)
+    logger.info(f"[{datetime.now()}] streaming pipeline completed, leads saved to {leads_file}")
+    return result
+
 # Building LangGraph
 builder = StateGraph(AgentState)
 
@@ -116,19 +136,25 @@ builder.add_node("report", run_reporter)
 builder.add_node("enrich", run_lead_enricher)
 builder.add_node("write_email", run_email_writer)
 builder.add_node("execute_outreach", run_outreach_executor)
+builder.add_node("stream_pipeline", run_streaming_pipeline)
 builder.add_node("reporter", run_reporter)
 
 # Langgraph edges
 builder.add_conditional_edges("load", check_leads_exist, {
     "review_pipeline": "email_review",
-    "discovery_pipeline": "lead_discovery"
+    "discovery_pipeline": "lead_discovery",
+    "streaming_pipeline": "stream_pipeline"
 })
 builder.add_edge("email_review", "calendar") 
-builder.add_edge("calendar", "lead_discovery")
+builder.add_conditional_edges("calendar", select_discovery_mode, {
+    "discovery_pipeline": "lead_discovery",
+    "streaming_pipeline": "stream_pipeline"
+})
 builder.add_edge("lead_discovery", "enrich")
 builder.add_edge("enrich", "write_email")
 builder.add_edge("write_email", "execute_outreach")
 builder.add_edge("execute_outreach", "reporter")
+builder.add_edge("stream_pipeline", "reporter")
 builder.add_edge("reporter", END)
 
 # compile graph
@@ -146,12 +172,14 @@ async def main():
         "company_linkedin": "https://www.linkedin.com/company/bacancy-technology/",
         "company_logo": "logo.png",
         "num_profiles": 2,
-        "email_reviews": []
+        "email_reviews": [],
+        "streaming": os.getenv("STREAMING_PIPELINE", "false").lower() == "true"
     }
     start_time = datetime.now()
     await graph.ainvoke(state)
     end_time = datetime.now()
     logger.info(f"Total execution time: {(end_time - start_time).total_seconds():.2f} seconds")
+    get_llm_gateway().log_metrics()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
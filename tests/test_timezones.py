@@ -0,0 +1,83 @@
+# test_timezones.py
+import datetime
+
+import pytest
+
+from agents.timezones import SendWindow, timezone_for_location
+
+UTC = datetime.timezone.utc
+
+
+def at(day, hour, minute=0):
+    # 2024-01-01 is a Monday
+    return datetime.datetime(2024, 1, day, hour, minute, tzinfo=UTC)
+
+
+def overnight(days=frozenset(range(7))):
+    return SendWindow(datetime.time(22), datetime.time(6), set(days), "UTC")
+
+
+def test_window_crossing_midnight_is_open_after_midnight():
+    assert overnight().next_send_time("", at(3, 3)) == at(3, 3)
+
+
+def test_window_crossing_midnight_is_open_before_midnight():
+    assert overnight().next_send_time("", at(3, 23)) == at(3, 23)
+
+
+def test_window_crossing_midnight_waits_for_opening():
+    assert overnight().next_send_time("", at(3, 12)) == at(3, 22)
+
+
+def test_window_crossing_midnight_belongs_to_the_day_it_opens():
+    # Opens Monday only: Tuesday 03:00 is still Monday night's window, Tuesday 23:00 waits for next Monday
+    window = overnight(days={0})
+    assert window.next_send_time("", at(2, 3)) == at(2, 3)
+    assert window.next_send_time("", at(2, 23)) == at(8, 22)
+
+
+def test_daytime_window():
+    window = SendWindow(datetime.time(9), datetime.time(17), set(range(5)), "UTC")
+    assert window.next_send_time("", at(1, 8)) == at(1, 9)
+    assert window.next_send_time("", at(1, 12)) == at(1, 12)
+    assert window.next_send_time("", at(5, 18)) == at(8, 9)
+
+
+def test_window_needs_days():
+    with pytest.raises(ValueError):
+        SendWindow(datetime.time(9), datetime.time(17), set(), "UTC")
+
+
+def test_empty_window_is_rejected():
+    with pytest.raises(ValueError):
+        SendWindow(datetime.time(9), datetime.time(9), set(range(7)), "UTC")
+
+
+@pytest.mark.parametrize("location, zone", [
+    ("Portland, OR", "America/Los_Angeles"),
+    ("Portland, Maine, United States", "America/New_York"),
+    ("Portland", None),
+    ("Savannah, GA", "America/New_York"),
+    ("Georgia, United States", "America/New_York"),
+    ("Georgia", None),
+    ("Tbilisi, Georgia", "Asia/Tbilisi"),
+    ("Perth, Western Australia, Australia", "Australia/Perth"),
+    ("Perth, Scotland", "Europe/London"),
+])
+def test_ambiguous_places_need_a_qualifier(location, zone):
+    assert timezone_for_location(location) == zone
+
+
+@pytest.mark.parametrize("location, zone", [
+    ("Stuttgart, DE", None),
+    ("Stuttgart, Germany", "Europe/Berlin"),
+    ("Waterloo, Ontario, CA", "America/Toronto"),
+    ("Kitchener, ON, Canada", "America/Toronto"),
+    ("Zug, CH", "Europe/Zurich"),
+    ("Plano, TX", "America/Chicago"),
+    ("Plano, TX, United States", "America/Chicago"),
+    ("Dover, DE, USA", "America/New_York"),
+    ("Fresno, CA, United States", "America/Los_Angeles"),
+])
+def test_state_codes_do_not_shadow_countries(location, zone):
+    assert timezone_for_location(location) == zone